@@ -81,10 +81,54 @@ def init_oled():
         print(f"OLED初始化失败: {str(e)}")
         return None
 
+# 流式读取响应时每次读取的字节数，以及块与块之间保留的重叠字节数
+READ_CHUNK_SIZE = 512
+READ_OVERLAP = 64
+
+# 电量标签的 id，按优先级排列：只有读完整个页面都没有 lblSYDL 时才使用 Label1
+POWER_SPAN_IDS = (b'lblSYDL', b'Label1')
+
+def strip_tags(text):
+    """去掉文本中的 HTML 标签（电量标签内可能嵌套 <font> 等元素）"""
+    parts = []
+    pos = 0
+    while True:
+        start = text.find(b'<', pos)
+        if start < 0:
+            parts.append(text[pos:])
+            break
+        parts.append(text[pos:start])
+        end = text.find(b'>', start)
+        if end < 0:
+            break
+        pos = end + 1
+    return b''.join(parts)
+
+def find_power_span(buf, span_id):
+    """
+    在一段字节数据中查找 <span id="span_id">...</span> 标签的内容。
+    id 连同引号一起匹配（Label1 不会匹配到 Label10），且必须位于 <span 标签内，
+    脚本或其他属性中出现的同名字符串不算。
+    只使用 bytes.find，避免对整页内容运行正则表达式。
+    找到完整标签时返回标签内的文本，否则返回None。
+    """
+    for marker in (b'id="' + span_id + b'"', b"id='" + span_id + b"'"):
+        pos = buf.find(marker)
+        while pos >= 0:
+            tag_start = buf.rfind(b'<', 0, pos)
+            if tag_start >= 0 and buf[tag_start:tag_start + 5] == b'<span' and buf.find(b'>', tag_start, pos) < 0:
+                start = buf.find(b'>', pos)
+                end = buf.find(b'</span>', start) if start >= 0 else -1
+                if end >= 0:
+                    return strip_tags(buf[start + 1:end]).decode('utf-8').strip()
+            pos = buf.find(marker, pos + 1)
+    return None
+
 def get_remaining_power(url):
     """
     从指定URL抓取并解析宿舍剩余电量。
-    使用正则表达式解析，以减少内存占用。
+    按块读取响应内容，找到电量标签后立即关闭连接，
+    整个页面不会完整地保存在内存中。
     """
     # 模拟浏览器请求头，防止被服务器拒绝
     headers = {
@@ -94,20 +138,38 @@ def get_remaining_power(url):
         "Referer": "https://hydz.xsyu.edu.cn/wxpay/homeinfo.aspx",
     }
     
+    response = None
     try:
         print("正在发送网络请求...")
         response = requests.get(url, headers=headers, timeout=15)
-        response_text = response.text
-        response.close()  # 在MicroPython中，手动关闭连接是个好习惯
         print("请求成功，正在解析数据...")
 
-        # 使用正则表达式从HTML中直接提取电量信息
-        # 目标是 <span id="lblSYDL">...</span> 或 <span id="Label1">...</span> 标签内的内容
-        power_match = re.search(r'<span[^>]*id=["\'](lblSYDL|Label1)["\'][^>]*>([^<]+)</span>', response_text)
+        # 逐块读取，只保留上一块末尾的少量字节，保证跨块的标签也能被找到；
+        # 找到 lblSYDL 立即停止，Label1 只先记下，读完整个页面仍没有 lblSYDL 时才使用
+        primary_id, secondary_id = POWER_SPAN_IDS
+        power_text = None
+        secondary_text = None
+        tail = b''
+        while True:
+            chunk = response.raw.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            window = tail + chunk
+            power_text = find_power_span(window, primary_id)
+            if power_text is not None:
+                break
+            if secondary_text is None:
+                secondary_text = find_power_span(window, secondary_id)
+            # 末尾有未读完的 <span 标签时从它开始保留（最多一块），否则只保留固定的重叠字节
+            keep = len(window) - READ_OVERLAP
+            span_start = window.rfind(b'<span')
+            if 0 <= span_start < keep:
+                keep = max(span_start, len(window) - READ_CHUNK_SIZE)
+            tail = window[max(0, keep):]
+        if power_text is None:
+            power_text = secondary_text
         
-        if power_match:
-            power_text = power_match.group(2).strip()
-            
+        if power_text is not None:
             # 检查提取到的文本是否为纯数字格式
             if re.match(r'^\d+\.?\d*$', power_text):
                 return float(power_text)
@@ -121,6 +183,9 @@ def get_remaining_power(url):
     except Exception as e:
         print(f"抓取电量时发生程序错误: {str(e)}")
         return None
+    finally:
+        if response:
+            response.close()  # 找到电量后立即关闭连接，不再接收剩余内容
 
 def format_time():
     """
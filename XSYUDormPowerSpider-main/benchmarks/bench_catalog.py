@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+宿舍目录基准测试
+对比修改前启动时用 csv.DictReader 构建宿舍字典列表和 id_mapping，
+与打开内存映射的二进制目录（DormCatalog）后做若干次编码查询的耗时和 Python 堆内存占用。
+
+用法: python benchmarks/bench_catalog.py [--lookups 100] [--repeat 20]
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, '..', 'v1.0')
+sys.path.insert(0, APP_DIR)
+
+from dorm_catalog import DormCatalog, build_catalog
+
+CSV_PATH = os.path.join(APP_DIR, 'dorm_rooms_2025.csv')
+
+
+def legacy_load(codes):
+    """修改前 load_dormitory_data 的逻辑"""
+    dormitories = []
+    id_mapping = {}
+    with open(CSV_PATH, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            name = f"{row['building']}-{row['room_number']}"
+            dormitories.append({'name': name, 'id': row['room_code'], 'type': row['dorm_type']})
+            id_mapping[row['room_code']] = (name, row['dorm_type'])
+    for code in codes:
+        id_mapping[code]
+    return dormitories, id_mapping
+
+
+def catalog_load(codes):
+    catalog = DormCatalog(CSV_PATH)
+    for code in codes:
+        catalog.lookup(code)
+    return catalog
+
+
+def measure(load, codes, repeat):
+    timings = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        load(codes)
+        timings.append(time.perf_counter() - begin)
+    tracemalloc.start()
+    result = load(codes)
+    _, peak = tracemalloc.get_traced_memory()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return min(timings) * 1000, peak / 1024, retained / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lookups', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    bin_path = build_catalog(CSV_PATH)
+    with open(CSV_PATH, 'r', encoding='utf-8') as f:
+        all_codes = [row['room_code'] for row in csv.DictReader(f)]
+    codes = random.Random(42).sample(all_codes, min(args.lookups, len(all_codes)))
+    print(f"{len(all_codes)} 个宿舍，CSV {os.path.getsize(CSV_PATH) / 1024:.0f} KB，"
+          f"二进制目录 {os.path.getsize(bin_path) / 1024:.0f} KB，每轮查询 {len(codes)} 次")
+
+    print(f"{'实现':<14}{'耗时(ms)':>10}{'峰值内存(KB)':>14}{'常驻内存(KB)':>14}")
+    for name, load in (("csv.DictReader", legacy_load), ("DormCatalog", catalog_load)):
+        elapsed, peak, retained = measure(load, codes, args.repeat)
+        print(f"{name:<14}{elapsed:>10.2f}{peak:>14.0f}{retained:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
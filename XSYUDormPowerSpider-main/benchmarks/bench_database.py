@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+数据库查询基准测试
+在合成的多百万行 electricity_records 表上，对比迁移前（无索引 + DATE() 过滤）
+与迁移后（(dorm_id, query_time) 复合索引 + 范围查询）的保存检查和历史读取延迟。
+
+用法: python benchmarks/bench_database.py [--rows 2000000] [--dorms 5000]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'v1.0'))
+
+from database import DatabaseManager
+
+OLD_SHOULD_SAVE_SQL = '''
+    SELECT 1 FROM electricity_records
+    WHERE dorm_id = ? AND DATE(query_time) = ?
+    LIMIT 1
+'''
+OLD_RANGE_SQL = '''
+    SELECT query_time, power FROM electricity_records
+    WHERE dorm_id = ? AND DATE(query_time) >= ?
+    ORDER BY query_time ASC
+'''
+
+
+def populate(db_path, rows, dorms):
+    """生成合成数据：每个宿舍每天一条记录，时间倒推到足够覆盖所需行数"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE electricity_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dorm_id TEXT,
+            dorm_name TEXT,
+            query_time DATETIME,
+            power REAL
+        )
+    ''')
+    days = rows // dorms
+    start = datetime.now() - timedelta(days=days)
+
+    def generate():
+        for day in range(days):
+            base = start + timedelta(days=day)
+            for dorm in range(dorms):
+                yield (str(100000000 + dorm), f"dorm-{dorm}",
+                       str(base + timedelta(minutes=random.randint(0, 1439))), random.uniform(0, 200))
+
+    conn.executemany('INSERT INTO electricity_records (dorm_id, dorm_name, query_time, power) VALUES (?, ?, ?, ?)',
+                     generate())
+    conn.commit()
+    conn.close()
+    return days * dorms
+
+
+def measure(func, samples):
+    timings = []
+    for args in samples:
+        begin = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - begin)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, timings[int(len(timings) * 0.95)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据库查询基准测试")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="合成记录总数")
+    parser.add_argument("--dorms", type=int, default=5000, help="宿舍数量")
+    parser.add_argument("--samples", type=int, default=50, help="每项测量的查询次数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        begin = time.perf_counter()
+        total = populate(db_path, args.rows, args.dorms)
+        print(f"生成 {total} 条记录，用时 {time.perf_counter() - begin:.1f} 秒")
+
+        dorm_ids = [str(100000000 + random.randrange(args.dorms)) for _ in range(args.samples)]
+        today = datetime.now().strftime('%Y-%m-%d')
+        month_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+
+        conn = sqlite3.connect(db_path)
+        old_save = measure(lambda d: conn.execute(OLD_SHOULD_SAVE_SQL, (d, today)).fetchone(),
+                           [(d,) for d in dorm_ids])
+        old_range = measure(lambda d: conn.execute(OLD_RANGE_SQL, (d, month_ago)).fetchall(),
+                            [(d,) for d in dorm_ids])
+        conn.close()
+
+        begin = time.perf_counter()
+        db = DatabaseManager(db_path=db_path)  # 打开时执行迁移，建立索引
+        print(f"迁移（建立索引）用时 {time.perf_counter() - begin:.1f} 秒")
+        new_save = measure(db.should_save_daily_record, [(d,) for d in dorm_ids])
+        new_range = measure(lambda d: db.get_records_by_dorm_id(d, start_date=month_ago), [(d,) for d in dorm_ids])
+        db.close()
+
+    print(f"{'操作':<20}{'迁移前 p50/p95 (ms)':>24}{'迁移后 p50/p95 (ms)':>24}")
+    for name, old, new in (("保存前去重检查", old_save, new_save), ("30天历史读取", old_range, new_range)):
+        print(f"{name:<20}{old[0]:>14.2f} / {old[1]:<8.2f}{new[0]:>14.3f} / {new[1]:<8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+电量页面解析基准测试
+对比正则快速路径与 BeautifulSoup 完整解析在保存的 homeinfo.aspx 页面上的单页耗时。
+
+用法: python benchmarks/bench_extractor.py [--repeat 200]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'v1.0'))
+
+from extractor import find_power_text, extract_power_text, parse_power_text_with_soup
+
+
+def main():
+    parser = argparse.ArgumentParser(description="电量页面解析基准测试")
+    parser.add_argument("--repeat", type=int, default=200, help="每个页面的解析次数")
+    args = parser.parse_args()
+
+    fixtures = sorted(glob.glob(os.path.join(BENCH_DIR, 'fixtures', 'homeinfo*.html')))
+    print(f"{'页面':<24}{'大小(B)':>10}{'快速路径':>14}{'自动(含回退)':>16}{'BeautifulSoup':>16}  结果")
+    for path in fixtures:
+        with open(path, 'rb') as f:
+            content = f.read()
+        fast = timeit.timeit(lambda: find_power_text(content), number=args.repeat) / args.repeat
+        auto = timeit.timeit(lambda: extract_power_text(content), number=args.repeat) / args.repeat
+        soup = timeit.timeit(lambda: parse_power_text_with_soup(content), number=args.repeat) / args.repeat
+        result = extract_power_text(content)
+        print(f"{os.path.basename(path):<24}{len(content):>10}{fast * 1e6:>12.1f}us{auto * 1e6:>14.1f}us{soup * 1e6:>14.1f}us  {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+启动导入耗时报告
+在新的解释器中用 `python -X importtime -c "import <模块>"` 导入程序模块，解析 stderr 输出，
+按累计耗时列出最慢的导入，便于发现启动时误引入的重量级依赖。
+
+默认同时报告 main_app（启动时导入的部分）以及延迟导入的 history_window、scraper，
+用来确认 matplotlib、NumPy、requests 等没有回到启动路径上。
+
+用法: python benchmarks/bench_import.py [--module main_app ...] [--top 15] [--budget-ms 0]
+    --budget-ms 大于 0 时，任一模块的总导入耗时超过该值即以非零状态退出；
+    main_app 启动时导入了 DEFERRED_PACKAGES 中的依赖也会以非零状态退出
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.normpath(os.path.join(BENCH_DIR, '..', 'v1.0'))
+
+DEFAULT_MODULES = ['main_app', 'history_window', 'scraper']
+# 不应出现在主程序启动路径上的重量级依赖
+DEFERRED_PACKAGES = {'matplotlib', 'numpy', 'pandas', 'requests', 'urllib3', 'bs4', 'thefuzz', 'PIL'}
+_LINE_PATTERN = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def profile_import(module, baseline=frozenset()):
+    """
+    返回 (导入记录列表, 错误信息)；导入记录为 (模块名, 自身耗时us, 累计耗时us, 嵌套深度)。
+    baseline 中的模块（解释器启动时就会导入的，如 site）不计入结果。
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}' if module else 'pass'],
+        cwd=APP_DIR, capture_output=True, text=True)
+    entries = []
+    errors = []
+    for line in result.stderr.splitlines():
+        match = _LINE_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            if name in baseline:
+                continue
+            entries.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+        elif not line.startswith('import time:'):
+            errors.append(line)
+    error = errors[-1] if result.returncode != 0 and errors else None
+    return entries, error
+
+
+def report(module, entries, error, top):
+    # 最外层（深度 0）的记录之和即为整个导入的耗时
+    total_ms = sum(cumulative for _, _, cumulative, depth in entries if depth == 0) / 1000
+    print(f"\n== import {module}: 总耗时 {total_ms:.1f} ms，共导入 {len(entries)} 个模块")
+    if error:
+        print(f"   导入失败（当前环境缺少依赖？）: {error}")
+    print(f"   {'模块':<40}{'累计(ms)':>10}{'自身(ms)':>10}")
+    for name, self_us, cumulative_us, depth in sorted(entries, key=lambda e: -e[2])[:top]:
+        print(f"   {'  ' * min(depth, 4) + name:<40}{cumulative_us / 1000:>10.1f}{self_us / 1000:>10.1f}")
+    return total_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', action='append', dest='modules')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--budget-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    baseline = frozenset(name for name, _, _, _ in profile_import(None)[0])
+    over_budget = []
+    for module in args.modules or DEFAULT_MODULES:
+        entries, error = profile_import(module, baseline)
+        total_ms = report(module, entries, error, args.top)
+        if module == 'main_app':
+            eager = sorted({name.split('.')[0] for name, _, _, _ in entries} & DEFERRED_PACKAGES)
+            if eager:
+                print(f"   警告：启动时导入了应延迟加载的依赖: {', '.join(eager)}")
+                over_budget.append(f"main_app 导入了 {', '.join(eager)}")
+        if args.budget_ms > 0 and total_ms > args.budget_ms:
+            over_budget.append(f"{module} ({total_ms:.1f} ms)")
+
+    if over_budget:
+        print(f"\n未通过: {'; '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
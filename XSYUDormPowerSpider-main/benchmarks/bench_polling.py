@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+自适应查询间隔模拟
+模拟一批宿舍若干天的用电（每个宿舍的日均用电随机，电量低于 2 度后随机时间充值），
+对比固定间隔查询与 polling_policy 自适应查询的总请求数，以及电量跌破阈值后
+多久才被查询发现（发现延迟）。用电统计用 database.advance_consumption_stats 增量计算，
+与实际程序一致。
+
+用法: python benchmarks/bench_polling.py [--rooms 500] [--days 30] [--fixed-minutes 30] [--budget 0]
+"""
+
+import argparse
+import heapq
+import os
+import random
+import statistics
+import sys
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, '..', 'v1.0')
+sys.path.insert(0, APP_DIR)
+
+from database import advance_consumption_stats
+from polling_policy import AdaptivePollPlan, AdaptivePollPlanner
+
+THRESHOLD = 10.0
+START = datetime(2025, 3, 1)
+
+
+class Room:
+    """一个宿舍的真实电量：按固定速率下降，跌到 2 度以下后的某个时刻充值"""
+
+    def __init__(self, rng):
+        self.rate = rng.uniform(0.5, 8.0)          # 度/天
+        self.power = rng.uniform(5, 300)
+        self.time = 0.0                            # 距模拟开始的秒数
+        self.rng = rng
+        self.recharge_at = None
+        self.crossed_at = None                     # 最近一次跌破阈值的时刻，充值到阈值以上后清空
+
+    def advance(self, t):
+        while self.time < t:
+            step = min(t, self.recharge_at or t) - self.time
+            before = self.power
+            self.power = max(0.0, before - self.rate * step / 86400)
+            if before >= THRESHOLD > self.power:
+                self.crossed_at = self.time + (before - THRESHOLD) / self.rate * 86400
+            self.time += step
+            if self.recharge_at is not None and self.time >= self.recharge_at:
+                self.power += self.rng.uniform(50, 200)
+                self.recharge_at = None
+                if self.power >= THRESHOLD:
+                    self.crossed_at = None
+            if self.recharge_at is None and self.power < 2:
+                self.recharge_at = self.time + self.rng.uniform(0.5, 2) * 86400
+        return self.power
+
+
+def simulate(rooms, days, choose_interval, seed):
+    """
+    按 choose_interval(room_index, stats, now) 给出的间隔查询每个宿舍，
+    返回 (总请求数, 发现延迟列表(秒))
+    """
+    horizon = days * 86400
+    rng = random.Random(seed)
+    truth = [Room(random.Random(rng.random())) for _ in range(rooms)]
+    stats = [None] * rooms
+    below = [False] * rooms            # 上次查询时是否已低于阈值
+    queue = [(0.0, i) for i in range(rooms)]
+    heapq.heapify(queue)
+    requests = 0
+    delays = []
+    while queue:
+        t, i = heapq.heappop(queue)
+        if t >= horizon:
+            continue
+        room = truth[i]
+        room.advance(t)
+        requests += 1
+        power = round(room.power, 2)
+        stats[i] = advance_consumption_stats(stats[i], START + timedelta(seconds=t), power)
+        now_below = power < THRESHOLD
+        if now_below and not below[i] and room.crossed_at is not None:
+            delays.append(t - room.crossed_at)
+        below[i] = now_below
+        heapq.heappush(queue, (t + choose_interval(i, stats[i], t), i))
+    return requests, delays
+
+
+def describe(name, requests, delays, days):
+    if delays:
+        delays = sorted(delays)
+        p50 = statistics.median(delays) / 60
+        p95 = delays[int(len(delays) * 0.95) - 1 if len(delays) > 1 else 0] / 60
+        lag = f"发现延迟 中位 {p50:6.1f} 分钟 / P95 {p95:6.1f} 分钟 (共 {len(delays)} 次跌破阈值)"
+    else:
+        lag = "期间没有宿舍跌破阈值"
+    print(f"{name:<10}请求 {requests:>8} 次 (每天 {requests / days:>7.0f})  {lag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, default=500)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--fixed-minutes', type=float, default=30)
+    parser.add_argument('--budget', type=int, default=0, help='自适应查询每天的请求预算，0 表示不限制')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    fixed = args.fixed_minutes * 60
+    requests, delays = simulate(args.rooms, args.days, lambda i, stats, t: fixed, args.seed)
+    describe("固定间隔", requests, delays, args.days)
+
+    planner = AdaptivePollPlanner(daily_budget=args.budget)
+    clock = {'now': 0.0}
+    plan = AdaptivePollPlan(planner, clock=lambda: clock['now'])
+    latest = {}
+
+    def adaptive(i, stats, t):
+        now = START.timestamp() + t
+        latest[i] = (stats, THRESHOLD)
+        if planner.daily_budget <= 0:
+            return planner.interval(stats, THRESHOLD, now)
+        # 预算在全体宿舍间分配：每模拟一小时用全部宿舍的最新统计重新计算一次间隔
+        if i not in plan.intervals or now - clock['now'] >= 3600:
+            clock['now'] = now
+            plan.update(latest, now)
+        return plan.intervals[i]
+
+    requests, delays = simulate(args.rooms, args.days, adaptive, args.seed)
+    describe("自适应", requests, delays, args.days)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+宿舍搜索基准测试
+按字符逐个"输入"若干查询，对比旧实现（对全部房间做 thefuzz 模糊匹配 + 嵌套列表推导回查）
+与 DormSearchIndex 的单次按键延迟。
+
+用法: python benchmarks/bench_search.py
+"""
+
+import csv
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, '..', 'v1.0')
+sys.path.insert(0, APP_DIR)
+
+from thefuzz import process
+from dorm_catalog import DormCatalog
+from dorm_search import DormSearchIndex
+
+# 用户逐字输入的查询
+TYPED_QUERIES = ["11-123", "1号楼-101", "5号楼 1002", "18-3", "20号楼", "7-45", "楼-101", "12号楼210"]
+
+
+def load_dormitories():
+    dormitories = []
+    with open(os.path.join(APP_DIR, 'dorm_rooms_2025.csv'), 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            dormitories.append({'name': f"{row['building']}-{row['room_number']}",
+                                'id': row['room_code'], 'type': row['dorm_type']})
+    return dormitories
+
+
+def legacy_search(dormitories, search_text):
+    """修改前 on_search 中的匹配逻辑"""
+    results = process.extract(search_text, [d['name'] for d in dormitories], limit=50)
+    return [d for name, score in results if score > 70 for d in dormitories if d['name'] == name]
+
+
+def keystrokes():
+    for query in TYPED_QUERIES:
+        for end in range(1, len(query) + 1):
+            yield query[:end]
+
+
+def measure(search):
+    timings = []
+    for text in keystrokes():
+        begin = time.perf_counter()
+        search(text)
+        timings.append(time.perf_counter() - begin)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, timings[int(len(timings) * 0.95)] * 1000, timings[-1] * 1000
+
+
+def main():
+    dormitories = load_dormitories()
+    begin = time.perf_counter()
+    index = DormSearchIndex(DormCatalog(os.path.join(APP_DIR, 'dorm_rooms_2025.csv')))
+    print(f"{len(dormitories)} 个宿舍，构建索引用时 {(time.perf_counter() - begin) * 1000:.1f} ms，"
+          f"共 {sum(1 for _ in keystrokes())} 次按键")
+
+    print(f"{'实现':<16}{'p50(ms)':>10}{'p95(ms)':>10}{'max(ms)':>10}")
+    for name, search in (("旧实现", lambda text: legacy_search(dormitories, text)),
+                         ("DormSearchIndex", index.search)):
+        p50, p95, worst = measure(search)
+        print(f"{name:<16}{p50:>10.3f}{p95:>10.3f}{worst:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
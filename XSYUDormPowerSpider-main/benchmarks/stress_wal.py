@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+多进程数据库并发压力测试
+模拟主程序写入、多个桌面摆件进程同时读取同一个数据库的场景，
+对比旧的回滚日志模式与 WAL 模式下读取延迟和 "database is locked" 错误数。
+
+用法: python benchmarks/stress_wal.py [--readers 5] [--seconds 10]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'v1.0'))
+
+from database import DatabaseManager
+
+
+class RollbackJournalDatabaseManager(DatabaseManager):
+    """还原修改前的连接方式：默认回滚日志模式，sqlite3 默认的5秒超时"""
+    PRAGMAS = ('journal_mode=DELETE', 'synchronous=FULL')
+
+    def get_connection(self):
+        if not hasattr(self.local, 'conn'):
+            self.local.conn = sqlite3.connect(self.db_path)
+            self.local.conn.execute('PRAGMA synchronous=FULL')
+        return self.local.conn
+
+
+MANAGERS = {'rollback': RollbackJournalDatabaseManager, 'wal': DatabaseManager}
+
+
+def open_manager(mode, db_path):
+    """在子进程中打开数据库，表结构已由父进程创建，这里只建立连接"""
+    db = MANAGERS[mode].__new__(MANAGERS[mode])
+    db.db_path = db_path
+    db.local = threading.local()
+    return db
+
+
+def writer(mode, db_path, dorms, deadline, queue):
+    written, locked, day = 0, 0, 0
+    db = open_manager(mode, db_path)
+    try:
+        while time.time() < deadline:
+            day += 1
+            batch = [(str(d), f"dorm-{d}", random.uniform(0, 200)) for d in range(dorms)]
+            try:
+                written += db.save_records_bulk(batch, query_time=datetime(2020, 1, 1) + timedelta(days=day))
+            except sqlite3.OperationalError:
+                locked += 1
+    finally:
+        db.close()
+        queue.put(('writer', written, locked, []))
+
+
+def reader(mode, db_path, dorms, deadline, queue):
+    latencies, locked = [], 0
+    db = open_manager(mode, db_path)
+    try:
+        while time.time() < deadline:
+            begin = time.perf_counter()
+            try:
+                db.get_records_by_dorm_id(str(random.randrange(dorms)))
+                latencies.append(time.perf_counter() - begin)
+            except sqlite3.OperationalError:
+                locked += 1
+    finally:
+        db.close()
+        queue.put(('reader', len(latencies), locked, latencies))
+
+
+def run(mode, readers, seconds, dorms):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'stress.db')
+        db = MANAGERS[mode](db_path=db_path)
+        for pragma in MANAGERS[mode].PRAGMAS:
+            db.get_connection().execute(f'PRAGMA {pragma}')
+        db.close()
+        queue = multiprocessing.Queue()
+        deadline = time.time() + seconds
+        procs = [multiprocessing.Process(target=writer, args=(mode, db_path, dorms, deadline, queue))]
+        procs += [multiprocessing.Process(target=reader, args=(mode, db_path, dorms, deadline, queue))
+                  for _ in range(readers)]
+        for proc in procs:
+            proc.start()
+        results = [queue.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+
+    writes = sum(r[1] for r in results if r[0] == 'writer')
+    write_errors = sum(r[2] for r in results if r[0] == 'writer')
+    reads = sum(r[1] for r in results if r[0] == 'reader')
+    read_errors = sum(r[2] for r in results if r[0] == 'reader')
+    latencies = sorted(l for r in results for l in r[3]) or [0.0]
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"{mode:<10}{writes:>10}{write_errors:>10}{reads:>12}{read_errors:>10}"
+          f"{latencies[len(latencies) // 2] * 1000:>12.2f}{p99:>12.2f}{latencies[-1] * 1000:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程数据库并发压力测试")
+    parser.add_argument("--readers", type=int, default=5, help="读取进程数（模拟桌面摆件）")
+    parser.add_argument("--seconds", type=float, default=10, help="每种模式的运行时间")
+    parser.add_argument("--dorms", type=int, default=200, help="每批写入的宿舍数")
+    args = parser.parse_args()
+
+    print(f"{'模式':<10}{'写入行数':>8}{'写锁错误':>6}{'读取次数':>10}{'读锁错误':>6}"
+          f"{'读p50(ms)':>12}{'读p99(ms)':>12}{'读max(ms)':>12}")
+    for mode in ('rollback', 'wal'):
+        run(mode, args.readers, args.seconds, args.dorms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# 用电分析模块
+import numpy as np
+
+from database import RECHARGE_THRESHOLD
+
+
+class ConsumptionAnalytics:
+    """
+    一个宿舍历史读数的分析缓存。
+
+    构造时把 (iso_time, power) 记录一次性解析为 NumPy 数组，之后所有图表
+    都基于这些数组计算；各统计粒度的重采样结果也会被缓存，切换粒度时不再重新解析。
+    """
+
+    def __init__(self, records, recharge_threshold=RECHARGE_THRESHOLD):
+        if records:
+            times = np.array([rec[0] for rec in records], dtype='datetime64[s]')
+            powers = np.array([rec[1] for rec in records], dtype='float64')
+            order = np.argsort(times, kind='stable')
+            self.times, self.powers = times[order], powers[order]
+        else:
+            self.times = np.array([], dtype='datetime64[s]')
+            self.powers = np.array([], dtype='float64')
+
+        # 相邻读数之间的变化量：下降为用电，上升超过阈值为充值，两者分开统计
+        deltas = np.diff(self.powers)
+        self.recharge_mask = deltas > recharge_threshold
+        self.consumption = np.where(deltas < 0, -deltas, 0.0)
+        self.consumption[self.recharge_mask] = 0.0
+        self._resample_cache = {}
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def recharge_times(self):
+        """检测到充值的读数时间"""
+        return self.times[1:][self.recharge_mask]
+
+    def consumption_by_interval(self, interval_hours):
+        """
+        按固定时长（小时）统计用电量，返回 (区间开始时间数组, 用电量数组)，只保留有消耗的区间。
+        区间与零点对齐，结果按粒度缓存。
+        """
+        if interval_hours in self._resample_cache:
+            return self._resample_cache[interval_hours]
+
+        if len(self.consumption) == 0:
+            result = (np.array([], dtype='datetime64[s]'), np.array([], dtype='float64'))
+        else:
+            width = np.timedelta64(int(interval_hours * 3600), 's')
+            # 用电量归属于区间结束时的读数时间
+            end_times = self.times[1:]
+            origin = end_times[0].astype('datetime64[D]').astype('datetime64[s]')
+            bins = ((end_times - origin) // width).astype(np.int64)
+            sums = np.bincount(bins, weights=self.consumption)
+            starts = origin + np.arange(len(sums)) * width
+            keep = sums > 0
+            result = (starts[keep], sums[keep])
+
+        self._resample_cache[interval_hours] = result
+        return result
+
+    def remaining_since(self, start_time):
+        """返回 start_time 之后的 (时间数组, 剩余电量数组)"""
+        start = np.datetime64(start_time, 's')
+        mask = self.times >= start
+        return self.times[mask], self.powers[mask]
@@ -22,6 +22,7 @@ class ConfigManager:
         self.config['Window'] = {'geometry': '900x800'}
         self.config['Widget'] = {'style': '默认'}
         self.config['Credentials'] = {'username': '', 'password': ''} # 新增
+        self.config['Cache'] = {'reading_ttl_seconds': '600'}
         self.save_config()
 
     def get_setting(self, section, option, fallback=None):
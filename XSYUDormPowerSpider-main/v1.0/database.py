@@ -1,22 +1,89 @@
 # 数据库操作模块
+# linux-service/database.py 是本文件去掉桌面专用表后的精简版本，修改读数、用电统计和迁移时需同步修改
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 import threading
 
+# 数据库结构版本，每次迁移后递增（保存在 PRAGMA user_version 中）
+SCHEMA_VERSION = 6
+
+# 用电速率统计参数
+RATE_MIN_INTERVAL_DAYS = 0.25   # 两次读数间隔不足6小时时不更新速率，避免读数精度带来的噪声
+RATE_HALF_LIFE_DAYS = 3.0       # 指数加权平均的半衰期：3天前的速率权重减半
+RECHARGE_THRESHOLD = 0.5        # 电量上升超过该值(度)视为一次充值
+
+
+def advance_consumption_stats(stats, query_time, power):
+    """
+    用一条新读数更新宿舍的用电统计，O(1) 时间。
+
+    stats 为 get_consumption_stats 返回的字典（或 None），返回更新后的新字典。
+    日均用电速率采用按时间加权的指数移动平均，以 anchor_time/anchor_power
+    作为上一次计算速率的起点；电量上升视为充值，只记录充值并以新电量为起点，
+    不影响已有的用电速率。
+    """
+    now_str = query_time.isoformat(sep=' ')
+    if stats is None:
+        return {'anchor_time': now_str, 'anchor_power': power, 'latest_time': now_str, 'latest_power': power,
+                'daily_rate': None, 'rate_samples': 0, 'last_recharge_time': None, 'last_recharge_amount': None}
+
+    stats = dict(stats)
+    recharge = power - stats['latest_power']
+    stats.update(latest_time=now_str, latest_power=power)
+
+    if recharge > RECHARGE_THRESHOLD:
+        stats.update(anchor_time=now_str, anchor_power=power,
+                     last_recharge_time=now_str, last_recharge_amount=recharge)
+        return stats
+
+    elapsed_days = (query_time - datetime.fromisoformat(stats['anchor_time'])).total_seconds() / 86400
+    if elapsed_days >= RATE_MIN_INTERVAL_DAYS:
+        sample_rate = max(0.0, stats['anchor_power'] - power) / elapsed_days
+        if stats['daily_rate'] is None:
+            stats['daily_rate'] = sample_rate
+        else:
+            alpha = 1 - 0.5 ** (elapsed_days / RATE_HALF_LIFE_DAYS)
+            stats['daily_rate'] += alpha * (sample_rate - stats['daily_rate'])
+        stats['rate_samples'] += 1
+        stats.update(anchor_time=now_str, anchor_power=power)
+    return stats
+
+
 class DatabaseManager:
-    def __init__(self, db_name='electricity_data.db'):
-        app_dir = os.path.join(os.path.expanduser('~'), '.XSYUDormPowerSpider')
-        if not os.path.exists(app_dir):
-            os.makedirs(app_dir)
-        self.db_path = os.path.join(app_dir, db_name)
+    # 每个连接建立时设置的 PRAGMA：
+    # WAL 模式下读写互不阻塞，主程序、各个桌面摆件进程可以同时访问同一个数据库；
+    # WAL 下 synchronous=NORMAL 仍能保证数据库不损坏，且每次提交无需 fsync；
+    # busy_timeout 让偶发的写锁冲突等待重试，而不是立即报 "database is locked"。
+    BUSY_TIMEOUT_MS = 5000
+    PRAGMAS = (
+        'journal_mode=WAL',
+        'synchronous=NORMAL',
+        f'busy_timeout={BUSY_TIMEOUT_MS}',
+        'mmap_size=67108864',   # 64MB 内存映射读取
+        'cache_size=-8192',     # 8MB 页缓存
+        'temp_store=MEMORY',
+    )
+
+    def __init__(self, db_name='electricity_data.db', db_path=None):
+        if db_path is None:
+            app_dir = os.path.join(os.path.expanduser('~'), '.XSYUDormPowerSpider')
+            if not os.path.exists(app_dir):
+                os.makedirs(app_dir)
+            db_path = os.path.join(app_dir, db_name)
+        elif os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
         self.local = threading.local()  # 使用线程局部存储
         self.init_database()
 
     def get_connection(self):
         """为每个线程获取独立的数据库连接"""
         if not hasattr(self.local, 'conn'):
-            self.local.conn = sqlite3.connect(self.db_path)
+            conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT_MS / 1000)
+            for pragma in self.PRAGMAS:
+                conn.execute(f'PRAGMA {pragma}')
+            self.local.conn = conn
         return self.local.conn
 
     def init_database(self):
@@ -32,33 +99,188 @@ class DatabaseManager:
                 power REAL
             )
         ''')
+        self.migrate(conn)
         conn.commit()
 
+    def migrate(self, conn):
+        """根据 user_version 依次执行尚未执行过的结构迁移"""
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version < 1:
+            # 按宿舍+时间建立复合索引，使按宿舍查询和按时间范围查询都能走索引
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_records_dorm_time
+                ON electricity_records (dorm_id, query_time)
+            ''')
+        if version < 2:
+            # 增加记录日期列，并以 (宿舍, 日期) 作为唯一键，由数据库保证每天只保存一条记录
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(electricity_records)')]
+            if 'record_date' not in columns:
+                conn.execute('ALTER TABLE electricity_records ADD COLUMN record_date TEXT')
+            conn.execute('UPDATE electricity_records SET record_date = substr(query_time, 1, 10) WHERE record_date IS NULL')
+            # 并发写入时可能产生同日重复记录：主表只保留当天最早的一条，
+            # 其余记录原样移到 electricity_records_duplicates 表中保存，不删除任何数据
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS electricity_records_duplicates (
+                    id INTEGER PRIMARY KEY,
+                    dorm_id TEXT,
+                    dorm_name TEXT,
+                    query_time DATETIME,
+                    power REAL,
+                    record_date TEXT
+                )
+            ''')
+            duplicates = '''
+                id NOT IN (SELECT MIN(id) FROM electricity_records GROUP BY dorm_id, record_date)
+            '''
+            conn.execute(f'''
+                INSERT OR IGNORE INTO electricity_records_duplicates (id, dorm_id, dorm_name, query_time, power, record_date)
+                SELECT id, dorm_id, dorm_name, query_time, power, record_date FROM electricity_records
+                WHERE {duplicates}
+            ''')
+            conn.execute(f'DELETE FROM electricity_records WHERE {duplicates}')
+            conn.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_records_dorm_date
+                ON electricity_records (dorm_id, record_date)
+            ''')
+        if version < 3:
+            # 官方历史读数（来自 settlementlist.aspx），按 (宿舍, 抄表时间) 去重
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS official_history (
+                    dorm_id TEXT NOT NULL,
+                    read_time TEXT NOT NULL,
+                    power REAL,
+                    PRIMARY KEY (dorm_id, read_time)
+                ) WITHOUT ROWID
+            ''')
+        if version < 4:
+            # 每个宿舍的滚动用电统计，读数保存时增量更新，预测时直接读取
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS consumption_stats (
+                    dorm_id TEXT PRIMARY KEY,
+                    anchor_time TEXT,
+                    anchor_power REAL,
+                    latest_time TEXT,
+                    latest_power REAL,
+                    daily_rate REAL,
+                    rate_samples INTEGER,
+                    last_recharge_time TEXT,
+                    last_recharge_amount REAL
+                )
+            ''')
+            # 用已有的历史记录回放一次，生成初始统计
+            all_stats = {}
+            for dorm_id, query_time, power in conn.execute(
+                    'SELECT dorm_id, query_time, power FROM electricity_records ORDER BY dorm_id, query_time'):
+                try:
+                    all_stats[dorm_id] = advance_consumption_stats(
+                        all_stats.get(dorm_id), datetime.fromisoformat(query_time), power)
+                except (TypeError, ValueError):
+                    continue
+            for dorm_id, stats in all_stats.items():
+                self._write_consumption_stats(conn, dorm_id, stats)
+        if version < 5:
+            # 最近一次读数缓存，供同一台电脑上的主程序和摆件共享；时间为 Unix 时间戳
+            # lease_until 为正在抓取该宿舍的进程持有的租约，用于合并多个进程的并发抓取
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS reading_cache (
+                    dorm_id TEXT NOT NULL,
+                    dorm_type TEXT NOT NULL,
+                    power_text TEXT,
+                    fetched_at REAL,
+                    lease_until REAL,
+                    PRIMARY KEY (dorm_id, dorm_type)
+                ) WITHOUT ROWID
+            ''')
+        if version < 6:
+            # 低电量通知的冷却期：保存到期时间（Unix 时间戳），服务重启后仍然有效
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS notification_cooldowns (
+                    dorm_id TEXT PRIMARY KEY,
+                    expires_at REAL NOT NULL
+                ) WITHOUT ROWID
+            ''')
+        if version < SCHEMA_VERSION:
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    @staticmethod
+    def _day_range(date_str):
+        """
+        返回某天的 [开始, 次日开始) 字符串区间。
+        query_time 以 'YYYY-MM-DD HH:MM:SS' 格式存储，直接比较字符串即可，
+        避免在 WHERE 中对列使用 DATE() 导致索引失效。
+        """
+        day = datetime.strptime(date_str[:10], '%Y-%m-%d')
+        return day.strftime('%Y-%m-%d'), (day + timedelta(days=1)).strftime('%Y-%m-%d')
+
     def should_save_daily_record(self, dorm_id):
         """检查今天是否已经为该宿舍记录过数据"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        today = datetime.now().strftime('%Y-%m-%d')
+        day_start, day_end = self._day_range(datetime.now().strftime('%Y-%m-%d'))
         cursor.execute('''
             SELECT 1 FROM electricity_records 
-            WHERE dorm_id = ? AND DATE(query_time) = ?
+            WHERE dorm_id = ? AND query_time >= ? AND query_time < ?
             LIMIT 1
-        ''', (dorm_id, today))
+        ''', (dorm_id, day_start, day_end))
         return cursor.fetchone() is None
 
     def save_record(self, dorm_id, dorm_name, power):
-        """保存一条新的电量记录"""
-        if self.should_save_daily_record(dorm_id):
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            query_time = datetime.now()
-            cursor.execute('''
-                INSERT INTO electricity_records (dorm_id, dorm_name, query_time, power)
-                VALUES (?, ?, ?, ?)
-            ''', (dorm_id, dorm_name, query_time, power))
-            conn.commit()
-            return True
-        return False
+        """保存一条新的电量记录（每个宿舍每天只保存一条），返回是否实际写入"""
+        return self.save_records_bulk([(dorm_id, dorm_name, power)]) == 1
+
+    def save_records_bulk(self, records, query_time=None):
+        """
+        在一个事务中批量保存电量记录，用于一次保存整轮轮询的结果。
+
+        Args:
+            records: (dorm_id, dorm_name, power) 元组的可迭代对象
+            query_time: 记录时间，默认为当前时间
+
+        Returns:
+            int: 实际写入的记录数（当天已有记录的宿舍会被跳过）
+        """
+        query_time = query_time or datetime.now()
+        record_date = query_time.strftime('%Y-%m-%d')
+        rows = [(dorm_id, dorm_name, query_time, record_date, power) for dorm_id, dorm_name, power in records]
+        if not rows:
+            return 0
+        conn = self.get_connection()
+        with conn:
+            before = conn.total_changes
+            conn.executemany('''
+                INSERT INTO electricity_records (dorm_id, dorm_name, query_time, record_date, power)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (dorm_id, record_date) DO NOTHING
+            ''', rows)
+            inserted = conn.total_changes - before
+            # 无论当天是否已有记录，每条读数都用于更新用电统计
+            for dorm_id, _, _, _, power in rows:
+                stats = advance_consumption_stats(self._read_consumption_stats(conn, dorm_id), query_time, power)
+                self._write_consumption_stats(conn, dorm_id, stats)
+        return inserted
+
+    _STATS_COLUMNS = ('anchor_time', 'anchor_power', 'latest_time', 'latest_power',
+                      'daily_rate', 'rate_samples', 'last_recharge_time', 'last_recharge_amount')
+
+    def _read_consumption_stats(self, conn, dorm_id):
+        row = conn.execute(
+            f'SELECT {", ".join(self._STATS_COLUMNS)} FROM consumption_stats WHERE dorm_id = ?', (dorm_id,)
+        ).fetchone()
+        return dict(zip(self._STATS_COLUMNS, row)) if row else None
+
+    def _write_consumption_stats(self, conn, dorm_id, stats):
+        conn.execute(f'''
+            INSERT OR REPLACE INTO consumption_stats (dorm_id, {", ".join(self._STATS_COLUMNS)})
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (dorm_id, *(stats[column] for column in self._STATS_COLUMNS)))
+
+    def get_consumption_stats(self, dorm_id):
+        """
+        获取宿舍的滚动用电统计，没有记录时返回 None。
+        返回字典包含：latest_time, latest_power（最新读数）, daily_rate(度/天，数据不足时为None),
+        rate_samples, last_recharge_time, last_recharge_amount，以及计算速率用的 anchor_time, anchor_power
+        """
+        return self._read_consumption_stats(self.get_connection(), dorm_id)
 
     def get_records_by_dorm_id(self, dorm_id, start_date=None, end_date=None):
         """根据宿舍ID和可选的日期范围获取历史记录"""
@@ -72,20 +294,116 @@ class DatabaseManager:
         params = [dorm_id]
 
         if start_date:
-            query += ' AND DATE(query_time) >= ?'
-            params.append(start_date)
+            query += ' AND query_time >= ?'
+            params.append(self._day_range(start_date)[0])
         
         if end_date:
-            query += ' AND DATE(query_time) <= ?'
-            params.append(end_date)
+            query += ' AND query_time < ?'
+            params.append(self._day_range(end_date)[1])
             
         query += ' ORDER BY query_time ASC' # 按时间升序排列，方便绘图
 
         cursor.execute(query, tuple(params))
         return cursor.fetchall()
 
+    def get_official_history_high_water_mark(self, dorm_id):
+        """返回该宿舍已保存的最新官方抄表时间（ISO格式字符串），没有记录时返回 None"""
+        conn = self.get_connection()
+        row = conn.execute(
+            'SELECT MAX(read_time) FROM official_history WHERE dorm_id = ?', (dorm_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def save_official_history(self, dorm_id, records):
+        """
+        写入官方历史读数，已存在的抄表时间会被更新。
+        records 为 (iso_time, power) 列表，返回写入的记录数。
+        """
+        if not records:
+            return 0
+        conn = self.get_connection()
+        with conn:
+            conn.executemany('''
+                INSERT INTO official_history (dorm_id, read_time, power) VALUES (?, ?, ?)
+                ON CONFLICT (dorm_id, read_time) DO UPDATE SET power = excluded.power
+            ''', [(dorm_id, read_time, power) for read_time, power in records])
+        return len(records)
+
+    def get_official_history(self, dorm_id, start_time=None):
+        """获取已保存的官方历史读数，返回按时间升序排列的 (iso_time, power) 列表"""
+        conn = self.get_connection()
+        query = 'SELECT read_time, power FROM official_history WHERE dorm_id = ?'
+        params = [dorm_id]
+        if start_time:
+            query += ' AND read_time >= ?'
+            params.append(start_time)
+        query += ' ORDER BY read_time ASC'
+        return conn.execute(query, tuple(params)).fetchall()
+
+    def get_cached_reading(self, dorm_id, dorm_type):
+        """返回缓存的 (power_text, fetched_at, lease_until)，没有缓存时返回 None"""
+        conn = self.get_connection()
+        return conn.execute(
+            'SELECT power_text, fetched_at, lease_until FROM reading_cache WHERE dorm_id = ? AND dorm_type = ?',
+            (dorm_id, dorm_type)
+        ).fetchone()
+
+    def save_cached_reading(self, dorm_id, dorm_type, power_text, fetched_at):
+        """写入最新读数并释放抓取租约"""
+        conn = self.get_connection()
+        with conn:
+            conn.execute('''
+                INSERT INTO reading_cache (dorm_id, dorm_type, power_text, fetched_at, lease_until)
+                VALUES (?, ?, ?, ?, NULL)
+                ON CONFLICT (dorm_id, dorm_type) DO UPDATE SET
+                    power_text = excluded.power_text, fetched_at = excluded.fetched_at, lease_until = NULL
+            ''', (dorm_id, dorm_type, power_text, fetched_at))
+
+    def acquire_reading_lease(self, dorm_id, dorm_type, now, lease_seconds):
+        """
+        尝试获取某个宿舍的抓取租约，没有其他进程持有未过期的租约时成功。
+        获取与检查在同一条语句中完成，多个进程同时调用时只有一个会成功。
+        """
+        conn = self.get_connection()
+        with conn:
+            before = conn.total_changes
+            conn.execute('''
+                INSERT INTO reading_cache (dorm_id, dorm_type, lease_until) VALUES (?, ?, ?)
+                ON CONFLICT (dorm_id, dorm_type) DO UPDATE SET lease_until = excluded.lease_until
+                WHERE reading_cache.lease_until IS NULL OR reading_cache.lease_until < ?
+            ''', (dorm_id, dorm_type, now + lease_seconds, now))
+            return conn.total_changes > before
+
+    def release_reading_lease(self, dorm_id, dorm_type):
+        """抓取失败时释放租约，让其他进程可以立即重试"""
+        conn = self.get_connection()
+        with conn:
+            conn.execute('UPDATE reading_cache SET lease_until = NULL WHERE dorm_id = ? AND dorm_type = ?',
+                         (dorm_id, dorm_type))
+
+    def load_notification_cooldowns(self, now):
+        """返回尚未到期的通知冷却期 {dorm_id: expires_at}"""
+        conn = self.get_connection()
+        return dict(conn.execute(
+            'SELECT dorm_id, expires_at FROM notification_cooldowns WHERE expires_at > ?', (now,)))
+
+    def set_notification_cooldown(self, dorm_id, expires_at):
+        """记录某个宿舍的通知冷却期到期时间"""
+        conn = self.get_connection()
+        with conn:
+            conn.execute('''
+                INSERT INTO notification_cooldowns (dorm_id, expires_at) VALUES (?, ?)
+                ON CONFLICT (dorm_id) DO UPDATE SET expires_at = excluded.expires_at
+            ''', (dorm_id, expires_at))
+
+    def prune_notification_cooldowns(self, now):
+        """删除已到期的冷却记录，返回删除的数量"""
+        conn = self.get_connection()
+        with conn:
+            return conn.execute('DELETE FROM notification_cooldowns WHERE expires_at <= ?', (now,)).rowcount
+
     def close(self):
         """关闭当前线程的数据库连接"""
         if hasattr(self.local, 'conn'):
             self.local.conn.close()
-            del self.local.conn
\ No newline at end of file
+            del self.local.conn
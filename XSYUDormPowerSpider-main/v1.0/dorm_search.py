@@ -0,0 +1,230 @@
+# 宿舍搜索索引模块
+import heapq
+import re
+import threading
+import time
+from collections import defaultdict
+
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:  # 拼音首字母检索为可选功能
+    lazy_pinyin = None
+
+# 模糊打分时最多考察的候选数量，以及结果的最低分数
+MAX_FUZZY_CANDIDATES = 200
+MIN_SCORE = 70
+
+# 后台搜索的防抖时长（秒）：输入停顿超过该时长才开始查询
+SEARCH_DEBOUNCE_SECONDS = 0.08
+
+_BUILDING_PATTERN = re.compile(r'(\d+)\s*号?\s*楼')
+_DIGITS_PATTERN = re.compile(r'\d+')
+
+
+def normalize(text):
+    """统一大小写、去掉空白和分隔符，用于建立和查询 n-gram 索引"""
+    return re.sub(r'[\s\-_—－]+', '', text).lower()
+
+
+def trigrams(text):
+    """返回文本的 3-gram 集合（不足3个字符时返回整个文本）"""
+    if len(text) < 3:
+        return {text} if text else set()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def pinyin_initials(text):
+    """返回中文文本的拼音首字母（未安装 pypinyin 时返回空字符串）"""
+    if lazy_pinyin is None:
+        return ''
+    return ''.join(lazy_pinyin(text, style=Style.FIRST_LETTER)).lower()
+
+
+class DormSearchIndex:
+    """
+    宿舍名称搜索索引，启动时构建一次。
+
+    - 楼号、房间号前缀的倒排表：处理 "11-123"、"11号楼"、"101" 这类结构化输入；
+    - 3-gram 倒排表：处理其他输入，先用 n-gram 召回少量候选，再只对候选做模糊打分；
+    - 不足3个字符的输入（如 "楼"、"号楼"）无法用 3-gram 召回，直接对所有名称做子串查找；
+    - 可选的拼音首字母：安装 pypinyin 后可用首字母检索楼名。
+    """
+
+    def __init__(self, catalog):
+        """
+        catalog 为 dorm_catalog.DormCatalog，名称格式为 '楼名-房间号'。
+        索引中只保存名称和下标，结果字典在返回时才从目录中取出。
+        """
+        self.catalog = catalog
+        self.names = catalog.names()
+        self.building_postings = defaultdict(list)
+        self.room_prefix_postings = defaultdict(list)
+        self.trigram_postings = defaultdict(list)
+        self.search_keys = []
+
+        for idx, name in enumerate(self.names):
+            building, _, room = name.rpartition('-')
+            building_number = _DIGITS_PATTERN.search(building)
+            if building_number:
+                self.building_postings[building_number.group()].append(idx)
+            room = room.strip()
+            for end in range(1, len(room) + 1):
+                self.room_prefix_postings[room[:end]].append(idx)
+            keys = normalize(name)
+            initials = pinyin_initials(building)
+            initials_keys = normalize(initials + room) if initials else ''
+            for gram in trigrams(keys) | trigrams(initials_keys):
+                self.trigram_postings[gram].append(idx)
+            # 子串查找用的键：名称与拼音首字母之间用 \0 分隔，避免跨越两者匹配
+            self.search_keys.append(f"{keys}\0{initials_keys}" if initials_keys else keys)
+
+    def search(self, query, limit=50):
+        """返回匹配的宿舍字典列表，按相关度排序"""
+        query = query.strip()
+        if not query:
+            return []
+        indices = self._structured_match(query)
+        if indices is None:
+            return self._fuzzy_match(query, limit)
+        return [self.catalog.entry(idx) for idx in indices[:limit]]
+
+    def _structured_match(self, query):
+        """
+        按楼号/房间号解析输入；输入不是纯数字结构时返回 None，交给模糊匹配。
+        """
+        if re.search(r'[^\d\s\-_—－号楼]', query):
+            return None
+        building_match = _BUILDING_PATTERN.search(query)
+        rest = query
+        building = None
+        if building_match:
+            building = building_match.group(1)
+            rest = query[building_match.end():]
+
+        numbers = _DIGITS_PATTERN.findall(rest)
+        if building is None:
+            if not numbers:
+                return None
+            if len(numbers) >= 2:
+                building, room_prefix = numbers[0], numbers[1]
+            else:
+                # 单独一个数字既可能是楼号，也可能是房间号前缀
+                single = numbers[0]
+                by_building = set(self.building_postings.get(single, ()))
+                by_room = set(self.room_prefix_postings.get(single, ()))
+                return sorted(by_building | by_room, key=lambda idx: (idx not in by_building, idx))
+        else:
+            room_prefix = numbers[0] if numbers else ''
+
+        in_building = self.building_postings.get(building, [])
+        if not room_prefix:
+            return list(in_building)
+        with_room = set(self.room_prefix_postings.get(room_prefix, []))
+        return [idx for idx in in_building if idx in with_room]
+
+    def _fuzzy_match(self, query, limit):
+        """n-gram 召回候选，再对候选做模糊打分"""
+        from thefuzz import process
+
+        normalized = normalize(query)
+        if len(normalized) < 3:
+            return self._substring_match(normalized, limit)
+        counts = defaultdict(int)
+        for gram in trigrams(normalized):
+            for idx in self.trigram_postings.get(gram, ()):
+                counts[idx] += 1
+        if not counts:
+            return []
+        candidates = sorted(counts, key=lambda idx: (-counts[idx], idx))[:MAX_FUZZY_CANDIDATES]
+        choices = {idx: self.names[idx] for idx in candidates}
+        results = process.extract(query, choices, limit=limit)
+        return [self.catalog.entry(idx) for _, score, idx in results if score > MIN_SCORE]
+
+    def _substring_match(self, normalized, limit):
+        """短输入的回退：查找包含该子串的名称，匹配位置越靠前越优先"""
+        if not normalized:
+            return []
+        hits = ((key.find(normalized), idx) for idx, key in enumerate(self.search_keys) if normalized in key)
+        return [self.catalog.entry(idx) for _, idx in heapq.nsmallest(limit, hits)]
+
+
+class SearchWorker:
+    """
+    后台搜索线程。
+
+    每次按键调用 submit()，只保留最新的一次查询；输入停顿 debounce 秒后才真正查询，
+    查询期间又有新输入时丢弃旧结果。索引在后台线程中首次查询时构建，不占用启动时间。
+    回调在后台线程中调用，参数为 (generation, query, results)，界面需自行切回主线程，
+    并可用 is_current(generation) 判断结果是否已过期。
+    """
+
+    def __init__(self, index_factory, debounce=SEARCH_DEBOUNCE_SECONDS, limit=50):
+        self._index_factory = index_factory
+        self._index = None
+        self.debounce = debounce
+        self.limit = limit
+        self._condition = threading.Condition()
+        self._pending = None
+        self._submitted_at = 0.0
+        self._generation = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="dorm-search", daemon=True)
+        self._thread.start()
+
+    def submit(self, query, callback):
+        """提交一次查询，返回本次查询的序号"""
+        with self._condition:
+            self._generation += 1
+            self._pending = (self._generation, query, callback)
+            self._submitted_at = time.monotonic()
+            self._condition.notify()
+            return self._generation
+
+    def cancel(self):
+        """取消尚未完成的查询，已在进行中的查询结果也会被视为过期"""
+        with self._condition:
+            self._generation += 1
+            self._pending = None
+
+    def is_current(self, generation):
+        with self._condition:
+            return generation == self._generation
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._pending = None
+            self._condition.notify()
+
+    def _next_query(self):
+        """等待一次输入停顿后的查询，关闭时返回 None"""
+        with self._condition:
+            while True:
+                if self._closed:
+                    return None
+                if self._pending is None:
+                    self._condition.wait()
+                    continue
+                remaining = self._submitted_at + self.debounce - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                pending, self._pending = self._pending, None
+                return pending
+
+    def _run(self):
+        while True:
+            pending = self._next_query()
+            if pending is None:
+                return
+            generation, query, callback = pending
+            if not self.is_current(generation):
+                continue
+            try:
+                if self._index is None:
+                    self._index = self._index_factory()
+                results = self._index.search(query, limit=self.limit)
+            except Exception:
+                results = []
+            if self.is_current(generation):
+                callback(generation, query, results)
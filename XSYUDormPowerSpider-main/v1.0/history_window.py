@@ -0,0 +1,229 @@
+# 历史用电分析窗口（图表依赖 matplotlib 和 NumPy，由主程序在首次打开时才导入本模块）
+import threading
+import tkinter as tk
+from tkinter import messagebox
+from datetime import datetime, timedelta
+import ttkbootstrap as ttk
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import matplotlib.dates as mdates
+
+try:
+    plt.rcParams['font.sans-serif'] = ['SimHei']
+    plt.rcParams['axes.unicode_minus'] = False
+except Exception as e:
+    print(f"设置中文字体失败: {e}")
+
+from utils import predict_remaining_days
+from analytics import ConsumptionAnalytics
+
+class ChartDrawer:
+    """用于绘制图表的基类，采用延迟初始化来避免资源泄露"""
+    def __init__(self, master_tab, style):
+        self.master = master_tab
+        self.style = style
+        self.fig, self.ax, self.canvas, self.line = None, None, None, None
+
+    def _initialize_chart(self):
+        """延迟初始化图表和画布，仅在需要时调用。"""
+        if self.canvas is None:
+            self.fig, self.ax = plt.subplots(figsize=(10, 5))
+            self.canvas = FigureCanvasTkAgg(self.fig, master=self.master)
+            self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+            self._setup_hover_annotation()
+
+    def _setup_hover_annotation(self):
+        """设置鼠标悬停注释的通用逻辑"""
+        annot = self.ax.annotate("", xy=(0,0), xytext=(20,20), textcoords="offset points",
+                                 bbox=dict(boxstyle="round", fc="w", ec="k", lw=1),
+                                 arrowprops=dict(arrowstyle="->"))
+        annot.set_visible(False)
+
+        def update_annotation(ind):
+            if self.line is None: return
+            pos = self.line.get_xydata()[ind["ind"][0]]
+            annot.xy = pos
+            annot.set_text(self.format_hover_text(pos))
+            annot.get_bbox_patch().set_alpha(0.8)
+
+        def on_hover(event):
+            if event.inaxes == self.ax and self.line:
+                contains, ind = self.line.contains(event)
+                if contains:
+                    update_annotation(ind)
+                    annot.set_visible(True)
+                    self.fig.canvas.draw_idle()
+                elif annot.get_visible():
+                    annot.set_visible(False)
+                    self.fig.canvas.draw_idle()
+        
+        self.fig.canvas.mpl_connect("motion_notify_event", on_hover)
+
+    def format_hover_text(self, pos):
+        """格式化悬停时显示的文本（由子类实现）"""
+        raise NotImplementedError
+
+    def draw(self, data):
+        self._initialize_chart() # 确保图表已创建
+        self.ax.clear()
+        # 子类将在这里实现具体的绘图逻辑
+        self.canvas.draw()
+        
+class ConsumptionChart(ChartDrawer):
+    """用电量消耗分析图表"""
+    def format_hover_text(self, pos):
+        date_str = mdates.num2date(pos[0]).strftime('%Y-%m-%d %H:%M')
+        return f"截至 {date_str}\n消耗: {pos[1]:.2f} 度"
+
+    def draw(self, data):
+        self._initialize_chart()
+        self.ax.clear()
+
+        if data is None or len(data[0]) == 0:
+            self.ax.text(0.5, 0.5, "当前粒度无消耗数据", ha='center', va='center', fontsize=12)
+            self.line = None
+        else:
+            times, values = data
+            self.line, = self.ax.plot(times, values, marker='o', linestyle='-', color=self.style.colors.primary)
+        
+        self.ax.set_title('每小时用电量消耗', fontsize=16)
+        self.ax.set_xlabel('日期时间', fontsize=12)
+        self.ax.set_ylabel('消耗电量 (度)', fontsize=12)
+        self.ax.grid(True, which='both', linestyle='--', linewidth=0.5)
+        self.fig.autofmt_xdate()
+        self.fig.tight_layout()
+        self.canvas.draw()
+
+class RemainingChart(ChartDrawer):
+    """剩余电量趋势图表"""
+    def format_hover_text(self, pos):
+        date_str = mdates.num2date(pos[0]).strftime('%Y-%m-%d %H:%M')
+        return f"{date_str}\n剩余: {pos[1]:.2f} 度"
+    
+    def draw(self, data):
+        self._initialize_chart()
+        self.ax.clear()
+
+        if data is None or len(data[0]) == 0:
+            self.ax.text(0.5, 0.5, "无剩余电量历史数据", ha='center', va='center', fontsize=12)
+            self.line = None
+        else:
+            times, powers = data
+            self.line, = self.ax.plot(times, powers, marker='o', linestyle='-', color=self.style.colors.info)
+        
+        self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d %H:%M'))
+        self.ax.set_title('历史剩余电量趋势', fontsize=16)
+        self.ax.set_xlabel('日期时间', fontsize=12)
+        self.ax.set_ylabel('剩余电量 (度)', fontsize=12)
+        self.ax.grid(True, which='both', linestyle='--', linewidth=0.5)
+        self.fig.autofmt_xdate()
+        self.fig.tight_layout()
+        self.canvas.draw()
+
+class HistoryAnalysisWindow(tk.Toplevel):
+    """一个独立的、用于显示历史数据分析的窗口，负责管理自己的资源。"""
+    def __init__(self, parent, dorm_name, dorm_id, scraper, db_manager, style, catalog):
+        super().__init__(parent)
+        self.title(f"{dorm_name} - 历史用电分析")
+        self.geometry("900x750")
+
+        self.scraper = scraper
+        self.db_manager = db_manager
+        self.analytics = None
+        self.style = style
+        self.dorm_id = dorm_id
+        self.catalog = catalog
+
+        # --- UI Setup ---
+        notebook = ttk.Notebook(self)
+        notebook.pack(fill=tk.BOTH, expand=tk.YES, padx=10, pady=10)
+
+        consumption_tab = ttk.Frame(notebook)
+        remaining_tab = ttk.Frame(notebook)
+        notebook.add(consumption_tab, text=' 用电量分析 ')
+        notebook.add(remaining_tab, text=' 剩余电量趋势 ')
+
+        control_frame = ttk.Frame(consumption_tab)
+        control_frame.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Label(control_frame, text="统计粒度:").pack(side=tk.LEFT, padx=(0, 10))
+        self.interval_var = tk.StringVar(value="24")
+        intervals = {"每日": "24", "每12小时": "12", "每6小时": "6"}
+        for text, value in intervals.items():
+            ttk.Radiobutton(control_frame, text=text, variable=self.interval_var, value=value).pack(side=tk.LEFT)
+        
+        chart_container = ttk.Frame(consumption_tab)
+        chart_container.pack(fill=tk.BOTH, expand=tk.YES)
+
+        prediction_frame = ttk.LabelFrame(self, text="💡 用电趋势预测", padding="15", bootstyle="success")
+        prediction_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        self.prediction_result_label = ttk.Label(prediction_frame, text="正在分析...", font=("微软雅黑", 14), bootstyle="inverse-success")
+        self.prediction_result_label.pack(pady=10)
+
+        self.consumption_chart = ConsumptionChart(chart_container, self.style)
+        self.remaining_chart = RemainingChart(remaining_tab, self.style)
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        threading.Thread(target=self.initial_load_and_draw, daemon=True).start()
+
+    def on_close(self):
+        """自定义关闭事件处理函数，确保Matplotlib图形对象被正确关闭以释放内存。"""
+        # 增加判断，确保 fig 存在才 close
+        if self.consumption_chart.fig:
+            plt.close(self.consumption_chart.fig)
+        if self.remaining_chart.fig:
+            plt.close(self.remaining_chart.fig)
+        self.destroy()
+
+    def update_prediction_display(self):
+        # 与主界面、摆件使用同一个预测（滚动用电统计），保证各处显示的剩余天数一致
+        status, result = predict_remaining_days(self.dorm_id, self.db_manager)
+        def _update_ui():
+            if status == 'predict': text = f"预测剩余电量大约还能使用: {result} 天"
+            elif status == 'sufficient': text = f"分析结果: {result}"
+            else: text = f"无法预测: {result}"
+            self.prediction_result_label.config(text=text)
+        self.after(0, _update_ui)
+
+    def initial_load_and_draw(self):
+        # 先用本地保存的官方历史数据立即绘图，再在后台只抓取比本地更新的记录
+        local_records = self.db_manager.get_official_history(self.dorm_id)
+        if local_records:
+            self.load_analytics(local_records)
+
+        since = self.db_manager.get_official_history_high_water_mark(self.dorm_id)
+        api_records, error_message = self.scraper.get_historical_power(
+            self.dorm_id, self.catalog.lookup(self.dorm_id)[1], since=since)
+        if error_message:
+            if not local_records:
+                self.update_prediction_display()
+                self.after(0, lambda: messagebox.showerror("加载失败", error_message, parent=self))
+                self.after(0, self.on_close) # 调用 on_close 来确保清理
+            return
+
+        if api_records:
+            self.db_manager.save_official_history(self.dorm_id, api_records)
+            self.load_analytics(self.db_manager.get_official_history(self.dorm_id))
+        elif not local_records:
+            self.update_prediction_display()
+            self.after(0, lambda: messagebox.showerror("加载失败", "未返回任何历史数据", parent=self))
+            self.after(0, self.on_close)
+
+    def load_analytics(self, records):
+        """一次性解析历史记录（在后台线程中），然后刷新预测和图表"""
+        self.analytics = ConsumptionAnalytics(records)
+        self.update_prediction_display()
+        self.after(0, self.draw_history)
+
+    def draw_history(self):
+        """用当前的分析缓存刷新两张图表，首次调用时绑定统计粒度的切换事件"""
+        fourteen_days_ago = datetime.now() - timedelta(days=14)
+        self.remaining_chart.draw(self.analytics.remaining_since(fourteen_days_ago))
+
+        if not self.interval_var.trace_info():
+            self.interval_var.trace_add("write", self.on_interval_change)
+        self.on_interval_change()
+
+    def on_interval_change(self, *args):
+        # 各粒度的统计结果由分析缓存提供，切换粒度不会重新解析数据
+        interval = int(self.interval_var.get())
+        self.consumption_chart.draw(self.analytics.consumption_by_interval(interval))
@@ -1,244 +1,30 @@
 # 主程序（原有的电量查询系统）
-import requests
-from bs4 import BeautifulSoup
+# 启动时只导入搜索界面需要的模块；图表（matplotlib/NumPy）和网络请求（requests）相关模块在首次使用时才导入
 import re
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import messagebox
 import threading
 import webbrowser
-import time
-from collections import defaultdict
-import sqlite3
-import csv
-import subprocess
 import sys
 from datetime import datetime
 import os
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.scrolled import ScrolledText
-from ttkbootstrap.widgets import DateEntry
-from thefuzz import process
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.dates as mdates
-from datetime import timedelta
-import pandas as pd
-
-try:
-    plt.rcParams['font.sans-serif'] = ['SimHei']
-    plt.rcParams['axes.unicode_minus'] = False
-except Exception as e:
-    print(f"设置中文字体失败: {e}")
 
 from database import DatabaseManager
-from scraper import Scraper
 from config import ConfigManager
 from utils import predict_remaining_days # 导入预测函数
-
-class ChartDrawer:
-    """用于绘制图表的基类，采用延迟初始化来避免资源泄露"""
-    def __init__(self, master_tab, style):
-        self.master = master_tab
-        self.style = style
-        self.fig, self.ax, self.canvas, self.line = None, None, None, None
-
-    def _initialize_chart(self):
-        """延迟初始化图表和画布，仅在需要时调用。"""
-        if self.canvas is None:
-            self.fig, self.ax = plt.subplots(figsize=(10, 5))
-            self.canvas = FigureCanvasTkAgg(self.fig, master=self.master)
-            self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-            self._setup_hover_annotation()
-
-    def _setup_hover_annotation(self):
-        """设置鼠标悬停注释的通用逻辑"""
-        annot = self.ax.annotate("", xy=(0,0), xytext=(20,20), textcoords="offset points",
-                                 bbox=dict(boxstyle="round", fc="w", ec="k", lw=1),
-                                 arrowprops=dict(arrowstyle="->"))
-        annot.set_visible(False)
-
-        def update_annotation(ind):
-            if self.line is None: return
-            pos = self.line.get_xydata()[ind["ind"][0]]
-            annot.xy = pos
-            annot.set_text(self.format_hover_text(pos))
-            annot.get_bbox_patch().set_alpha(0.8)
-
-        def on_hover(event):
-            if event.inaxes == self.ax and self.line:
-                contains, ind = self.line.contains(event)
-                if contains:
-                    update_annotation(ind)
-                    annot.set_visible(True)
-                    self.fig.canvas.draw_idle()
-                elif annot.get_visible():
-                    annot.set_visible(False)
-                    self.fig.canvas.draw_idle()
-        
-        self.fig.canvas.mpl_connect("motion_notify_event", on_hover)
-
-    def format_hover_text(self, pos):
-        """格式化悬停时显示的文本（由子类实现）"""
-        raise NotImplementedError
-
-    def draw(self, data):
-        self._initialize_chart() # 确保图表已创建
-        self.ax.clear()
-        # 子类将在这里实现具体的绘图逻辑
-        self.canvas.draw()
-        
-class ConsumptionChart(ChartDrawer):
-    """用电量消耗分析图表"""
-    def format_hover_text(self, pos):
-        date_str = mdates.num2date(pos[0]).strftime('%Y-%m-%d %H:%M')
-        return f"截至 {date_str}\n消耗: {pos[1]:.2f} 度"
-
-    def draw(self, data):
-        self._initialize_chart()
-        self.ax.clear()
-
-        if data is None or data.empty:
-            self.ax.text(0.5, 0.5, "当前粒度无消耗数据", ha='center', va='center', fontsize=12)
-            self.line = None
-        else:
-            self.line, = self.ax.plot(data.index, data.values, marker='o', linestyle='-', color=self.style.colors.primary)
-        
-        self.ax.set_title('每小时用电量消耗', fontsize=16)
-        self.ax.set_xlabel('日期时间', fontsize=12)
-        self.ax.set_ylabel('消耗电量 (度)', fontsize=12)
-        self.ax.grid(True, which='both', linestyle='--', linewidth=0.5)
-        self.fig.autofmt_xdate()
-        self.fig.tight_layout()
-        self.canvas.draw()
-
-class RemainingChart(ChartDrawer):
-    """剩余电量趋势图表"""
-    def format_hover_text(self, pos):
-        date_str = mdates.num2date(pos[0]).strftime('%Y-%m-%d %H:%M')
-        return f"{date_str}\n剩余: {pos[1]:.2f} 度"
-    
-    def draw(self, data):
-        self._initialize_chart()
-        self.ax.clear()
-
-        if not data:
-            self.ax.text(0.5, 0.5, "无剩余电量历史数据", ha='center', va='center', fontsize=12)
-            self.line = None
-        else:
-            dates = [mdates.date2num(datetime.fromisoformat(rec[0])) for rec in data]
-            powers = [rec[1] for rec in data]
-            self.line, = self.ax.plot(dates, powers, marker='o', linestyle='-', color=self.style.colors.info)
-        
-        self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d %H:%M'))
-        self.ax.set_title('历史剩余电量趋势', fontsize=16)
-        self.ax.set_xlabel('日期时间', fontsize=12)
-        self.ax.set_ylabel('剩余电量 (度)', fontsize=12)
-        self.ax.grid(True, which='both', linestyle='--', linewidth=0.5)
-        self.fig.autofmt_xdate()
-        self.fig.tight_layout()
-        self.canvas.draw()
-
-class HistoryAnalysisWindow(tk.Toplevel):
-    """一个独立的、用于显示历史数据分析的窗口，负责管理自己的资源。"""
-    def __init__(self, parent, dorm_name, dorm_id, scraper, style, id_mapping):
-        super().__init__(parent)
-        self.title(f"{dorm_name} - 历史用电分析")
-        self.geometry("900x750")
-
-        self.scraper = scraper
-        self.style = style
-        self.dorm_id = dorm_id
-        self.id_mapping = id_mapping
-
-        # --- UI Setup ---
-        notebook = ttk.Notebook(self)
-        notebook.pack(fill=tk.BOTH, expand=tk.YES, padx=10, pady=10)
-
-        consumption_tab = ttk.Frame(notebook)
-        remaining_tab = ttk.Frame(notebook)
-        notebook.add(consumption_tab, text=' 用电量分析 ')
-        notebook.add(remaining_tab, text=' 剩余电量趋势 ')
-
-        control_frame = ttk.Frame(consumption_tab)
-        control_frame.pack(fill=tk.X, padx=5, pady=5)
-        ttk.Label(control_frame, text="统计粒度:").pack(side=tk.LEFT, padx=(0, 10))
-        self.interval_var = tk.StringVar(value="24")
-        intervals = {"每日": "24", "每12小时": "12", "每6小时": "6"}
-        for text, value in intervals.items():
-            ttk.Radiobutton(control_frame, text=text, variable=self.interval_var, value=value).pack(side=tk.LEFT)
-        
-        chart_container = ttk.Frame(consumption_tab)
-        chart_container.pack(fill=tk.BOTH, expand=tk.YES)
-
-        prediction_frame = ttk.LabelFrame(self, text="💡 用电趋势预测", padding="15", bootstyle="success")
-        prediction_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
-        self.prediction_result_label = ttk.Label(prediction_frame, text="正在分析...", font=("微软雅黑", 14), bootstyle="inverse-success")
-        self.prediction_result_label.pack(pady=10)
-
-        self.consumption_chart = ConsumptionChart(chart_container, self.style)
-        self.remaining_chart = RemainingChart(remaining_tab, self.style)
-
-        self.protocol("WM_DELETE_WINDOW", self.on_close)
-        threading.Thread(target=self.initial_load_and_draw, daemon=True).start()
-
-    def on_close(self):
-        """自定义关闭事件处理函数，确保Matplotlib图形对象被正确关闭以释放内存。"""
-        # 增加判断，确保 fig 存在才 close
-        if self.consumption_chart.fig:
-            plt.close(self.consumption_chart.fig)
-        if self.remaining_chart.fig:
-            plt.close(self.remaining_chart.fig)
-        self.destroy()
-
-    def process_consumption_data(self, records, interval_hours):
-        if not records: return pd.Series(dtype='float64')
-        try:
-            df = pd.DataFrame(records, columns=['time', 'power'])
-            df['time'] = pd.to_datetime(df['time'])
-            df = df.set_index('time').sort_index()
-            df['consumption'] = -df['power'].diff()
-            # 使用 'h' 替换已弃用的 'H'
-            consumption_series = df['consumption'].resample(f'{interval_hours}h').sum()
-            return consumption_series[consumption_series > 0]
-        except Exception:
-            return pd.Series(dtype='float64')
-
-    def update_prediction_display(self):
-        status, result = predict_remaining_days(self.dorm_id)
-        def _update_ui():
-            if status == 'predict': text = f"预测剩余电量大约还能使用: {result} 天"
-            elif status == 'sufficient': text = f"分析结果: {result}"
-            else: text = f"无法预测: {result}"
-            self.prediction_result_label.config(text=text)
-        self.after(0, _update_ui)
-
-    def initial_load_and_draw(self):
-        api_records, error_message = self.scraper.get_historical_power(self.dorm_id, self.id_mapping[self.dorm_id][1])
-        if error_message or not api_records:
-            self.after(0, lambda: messagebox.showerror("加载失败", error_message or "未返回任何历史数据", parent=self))
-            self.after(0, self.on_close) # 调用 on_close 来确保清理
-            return
-
-        self.update_prediction_display()
-
-        fourteen_days_ago = datetime.now() - timedelta(days=14)
-        recent_records = [rec for rec in api_records if datetime.fromisoformat(rec[0]) >= fourteen_days_ago]
-        self.after(0, lambda: self.remaining_chart.draw(recent_records))
-
-        def on_interval_change(*args):
-            interval = int(self.interval_var.get())
-            processed_data = self.process_consumption_data(api_records, interval)
-            self.after(0, lambda: self.consumption_chart.draw(processed_data))
-        
-        self.interval_var.trace_add("write", on_interval_change)
-        self.after(0, on_interval_change)
+from dorm_search import DormSearchIndex, SearchWorker
+from dorm_catalog import DormCatalog
 
 class DormitoryPowerChecker:
     def __init__(self, root):
         self.config_manager = ConfigManager()
         self.db_manager = DatabaseManager()
-        self.scraper = Scraper()
+        self._scraper = None
+        self._reading_cache = None
+        self._scraper_lock = threading.Lock()
         self.root = root
         
         initial_theme = self.config_manager.get_setting('Theme', 'current_theme', 'litera')
@@ -247,23 +33,46 @@ class DormitoryPowerChecker:
         self.root.geometry(initial_geometry)
         
         self.root.title("宿舍电量查询与充值系统")
-        self.dormitories = []
-        self.id_mapping = {}
+        self.catalog = None
+        self.search_worker = None
 
         self.create_widgets()
         self.create_menu()
         self.load_dormitory_data()
+        # 界面显示后再在后台预先导入网络模块，第一次查询时无需等待
+        self.root.after_idle(lambda: threading.Thread(target=lambda: self.reading_cache, daemon=True).start())
+
+    @property
+    def scraper(self):
+        """首次使用时才导入爬虫模块（requests 等较重的依赖）"""
+        if self._scraper is None:
+            with self._scraper_lock:
+                if self._scraper is None:
+                    from scraper import Scraper
+                    self._scraper = Scraper()
+        return self._scraper
+
+    @property
+    def reading_cache(self):
+        """与桌面摆件共享的读数缓存，缓存未过期时不再访问服务器"""
+        if self._reading_cache is None:
+            scraper = self.scraper
+            with self._scraper_lock:
+                if self._reading_cache is None:
+                    from reading_cache import ReadingCache, DEFAULT_TTL_SECONDS
+                    ttl = float(self.config_manager.get_setting('Cache', 'reading_ttl_seconds', DEFAULT_TTL_SECONDS))
+                    self._reading_cache = ReadingCache(self.db_manager, scraper.get_power, ttl=ttl)
+        return self._reading_cache
         
     def load_dormitory_data(self):
         try:
             base_path = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
             file_path = os.path.join(base_path, 'dorm_rooms_2025.csv')
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    name = f"{row['building']}-{row['room_number']}"
-                    self.dormitories.append({'name': name, 'id': row['room_code'], 'type': row['dorm_type']})
-                    self.id_mapping[row['room_code']] = (name, row['dorm_type'])
+            # 宿舍目录为内存映射的二进制文件，按编码查询时只解码命中的记录
+            self.catalog = DormCatalog(file_path)
+            # 搜索在后台线程中进行，索引在第一次搜索时构建，之后每次按键只查询索引
+            catalog = self.catalog
+            self.search_worker = SearchWorker(lambda: DormSearchIndex(catalog))
         except Exception as e:
             messagebox.showerror("错误", f"无法读取文件: {str(e)}")
 
@@ -338,13 +147,44 @@ class DormitoryPowerChecker:
         self.config_manager.set_setting('Theme', 'current_theme', theme_name)
 
     def on_search(self, event=None):
-        for item in self.result_tree.get_children(): self.result_tree.delete(item)
         search_text = self.search_entry.get().strip()
-        if not search_text or search_text == self.placeholder_text:
-            return self.toggle_buttons(tk.DISABLED)
-        results = process.extract(search_text, [d['name'] for d in self.dormitories], limit=50)
-        found_dorms = [d for name, score in results if score > 70 for d in self.dormitories if d['name'] == name]
-        for dorm in found_dorms: self.result_tree.insert("", tk.END, values=(dorm['name'], dorm['id']))
+        if not search_text or search_text == self.placeholder_text or self.search_worker is None:
+            if self.search_worker is not None:
+                self.search_worker.cancel()
+            self.render_search_results([])
+            return
+        # 只把查询交给后台线程，按键事件立即返回；结果通过 root.after 回到主线程
+        self.search_worker.submit(search_text, self.on_search_results)
+
+    def on_search_results(self, generation, search_text, found_dorms):
+        """后台线程回调：切回主线程，并在渲染前再次确认结果没有过期"""
+        def _render():
+            if self.search_worker is not None and self.search_worker.is_current(generation):
+                self.render_search_results(found_dorms)
+        try:
+            self.root.after(0, _render)
+        except (RuntimeError, tk.TclError):
+            pass  # 窗口已关闭
+
+    def render_search_results(self, found_dorms):
+        """
+        对比当前结果列表和新结果，只删除、插入、移动有变化的行（行 iid 为宿舍ID），
+        保留仍然存在的行及其选中状态。
+        """
+        tree = self.result_tree
+        new_ids = [dorm['id'] for dorm in found_dorms]
+        keep = set(new_ids)
+        current = [iid for iid in tree.get_children() if iid in keep]
+        stale = [iid for iid in tree.get_children() if iid not in keep]
+        if stale:
+            tree.delete(*stale)
+        if current != new_ids:
+            existing = set(current)
+            for position, dorm in enumerate(found_dorms):
+                if dorm['id'] in existing:
+                    tree.move(dorm['id'], "", position)
+                else:
+                    tree.insert("", position, iid=dorm['id'], values=(dorm['name'], dorm['id']))
         self.toggle_buttons(tk.NORMAL if found_dorms else tk.DISABLED)
 
     def toggle_buttons(self, state):
@@ -355,7 +195,7 @@ class DormitoryPowerChecker:
         item = self.result_tree.selection()
         if not item: return messagebox.showwarning("警告", "请先从列表中选择一个宿舍")
         dorm_name, dorm_id = self.result_tree.item(item, "values")[:2]
-        dorm_type = self.id_mapping[dorm_id][1]
+        dorm_type = self.catalog.lookup(dorm_id)[1]
         self.query_result.delete(1.0, tk.END)
         self.query_result.insert(tk.END, f"正在查询 {dorm_name} (ID: {dorm_id}) 的电量...\n"); self.root.update()
         threading.Thread(target=self.query_power_in_thread, args=(dorm_id, dorm_name, dorm_type), daemon=True).start()
@@ -372,12 +212,21 @@ class DormitoryPowerChecker:
             self.root.after(0, self.query_result.insert, tk.END, f"正在查询 {dorm_name} 的电量...\n")
             self.root.update()
 
-            power_text, error_message = self.scraper.get_power(dorm_id, dorm_type)
+            power_text, error_message, cached_at = self.reading_cache.get_power(dorm_id, dorm_type)
             if error_message:
                 result = f"查询失败：{error_message}"
             else:
-                # 成功获取电量后，立即进行预测
-                pred_status, pred_result = predict_remaining_days(dorm_id)
+                # 缓存中的读数已在获取时保存过，只有刚从服务器获取的读数才需要保存
+                if cached_at is None:
+                    try:
+                        # 使用正则表达式从power_text中提取数字用于保存，保存时会同步更新用电统计
+                        power_value = float(re.search(r'(\d+\.?\d*)', power_text).group(1))
+                        self.db_manager.save_record(dorm_id, dorm_name, power_value)
+                    except (ValueError, TypeError, AttributeError):
+                        pass
+
+                # 保存读数后再进行预测，使预测包含本次读数
+                pred_status, pred_result = predict_remaining_days(dorm_id, self.db_manager)
                 if pred_status == 'predict':
                     prediction_text = f"💡 预测：剩余电量大约还能使用 {pred_result} 天。"
                 elif pred_status == 'sufficient':
@@ -385,14 +234,8 @@ class DormitoryPowerChecker:
                 else:
                     prediction_text = "💡 预测：历史数据不足，暂时无法预测。"
                 
-                result = f"{dorm_name} (ID: {dorm_id}) 的剩余电量为: {power_text} 度\n{prediction_text}"
-                
-                try:
-                    # 使用正则表达式从power_text中提取数字用于保存
-                    power_value = float(re.search(r'(\d+\.?\d*)', power_text).group(1))
-                    self.db_manager.save_record(dorm_id, dorm_name, power_value)
-                except (ValueError, TypeError, AttributeError):
-                    pass
+                cache_note = f"（{cached_at.strftime('%H:%M:%S')} 的读数）" if cached_at else ""
+                result = f"{dorm_name} (ID: {dorm_id}) 的剩余电量为: {power_text} 度{cache_note}\n{prediction_text}"
             
             self.root.after(0, lambda: (self.query_result.insert(tk.END, f"{result}\n\n"), self.query_result.see(tk.END)))
         except Exception as e:
@@ -403,30 +246,31 @@ class DormitoryPowerChecker:
         item = self.result_tree.selection()
         if not item: return messagebox.showwarning("警告", "请先选择一个宿舍")
         dorm_name, dorm_id = self.result_tree.item(item, "values")[:2]
-        dorm_type = self.id_mapping[dorm_id][1]
+        dorm_type = self.catalog.lookup(dorm_id)[1]
         recharge_url = f"https://hydz.xsyu.edu.cn/wxpay/homeinfo.aspx?xid={dorm_id}&type={dorm_type}&opid=a"
         if messagebox.askyesno("确认充值", f"是否跳转到 {dorm_name} 的充值页面?"): webbrowser.open(recharge_url)
 
     def clear_all(self):
         self.search_entry.delete(0, tk.END)
-        for item in self.result_tree.get_children(): self.result_tree.delete(item)
+        if self.search_worker is not None:
+            self.search_worker.cancel()
+        self.render_search_results([])
         self.query_result.delete(1.0, tk.END)
-        self.toggle_buttons(tk.DISABLED)
         self.on_entry_focus_out(None)
 
     def create_desktop_widget(self):
         item = self.result_tree.selection()
         if not item: return messagebox.showwarning("警告", "请先选择一个宿舍")
         dorm_name, dorm_id = self.result_tree.item(item, "values")[:2]
-        dorm_type = self.id_mapping[dorm_id][1]
-        
-        widget_script_path = os.path.join(os.path.dirname(__file__), 'widget.py')
+        dorm_type = self.catalog.lookup(dorm_id)[1]
         
+        from widget_ipc import launch_widget
         try:
-            # 使用 Popen 在一个完全独立的进程中启动小摆件
-            # 并通过命令行参数传递必要的信息
-            subprocess.Popen([sys.executable, widget_script_path, dorm_id, dorm_type, dorm_name])
-            messagebox.showinfo("成功", "桌面摆件已启动！\n您现在可以关闭主窗口，摆件会继续运行。", parent=self.root)
+            # 所有摆件运行在同一个宿主进程中：宿主已在运行时通过本地连接添加摆件，否则启动宿主
+            if launch_widget(dorm_id, dorm_type, dorm_name):
+                messagebox.showinfo("成功", "已添加到正在运行的桌面摆件。", parent=self.root)
+            else:
+                messagebox.showinfo("成功", "桌面摆件已启动！\n您现在可以关闭主窗口，摆件会继续运行。", parent=self.root)
         except Exception as e:
             messagebox.showerror("启动失败", f"无法启动小摆件进程: {e}", parent=self.root)
 
@@ -435,13 +279,20 @@ class DormitoryPowerChecker:
         if not item:
             return messagebox.showwarning("提示", "请先在列表中选择一个宿舍。")
         dorm_name, dorm_id = self.result_tree.item(item, "values")[:2]
+        # 分析窗口依赖 matplotlib，首次打开时才导入
+        from history_window import HistoryAnalysisWindow
         # 创建一个独立的、自管理的分析窗口实例
-        HistoryAnalysisWindow(self.root, dorm_name, dorm_id, self.scraper, self.style, self.id_mapping)
+        HistoryAnalysisWindow(self.root, dorm_name, dorm_id, self.scraper, self.db_manager, self.style, self.catalog)
 
     def on_closing(self):
         self.config_manager.set_setting('Window', 'geometry', self.root.winfo_geometry())
         self.config_manager.save_config()
+        if self.search_worker is not None:
+            self.search_worker.close()
         self.db_manager.close()
+        if self._scraper is not None:
+            from http_client import close_session
+            close_session()
         self.root.destroy()
 
 def main():
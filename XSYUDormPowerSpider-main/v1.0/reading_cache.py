@@ -0,0 +1,98 @@
+# 电量读数缓存模块
+import threading
+import time
+from datetime import datetime
+
+# 缓存的读数在该时长（秒）内视为最新，可在配置文件 [Cache] reading_ttl_seconds 中修改
+DEFAULT_TTL_SECONDS = 600
+# 抓取租约时长（秒），应大于一次查询的超时时间；持有租约的进程崩溃后，其他进程最多等待这么久
+LEASE_SECONDS = 30
+# 等待其他进程抓取结果时查询数据库的间隔（秒）
+LEASE_POLL_INTERVAL = 0.2
+
+
+class _Flight:
+    """一次正在进行的抓取，同一宿舍的其他请求等待它的结果"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class ReadingCache:
+    """
+    以 (dorm_id, dorm_type) 为键的电量读数缓存，数据保存在 SQLite 中，主程序和摆件进程共享。
+
+    - 缓存未过期时直接返回，不访问电量查询服务器；
+    - 同一进程内对同一宿舍的并发请求只抓取一次，其余请求等待该次结果；
+    - 多个进程之间通过数据库中的租约合并抓取：拿不到租约的进程等待持有者写入结果。
+    """
+
+    def __init__(self, db_manager, fetch, ttl=DEFAULT_TTL_SECONDS, clock=time.time):
+        """fetch 与 Scraper.get_power 签名相同：fetch(dorm_id, dorm_type) -> (power_text, error_message)"""
+        self.db_manager = db_manager
+        self.fetch = fetch
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def get_power(self, dorm_id, dorm_type, max_age=None):
+        """
+        返回 (power_text, error_message, cached_at)。
+        cached_at 为 None 表示本次刚从服务器获取（调用方应保存该读数），
+        否则为缓存读数的获取时间（datetime），调用方不应重复保存。
+        """
+        max_age = self.ttl if max_age is None else max_age
+        cached = self._fresh_reading(dorm_id, dorm_type, max_age)
+        if cached:
+            return cached
+
+        key = (dorm_id, dorm_type)
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            power_text, error_message, cached_at = flight.result
+            if error_message:
+                return flight.result
+            # 对等待者来说，读数已由发起抓取的请求保存
+            return power_text, None, cached_at or datetime.now()
+
+        try:
+            flight.result = self._fetch_once(dorm_id, dorm_type, max_age)
+        except Exception as e:
+            flight.result = (None, f"未知错误：{e}", None)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+        return flight.result
+
+    def _fresh_reading(self, dorm_id, dorm_type, max_age):
+        row = self.db_manager.get_cached_reading(dorm_id, dorm_type)
+        if row and row[0] is not None and row[1] is not None and self.clock() - row[1] <= max_age:
+            return row[0], None, datetime.fromtimestamp(row[1])
+        return None
+
+    def _fetch_once(self, dorm_id, dorm_type, max_age):
+        """获取租约后抓取；其他进程正在抓取时等待它写入结果，租约过期则自己抓取"""
+        while not self.db_manager.acquire_reading_lease(dorm_id, dorm_type, self.clock(), LEASE_SECONDS):
+            time.sleep(LEASE_POLL_INTERVAL)
+            cached = self._fresh_reading(dorm_id, dorm_type, max_age)
+            if cached:
+                return cached
+
+        fetched_at = self.clock()
+        try:
+            power_text, error_message = self.fetch(dorm_id, dorm_type)
+        except Exception:
+            self.db_manager.release_reading_lease(dorm_id, dorm_type)
+            raise
+        if error_message:
+            self.db_manager.release_reading_lease(dorm_id, dorm_type)
+        else:
+            self.db_manager.save_cached_reading(dorm_id, dorm_type, power_text, fetched_at)
+        return power_text, error_message, None
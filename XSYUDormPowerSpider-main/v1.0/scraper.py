@@ -1,15 +1,24 @@
 import requests
-from bs4 import BeautifulSoup
 import re
 from datetime import datetime
 
+from http_client import PageCache, get_session, release_response
+from extractor import content_digest, extract_power_text_with_fingerprint, STREAM_CHUNK_SIZE
+from upstream_guard import UpstreamUnavailable, get_upstream_guard
+
 class Scraper:
     def __init__(self):
         # 增加 User-Agent，模拟浏览器访问，这是解决问题的关键
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
-        self.session = requests.Session()
+        # 使用共享的连接池 Session，复用 keep-alive 连接，避免每次查询都重新握手
+        self.session = get_session()
+        # 同一进程的所有查询共用限速、并发控制和熔断状态，避免给电量查询服务器造成压力
+        self.guard = get_upstream_guard()
+        # 每个宿舍上次获取的页面指纹和解析结果，内容没变时跳过解析
+        self.power_pages = PageCache()
+        self.history_pages = PageCache()
 
     def get_power(self, dorm_id, dorm_type):
         """
@@ -26,66 +35,106 @@ class Scraper:
                 "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
                 "Referer": "https://hydz.xsyu.edu.cn/wxpay/homeinfo.aspx",
             }
+            key = (dorm_id, dorm_type)
+            headers.update(self.power_pages.conditional_headers(key))
+            entry = self.power_pages.get(key)
 
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()  # 如果请求失败（如404, 500），则抛出异常
-            response.encoding = 'utf-8'
-
-            soup = BeautifulSoup(response.text, 'html.parser')
+            with self.guard.request() as call:
+                response = self.session.get(url, headers=headers, timeout=15, stream=True)
+                call.observe(response)
+                if response.status_code == 304 and entry is not None:
+                    response.close()
+                    return self.power_pages.not_modified(key), None
 
-            power_span = soup.find('span', id='lblSYDL') or soup.find('span', id='Label1')
-            if not power_span:
+                # 分块读取页面，找到电量标签后立即停止下载；与上次内容相同时跳过查找
+                # 错误响应同样要在 finally 中释放，否则连接不会归还连接池
+                finished = False
+                previous = (entry.fingerprint, entry.value) if entry is not None else None
+                try:
+                    response.raise_for_status()  # 如果请求失败（如404, 500），则抛出异常
+                    power_text, finished, fingerprint, unchanged = extract_power_text_with_fingerprint(
+                        response.iter_content(chunk_size=STREAM_CHUNK_SIZE), previous)
+                finally:
+                    release_response(response, finished)
+            if power_text is None:
                 return None, "错误：未能在页面上找到电量信息，网站结构可能已更新。"
 
-            power_text = power_span.get_text(strip=True)
             if re.match(r'^\d+(\.\d+)?$', power_text):
+                self.power_pages.store(key, response, fingerprint, power_text, unchanged)
                 return power_text, None
             else:
                 return None, f"错误：获取到的电量格式不正确 ({power_text})。"
 
+        except UpstreamUnavailable as e:
+            return None, f"网络错误：{e}"
         except requests.exceptions.RequestException as e:
             return None, f"网络错误：无法连接到电量查询服务器。({e})"
         except Exception as e:
             return None, f"未知错误：{e}"
 
-    def get_historical_power(self, dorm_id, dorm_type):
+    def get_historical_power(self, dorm_id, dorm_type, since=None):
         """
         从官方接口获取详细的历史电量记录。
         此版本使用 stripped_strings 进行解析，更加健壮。
+        指定 since（ISO格式时间）时只返回晚于该时间的记录，没有新记录时返回空列表。
+        页面与上次获取的内容完全相同时（或服务器返回 304）直接复用上次的解析结果。
         """
         history_url = f"https://hydz.xsyu.edu.cn/wxpay/settlementlist.aspx?type={dorm_type}&xid={dorm_id}"
+        key = (dorm_id, dorm_type)
         try:
-            response = requests.get(history_url, headers=self.headers, timeout=15)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            records = []
-            # 使用 stripped_strings 获取页面所有纯文本内容，并转换为列表
-            strings = list(soup.stripped_strings)
+            headers = dict(self.headers, **self.history_pages.conditional_headers(key))
+            with self.guard.request() as call:
+                response = self.session.get(history_url, headers=headers, timeout=15)
+                call.observe(response)
+                response.raise_for_status()
+            if response.status_code == 304 and self.history_pages.get(key):
+                all_records = self.history_pages.not_modified(key)
+            else:
+                digest = content_digest(response.content)
+                entry = self.history_pages.get(key)
+                unchanged = entry is not None and entry.fingerprint == digest
+                all_records = entry.value if unchanged else self._parse_history(response.content)
+                self.history_pages.store(key, response, digest, all_records, unchanged)
 
-            # 遍历列表，寻找"剩余电量"和"抄表时间"的组合
-            for i, text in enumerate(strings):
-                if text == '剩余电量' and i + 2 < len(strings) and strings[i+2] == '抄表时间':
-                    power_str = strings[i+1]
-                    time_str = strings[i+3]
-                    
-                    try:
-                        power_val = float(power_str)
-                        time_obj = datetime.strptime(time_str, '%Y-%m-%d %H:%M:%S')
-                        # 转换为与之前逻辑一致的ISO格式字符串
-                        records.append((time_obj.isoformat(), power_val))
-                    except (ValueError, TypeError):
-                        # 如果某个记录解析失败，则跳过，继续解析下一个
-                        continue
-            
-            if not records:
+            if all_records is None:
                 return None, "在官方页面未找到任何有效的历史数据记录。"
+            # 本地已保存过的记录不再返回
+            return [record for record in all_records if not since or record[0] > since], None
 
-            # 按时间升序排序
-            records.sort(key=lambda x: x[0])
-            return records, None
-
+        except UpstreamUnavailable as e:
+            return None, f"获取历史数据失败: {e}"
         except requests.exceptions.RequestException as e:
             return None, f"获取历史数据时网络请求失败: {e}"
         except Exception as e:
-            return None, f"解析历史数据时发生未知错误: {e}" 
\ No newline at end of file
+            return None, f"解析历史数据时发生未知错误: {e}"
+
+    @staticmethod
+    def _parse_history(content):
+        """解析历史记录页面，返回按时间升序排列的 [(ISO时间, 电量)]，没有任何有效记录时返回 None"""
+        from bs4 import BeautifulSoup  # 只有历史记录页面需要完整解析，首次使用时才导入
+        soup = BeautifulSoup(content, 'html.parser')
+
+        records = []
+        # 使用 stripped_strings 获取页面所有纯文本内容，并转换为列表
+        strings = list(soup.stripped_strings)
+
+        # 遍历列表，寻找"剩余电量"和"抄表时间"的组合
+        for i, text in enumerate(strings):
+            if text == '剩余电量' and i + 2 < len(strings) and strings[i+2] == '抄表时间':
+                power_str = strings[i+1]
+                time_str = strings[i+3]
+                
+                try:
+                    power_val = float(power_str)
+                    time_obj = datetime.strptime(time_str, '%Y-%m-%d %H:%M:%S')
+                    # 转换为与之前逻辑一致的ISO格式字符串
+                    records.append((time_obj.isoformat(), power_val))
+                except (ValueError, TypeError):
+                    # 如果某个记录解析失败，则跳过，继续解析下一个
+                    continue
+
+        if not records:
+            return None
+        # 按时间升序排序
+        records.sort(key=lambda x: x[0])
+        return records
@@ -0,0 +1,220 @@
+# 电量查询服务器（hydz.xsyu.edu.cn）请求保护模块
+"""
+所有对电量查询服务器的请求都经过 UpstreamGuard：
+- 令牌桶限制每秒请求数，允许小幅突发；
+- AIMD 并发控制：请求成功时并发上限缓慢增加（加性增），超时、连接错误、5xx、429 时减半（乘性减），
+  服务器能承受多快就跑多快，一旦吃力立即退让；
+- 熔断器：连续失败达到阈值后熔断，熔断期间请求立即失败（抛出 UpstreamUnavailable），
+  冷却时间过后只放行一个探测请求，成功则恢复，失败则继续熔断。
+
+用法：
+    with guard.request() as call:
+        response = session.get(...)
+        call.observe(response)
+
+主程序和 linux-service 共用本模块，两处文件内容相同。
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+# 请求结果分类
+SUCCESS = 'success'        # 服务器正常响应（包括 404 等客户端错误）
+OVERLOAD = 'overload'      # 超时、连接错误、5xx、429：服务器可能过载
+NEUTRAL = 'neutral'        # 与服务器状态无关的错误（如页面解析失败）
+
+
+class UpstreamUnavailable(Exception):
+    """熔断期间拒绝请求"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"电量查询服务器暂时不可用，{retry_after:.0f} 秒后重试")
+        self.retry_after = retry_after
+
+
+def classify_status(status_code):
+    return OVERLOAD if status_code >= 500 or status_code == 429 else SUCCESS
+
+
+def classify_error(error):
+    if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+        return OVERLOAD
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return classify_status(error.response.status_code)
+    return NEUTRAL
+
+
+class TokenBucket:
+    """令牌桶：平均每秒 rate 个请求，最多连续突发 burst 个；rate <= 0 表示不限制"""
+
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，不够时等待；先到的请求先拿到令牌（预支令牌，等待在锁外进行）"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+
+class AimdLimiter:
+    """加性增、乘性减的并发上限"""
+
+    def __init__(self, initial=2, minimum=1, maximum=8, decrease_factor=0.5, clock=time.monotonic):
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.decrease_factor = decrease_factor
+        self.clock = clock
+        self.in_flight = 0
+        self._last_decrease = float('-inf')
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """等待空闲的并发名额，返回请求开始时间（release 时传回）"""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+            return self.clock()
+
+    def release(self, outcome, started):
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == SUCCESS:
+                # 每成功 limit 次，上限加一
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif outcome == OVERLOAD and started >= self._last_decrease:
+                # 同一次过载中已经发出的请求陆续失败时只减一次
+                self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                self._last_decrease = self.clock()
+            self._cond.notify_all()
+
+
+class CircuitBreaker:
+    """连续 failure_threshold 次过载后熔断 reset_timeout 秒"""
+    CLOSED, OPEN, HALF_OPEN = '正常', '熔断', '探测'
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0, clock=time.monotonic, on_state_change=None):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self.clock = clock
+        self.on_state_change = on_state_change
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """熔断中且冷却未结束，或探测请求尚未返回时抛出 UpstreamUnavailable"""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - self.clock()
+                if remaining > 0:
+                    raise UpstreamUnavailable(remaining)
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    raise UpstreamUnavailable(0)
+                self._probing = True
+
+    def record(self, outcome):
+        with self._lock:
+            self._probing = False
+            if outcome == SUCCESS:
+                self.failures = 0
+                if self.state != self.CLOSED:
+                    self._set_state(self.CLOSED)
+            elif outcome == OVERLOAD:
+                self.failures += 1
+                if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                    self._opened_at = self.clock()
+                    self._set_state(self.OPEN)
+
+    def _set_state(self, state):
+        previous, self.state = self.state, state
+        if self.on_state_change and previous != state:
+            self.on_state_change(previous, state)
+
+
+class _Call:
+    def __init__(self):
+        self.outcome = SUCCESS
+
+    def observe(self, response):
+        """根据响应状态码判断服务器是否过载"""
+        self.outcome = classify_status(response.status_code)
+
+
+class UpstreamGuard:
+    """令牌桶 + AIMD 并发控制 + 熔断器"""
+
+    def __init__(self, requests_per_second=4.0, burst=4, min_concurrency=1, max_concurrency=8,
+                 initial_concurrency=2, failure_threshold=5, reset_timeout=60.0, on_state_change=None):
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self.limiter = AimdLimiter(initial_concurrency, min_concurrency, max_concurrency)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, on_state_change=on_state_change)
+        self.stats = {'requests': 0, 'overloads': 0, 'rejected': 0}
+        self._stats_lock = threading.Lock()
+
+    @contextmanager
+    def request(self):
+        try:
+            self.breaker.before_call()
+        except UpstreamUnavailable:
+            self._count('rejected')
+            raise
+        started = None
+        call = _Call()
+        try:
+            self.bucket.acquire()
+            started = self.limiter.acquire()
+            yield call
+        except BaseException as e:
+            call.outcome = classify_error(e) if isinstance(e, Exception) else NEUTRAL
+            raise
+        finally:
+            if started is not None:
+                self.limiter.release(call.outcome, started)
+            self.breaker.record(call.outcome)
+            self._count('requests')
+            if call.outcome == OVERLOAD:
+                self._count('overloads')
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def describe(self):
+        return f"并发上限 {self.limiter.limit:.1f}，熔断器{self.breaker.state}"
+
+
+_guard = None
+_guard_lock = threading.Lock()
+
+
+def get_upstream_guard():
+    """进程内共享的 UpstreamGuard（桌面程序使用），同一进程的所有查询共用一套限速和熔断状态"""
+    global _guard
+    if _guard is None:
+        with _guard_lock:
+            if _guard is None:
+                _guard = UpstreamGuard(requests_per_second=2, burst=4, max_concurrency=4)
+    return _guard
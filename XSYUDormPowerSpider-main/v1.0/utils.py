@@ -4,7 +4,6 @@ import sys
 import platform
 import os
 from database import DatabaseManager
-from datetime import datetime, timedelta
 
 def open_main_app():
     """打开主程序"""
@@ -20,66 +19,37 @@ def open_recharge_page(dorm_id, dorm_type):
     recharge_url = f"https://hydz.xsyu.edu.cn/wxpay/homeinfo.aspx?xid={dorm_id}&type={dorm_type}&opid=a"
     webbrowser.open(recharge_url)
 
-def predict_remaining_days(dorm_id):
+def predict_remaining_days(dorm_id, db_manager=None):
     """
-    根据历史用电数据预测剩余电量可用天数。
+    根据滚动用电统计预测剩余电量可用天数。
+    统计在每次保存读数时增量更新，这里只需读取一行，O(1)。
 
     Args:
         dorm_id (str): 宿舍的唯一标识ID。
+        db_manager (DatabaseManager): 可选，复用调用方已有的数据库连接。
 
     Returns:
         tuple: (预测状态, 预测天数或提示信息)
                状态可以是 'predict', 'sufficient', 'not_enough_data', 'error'。
     """
-    db_manager = DatabaseManager()
-    # 获取最近30天的数据以提高效率和相关性
-    start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-    records = db_manager.get_records_by_dorm_id(dorm_id, start_date=start_date)
-    db_manager.close()
-
-    if len(records) < 2:
-        return ('not_enough_data', "历史数据不足 (至少需要2天)")
-
-    # 将记录转换为 (datetime, power)
-    parsed_records = []
-    for rec in records:
-        try:
-            # 兼容多种可能的日期时间格式
-            time_str, power = rec
-            dt_object = datetime.fromisoformat(time_str)
-            parsed_records.append((dt_object, power))
-        except (ValueError, TypeError):
-            continue # 跳过格式不正确的记录
-
-    if len(parsed_records) < 2:
-        return ('not_enough_data', "有效的历史数据不足")
-    
-    # 使用最早和最新的记录进行计算
-    latest_record = parsed_records[-1]
-    earliest_record = parsed_records[0]
-
-    current_power = latest_record[1]
-    
-    # 计算时间差（天数）和电量消耗
-    time_difference = latest_record[0] - earliest_record[0]
-    days_elapsed = time_difference.total_seconds() / (3600 * 24)
-    
-    power_consumed = earliest_record[1] - latest_record[1]
-
-    # 避免除以零或时间过短导致的不准确预测
-    if days_elapsed < 0.5:
-        return ('not_enough_data', "数据时间跨度太短")
+    # 只关闭自己创建的数据库连接，调用方传入的连接由调用方管理
+    owns_db = db_manager is None
+    try:
+        if owns_db:
+            db_manager = DatabaseManager()
+        stats = db_manager.get_consumption_stats(dorm_id)
+    except Exception as e:
+        return ('error', f"读取用电统计失败: {e}")
+    finally:
+        if owns_db and db_manager is not None:
+            db_manager.close()
 
-    if power_consumed <= 0:
-        return ('sufficient', "电量充足，无需担心！")
+    if stats is None or stats['daily_rate'] is None:
+        return ('not_enough_data', "历史数据不足 (至少需要间隔6小时的两次读数)")
 
-    # 计算日均消耗
-    daily_consumption_rate = power_consumed / days_elapsed
-    
-    if daily_consumption_rate <= 0:
+    # 充值后电量上升不会被误判为"没有消耗"，仍按充值前的用电速率预测
+    if stats['daily_rate'] < 0.01:
         return ('sufficient', "电量充足，无需担心！")
 
-    # 预测剩余天数
-    days_remaining = current_power / daily_consumption_rate
-    
-    return ('predict', f"{days_remaining:.1f}")
\ No newline at end of file
+    days_remaining = stats['latest_power'] / stats['daily_rate']
+    return ('predict', f"{days_remaining:.1f}")
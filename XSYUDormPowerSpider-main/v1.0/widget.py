@@ -1,10 +1,8 @@
 import tkinter as tk
 from tkinter import Menu, messagebox
+from tkinter import font as tkfont
 import threading
 import time
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import subprocess
 import sys
 from database import DatabaseManager
 from utils import open_main_app, open_recharge_page, predict_remaining_days # 导入预测函数
@@ -15,12 +13,40 @@ from PIL import Image, ImageDraw, ImageFont, ImageTk
 import re
 import os # 新增os模块
 import shutil # 新增shutil模块
+from collections import OrderedDict
 
 # 获取当前文件所在的目录
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 from config import ConfigManager
 from scraper import Scraper
+from reading_cache import ReadingCache, DEFAULT_TTL_SECONDS
+from polling_policy import AdaptivePollPlan, AdaptivePollPlanner
+from http_client import close_session
+from widget_ipc import WidgetHostServer, add_widget
+
+# 摆件的刷新间隔（秒）按用电速率自适应：快用完电的宿舍刷新频繁，电量充裕的很少刷新
+REFRESH_MIN_INTERVAL = 600            # 不短于读数缓存的有效期
+REFRESH_MAX_INTERVAL = 6 * 3600
+REFRESH_DEFAULT_INTERVAL = 1800       # 还没有用电速率数据时，保持原来的 30 分钟
+REFRESH_DAILY_BUDGET = 200            # 所有摆件每天最多刷新的次数
+LOW_POWER_THRESHOLD = 10.0            # 预测"快用完"的电量阈值（度），可在配置文件 [Widget] low_power_threshold 中修改
+# 调整大小时两次重绘之间的最短间隔（毫秒），约为一帧
+REDRAW_FRAME_MS = 16
+# 宠物图片缓存：尺寸按该像素数取整分档，最多缓存的缩放结果数
+PET_SIZE_BUCKET = 8
+PET_CACHE_SIZE = 24
+
+_font_cache = {}
+
+
+def get_font(size, weight="normal"):
+    """按字号缓存字体对象，所有摆件共用，避免每次重绘都创建新字体"""
+    key = (size, weight)
+    font = _font_cache.get(key)
+    if font is None:
+        font = _font_cache[key] = tkfont.Font(family="微软雅黑", size=size, weight=weight)
+    return font
 
 def create_placeholder_image(size, text, color, file_path):
     """
@@ -48,60 +74,54 @@ def create_placeholder_image(size, text, color, file_path):
     img.save(file_path)
 
 class PowerWidget:
-    def __init__(self, dorm_id, dorm_type, dorm_name):
-        self.root = tk.Tk()
+    """单个宿舍的摆件窗口，由 WidgetHost 创建，共用宿主的数据库连接、爬虫和刷新定时器"""
+    def __init__(self, host, dorm_id, dorm_type, dorm_name, slot=0):
+        self.host = host
+        self.root = tk.Toplevel(host.root)
         self.root.overrideredirect(True)
         self.root.attributes('-topmost', True)
 
-        self.config_manager = ConfigManager()
-        self.db_manager = DatabaseManager()
-        self.scraper = Scraper()
+        self.db_manager = host.db_manager
         
         self.dorm_id = dorm_id
         self.dorm_type = dorm_type
         self.dorm_name = dorm_name
 
-        # 检查并创建图片资源
-        self.prepare_pet_images()
-
-        # Correctly read the 'Widget' section for the style
-        self.style_name = self.config_manager.get_setting('Widget', 'style', '默认')
+        self.style_name = host.style_name
         
         self.setup_transparency()
 
-        # 初始尺寸和位置
+        # 初始尺寸和位置，多个摆件从屏幕右下角向上依次排列
         self.widget_width = 180
         self.widget_height = 120
         screen_width = self.root.winfo_screenwidth()
         screen_height = self.root.winfo_screenheight()
         x_position = screen_width - self.widget_width - 20
-        y_position = screen_height - self.widget_height - 40
+        y_position = max(0, screen_height - (self.widget_height + 10) * (slot + 1) - 30)
         self.root.geometry(f"{self.widget_width}x{self.widget_height}+{x_position}+{y_position}")
 
-        self.setup_colors()
-        self.create_ui_elements()
-
         self.x = 0
         self.y = 0
 
         # 新增：用于调整窗口大小的变量
         self.resizing = False
         self.resize_edge = None
-        # 新增：用于存放2D数字人图片的变量
+        # 新增：用于存放2D数字人图片的变量（缩放后的图片由宿主的 PetImageCache 统一缓存）
         self.pet_image = None
         self.pet_label = None
-        # 新增：用于缓存加载的图片，避免重复读取
-        self.pet_images_cache = {}
+        self._pet_power = 200
+        self._pet_size = None
+        # 重绘状态：是否已安排重绘、上次绘制时的尺寸和字号
+        self._redraw_pending = False
+        self._drawn_size = None
+        self._power_font_size = None
 
+        self.setup_colors()
+        self.create_ui_elements()
 
-        self.update_power()
         self.bind_events()
         self.animate_in()
-
-        self.tray_icon = None
         self.is_visible = True
-        self.setup_tray_icon()
-        self._check_events()
 
     def setup_colors(self):
         if self.style_name == '猫娘':
@@ -138,11 +158,21 @@ class PowerWidget:
         self.canvas = tk.Canvas(self.root, width=self.widget_width, height=self.widget_height, bg=self.root.cget('bg'), highlightthickness=0)
         self.canvas.pack(fill=tk.BOTH, expand=True)
 
-        self.name_label = tk.Label(self.canvas, text=self.dorm_name, bg=self.colors['bg'], font=("微软雅黑", 10, "bold"), fg=self.colors['fg'])
-        self.power_label = tk.Label(self.canvas, text="加载中...", bg=self.colors['bg'], font=("微软雅黑", 28, "bold"), fg=self.colors['fg'])
-        self.time_label = tk.Label(self.canvas, text="", bg=self.colors['bg'], font=("微软雅黑", 8), fg=self.colors['fg'])
+        self.name_label = tk.Label(self.canvas, text=self.dorm_name, bg=self.colors['bg'], font=get_font(10, "bold"), fg=self.colors['fg'])
+        self.power_label = tk.Label(self.canvas, text="加载中...", bg=self.colors['bg'], font=get_font(28, "bold"), fg=self.colors['fg'])
+        self.time_label = tk.Label(self.canvas, text="", bg=self.colors['bg'], font=get_font(8), fg=self.colors['fg'])
         # 新增：用于显示预测结果的标签
-        self.prediction_label = tk.Label(self.canvas, text="", bg=self.colors['bg'], font=("微软雅黑", 8), fg=self.colors['fg'])
+        self.prediction_label = tk.Label(self.canvas, text="", bg=self.colors['bg'], font=get_font(8), fg=self.colors['fg'])
+
+        # 画布元素只创建一次，之后尺寸变化时用 coords 原地更新
+        style = {'fill': self.colors['bg'], 'outline': self.colors['outline'], 'width': 1}
+        self.canvas_items = {'background': self.canvas.create_polygon(0, 0, 0, 0, 0, 0, **style)}
+        if self.style_name == '猫娘':
+            self.canvas_items['left_ear'] = self.canvas.create_polygon(0, 0, 0, 0, 0, 0, **style)
+            self.canvas_items['right_ear'] = self.canvas.create_polygon(0, 0, 0, 0, 0, 0, **style)
+        for key, label in (('name', self.name_label), ('power', self.power_label),
+                           ('time', self.time_label), ('prediction', self.prediction_label)):
+            self.canvas_items[key] = self.canvas.create_window(0, 0, window=label)
 
         # 如果是数字宠物风格，则创建用于显示2D形象的Label
         if self.style_name == '数字宠物':
@@ -150,69 +180,80 @@ class PowerWidget:
             # 初始加载一个默认或“加载中”的形象
             self.update_pet_image(200) # 假设初始电量很高
 
+        # 窗口首次显示和每次尺寸变化都会触发 <Configure>，统一交给重绘调度合并处理
+        self.canvas.bind("<Configure>", lambda event: self.schedule_redraw())
         self.redraw_canvas() # 初始绘制
 
+    def schedule_redraw(self):
+        """请求重绘：同一帧内的多次请求（例如拖动调整大小时的鼠标事件）合并为一次"""
+        if self._redraw_pending or not self.root:
+            return
+        self._redraw_pending = True
+        self.root.after(REDRAW_FRAME_MS, self.redraw_canvas)
+
     def redraw_canvas(self):
-        """重新绘制所有canvas元素，以适应窗口大小变化"""
-        self.canvas.delete("all")
+        """按当前窗口大小更新canvas元素的位置和字体，尺寸未变化时不做任何事"""
+        self._redraw_pending = False
+        if not self.root:
+            return
         width = self.root.winfo_width()
         height = self.root.winfo_height()
+        if (width, height) == self._drawn_size:
+            return
+        self._drawn_size = (width, height)
         
-        # 绘制背景
-        self.create_rounded_background(width, height)
+        # 背景
+        self.update_rounded_background(width, height)
 
-        # 绘制附加装饰
+        # 附加装饰
         if self.style_name == '猫娘':
-            self.create_cat_ears(width, height)
+            self.update_cat_ears(width, height)
         
-        # 放置文本标签
-        name_y = height * 0.18
-        power_y = height * 0.5
-        time_y = height * 0.82
-        prediction_y = height * 0.95 # 预测标签的位置
-        
-        self.canvas.create_window(width/2, name_y, window=self.name_label)
-        self.canvas.create_window(width/2, power_y, window=self.power_label)
-        self.canvas.create_window(width/2, time_y, window=self.time_label)
-        self.canvas.create_window(width/2, prediction_y, window=self.prediction_label) # 添加到canvas
+        # 文本标签的位置
+        self.canvas.coords(self.canvas_items['name'], width/2, height * 0.18)
+        self.canvas.coords(self.canvas_items['power'], width/2, height * 0.5)
+        self.canvas.coords(self.canvas_items['time'], width/2, height * 0.82)
+        self.canvas.coords(self.canvas_items['prediction'], width/2, height * 0.95) # 预测标签的位置
 
-        # 动态调整字体大小
+        # 动态调整字体大小，只在字号变化时重新设置
         power_font_size = max(12, min(28, int(height / 4)))
-        self.power_label.config(font=("微软雅黑", power_font_size, "bold"))
-        self.name_label.config(font=("微软雅黑", max(8, int(power_font_size / 2.8)), "bold"))
-        base_font_size = max(6, int(power_font_size / 3.5))
-        self.time_label.config(font=("微软雅黑", base_font_size))
-        self.prediction_label.config(font=("微软雅黑", base_font_size))
-
+        if power_font_size != self._power_font_size:
+            self._power_font_size = power_font_size
+            base_font_size = max(6, int(power_font_size / 3.5))
+            self.power_label.config(font=get_font(power_font_size, "bold"))
+            self.name_label.config(font=get_font(max(8, int(power_font_size / 2.8)), "bold"))
+            self.time_label.config(font=get_font(base_font_size))
+            self.prediction_label.config(font=get_font(base_font_size))
 
         # 放置数字宠物
         if self.style_name == '数字宠物' and self.pet_label:
             pet_size = int(min(width, height) * 0.4)
             self.pet_label.place(x=width*0.05, y=height*0.3, width=pet_size, height=pet_size)
+            if pet_size != self._pet_size:
+                self._pet_size = pet_size
+                self.update_pet_image(fast=self.resizing)
 
-    def create_rounded_background(self, width, height):
-        """根据当前宽高绘制圆角背景"""
+    def update_rounded_background(self, width, height):
+        """根据当前宽高更新圆角背景"""
         radius = 20
         # 使用多边形创建更平滑的圆角矩形
         points = [
-            (radius, 0), (width - radius, 0),
-            (width, radius), (width, height - radius),
-            (width - radius, height), (radius, height),
-            (0, height - radius), (0, radius)
+            radius, 0, width - radius, 0,
+            width, radius, width, height - radius,
+            width - radius, height, radius, height,
+            0, height - radius, 0, radius
         ]
-        self.canvas.create_polygon(points, fill=self.colors['bg'], outline=self.colors['outline'], width=1)
+        self.canvas.coords(self.canvas_items['background'], *points)
 
 
-    def create_cat_ears(self, width, height):
+    def update_cat_ears(self, width, height):
         # 猫耳朵的位置和大小应相对于当前窗口尺寸
         ear_width = width * 0.15
         ear_height = height * 0.2
         # 左耳
-        self.canvas.create_polygon(width*0.1, height*0.15, width*0.1+ear_width, height*0.05, width*0.1+ear_width, height*0.15+ear_height, 
-                                   fill=self.colors['bg'], outline=self.colors['outline'], width=1)
+        self.canvas.coords(self.canvas_items['left_ear'], width*0.1, height*0.15, width*0.1+ear_width, height*0.05, width*0.1+ear_width, height*0.15+ear_height)
         # 右耳
-        self.canvas.create_polygon(width*0.9, height*0.15, width*0.9-ear_width, height*0.05, width*0.9-ear_width, height*0.15+ear_height,
-                                   fill=self.colors['bg'], outline=self.colors['outline'], width=1)
+        self.canvas.coords(self.canvas_items['right_ear'], width*0.9, height*0.15, width*0.9-ear_width, height*0.05, width*0.9-ear_width, height*0.15+ear_height)
 
     def create_power_icon(self):
         # 此函数暂时不再直接调用，因为图标可以集成到数字人或背景中
@@ -259,7 +300,8 @@ class PowerWidget:
         """鼠标释放后停止调整大小并重绘界面"""
         if self.resizing:
             self.resizing = False
-            self.redraw_canvas()
+            self.redraw_canvas() # 松开鼠标时立即完成最后一次重绘
+            self.update_pet_image() # 拖动结束后换用高质量缩放
 
     def check_resize_cursor(self, event):
         """检查鼠标是否在窗口边缘，并相应地改变光标形状。"""
@@ -321,7 +363,7 @@ class PowerWidget:
         new_height = max(new_height, 80)
         
         self.root.geometry(f"{new_width}x{new_height}+{new_x}+{new_y}")
-        self.redraw_canvas() # 在调整大小时实时重绘
+        self.schedule_redraw() # 拖动时每帧最多重绘一次
 
     def on_enter(self, event):
         """鼠标进入窗口时触发"""
@@ -339,7 +381,8 @@ class PowerWidget:
         menu.add_command(label="前往充值", command=lambda: open_recharge_page(self.dorm_id, self.dorm_type))
         menu.add_command(label="查看电量变化(主程序)", command=open_main_app)
         menu.add_separator()
-        menu.add_command(label="退出", command=self.quit_application)
+        menu.add_command(label="关闭此摆件", command=self.quit_application)
+        menu.add_command(label="退出全部摆件", command=self.host.quit)
         menu.post(event.x_root, event.y_root)
 
     def toggle_visibility(self, event=None):
@@ -348,41 +391,42 @@ class PowerWidget:
 
     def hide_window(self):
         self.root.withdraw(); self.is_visible = False
-        if self.tray_icon: self.tray_icon.update_menu()
+        self.host.update_tray_menu()
 
     def show_window(self):
-        self.root.deiconify(); self.is_visible = True
-        if self.tray_icon: self.tray_icon.update_menu()
+        self.root.deiconify(); self.root.lift(); self.is_visible = True
+        self.host.update_tray_menu()
 
     def switch_dormitory(self):
         self.quit_application()
         open_main_app()
 
-    def update_power(self):
-        threading.Thread(target=self.fetch_power, daemon=True).start()
-        self.root.after(1800000, self.update_power) # Update every 30 minutes
-
     def fetch_power(self):
-        power_text, error_message = self.scraper.get_power(self.dorm_id, self.dorm_type)
-        prediction_status, prediction_result = predict_remaining_days(self.dorm_id) # 获取预测结果
+        """查询并显示电量，在宿主的刷新线程中调用"""
+        power_text, error_message, cached_at = self.host.reading_cache.get_power(self.dorm_id, self.dorm_type)
 
         if not self.root: return
         
         if error_message:
-            return self.root.after(0, self.update_display, "获取失败", "请检查网络", "无法预测", False)
+            return self.root.after(0, self.update_display, "获取失败", "请检查网络", ('error', "无法预测"), False)
         
         try:
             match = re.search(r'(\d+\.?\d*)', power_text)
             if match:
                 power = float(match.group(1))
-                self.root.after(0, self.update_display, power, datetime.now().strftime("%H:%M:%S"), (prediction_status, prediction_result), True)
+                # 保存刚获取的读数（同时增量更新用电统计），缓存中的读数在获取时已保存过
+                if cached_at is None:
+                    self.db_manager.save_record(self.dorm_id, self.dorm_name, power)
+                prediction_status, prediction_result = predict_remaining_days(self.dorm_id, self.db_manager)
+                read_time = (cached_at or datetime.now()).strftime("%H:%M:%S")
+                self.root.after(0, self.update_display, power, read_time, (prediction_status, prediction_result), True)
                 # 更新数字宠物形象
                 if self.style_name == '数字宠物':
                     self.root.after(0, self.update_pet_image, power)
             else:
-                self.root.after(0, self.update_display, "格式错误", "无法解析", (prediction_status, prediction_result), False)
+                self.root.after(0, self.update_display, "格式错误", "无法解析", ('error', "无法预测"), False)
         except (ValueError, TypeError):
-            self.root.after(0, self.update_display, "数据异常", "非数字", (prediction_status, prediction_result), False)
+            self.root.after(0, self.update_display, "数据异常", "非数字", ('error', "无法预测"), False)
 
     def update_display(self, power, time_str, prediction_data, is_today):
         if not self.root: return
@@ -410,8 +454,7 @@ class PowerWidget:
         else:
             pred_text = "暂无预测"
         self.prediction_label.config(text=pred_text)
-
-        self.redraw_canvas() # 更新显示后也重绘一下，确保所有元素位置正确
+        # 标签嵌在canvas窗口元素中，文字变化后会自动居中，无需重绘
 
     def animate_in(self):
         self.root.attributes('-alpha', 0.0)
@@ -420,126 +463,309 @@ class PowerWidget:
             alpha = 0.1 * (i + 1)
             self.root.after(i*20, lambda a=alpha: self.root.attributes('-alpha', a))
 
-    def prepare_pet_images(self):
-        """检查并准备数字宠物所需的图片资源"""
-        # 使用基于当前文件位置的相对路径，使程序更健壮
-        img_dir = os.path.join(BASE_DIR, '..', 'img') # 向上回退一级到v1.0的父目录，再进入img
-        if not os.path.exists(img_dir):
-            os.makedirs(img_dir)
-            
-        # 定义图片路径
-        self.pet_image_paths = {
-            'high': os.path.join(img_dir, 'pet_high.png'),
-            'medium': os.path.join(img_dir, 'pet_medium.png'),
-            'low': os.path.join(img_dir, 'pet_low.png')
-        }
-
-        # 复制现有图片
-        source_high_img = os.path.join(img_dir, '电量充足.png')
-        if os.path.exists(source_high_img):
-            shutil.copy2(source_high_img, self.pet_image_paths['high'])
-        else:
-            # 如果源文件也不存在，则也为high创建一个占位符
-            create_placeholder_image(128, "电量高", "#5CB85C", self.pet_image_paths['high'])
-
-        # 创建中等和低电量占位图
-        create_placeholder_image(128, "电量中", "#F0AD4E", self.pet_image_paths['medium'])
-        create_placeholder_image(128, "电量低", "#D9534F", self.pet_image_paths['low'])
-
-
-    def update_pet_image(self, power_level):
-        """根据电量更新2D数字人宠物的图片"""
+    def update_pet_image(self, power_level=None, fast=False):
+        """
+        根据电量更新2D数字人宠物的图片。
+        图片尺寸取自上次重绘时计算的宠物区域；fast=True 时（拖动调整大小过程中）使用快速缩放。
+        """
         if self.style_name != '数字宠物':
             return
+        if power_level is not None:
+            self._pet_power = power_level
 
-        if power_level < 20:
+        if self._pet_power < 20:
             state = 'low'
-        elif power_level < 50:
+        elif self._pet_power < 50:
             state = 'medium'
         else:
             state = 'high'
-            
-        image_path = self.pet_image_paths.get(state)
 
-        if not image_path or not os.path.exists(image_path):
-            return # 如果图片路径不存在，则不执行任何操作
+        # 窗口还未完成首次绘制时没有尺寸，首次重绘时会再次调用
+        if not self.pet_label or not self._pet_size:
+            return
 
         try:
-            # 动态调整图片大小以适应标签
-            width = self.pet_label.winfo_width()
-            height = self.pet_label.winfo_height()
-            
-            # 确保尺寸大于0
-            if width <= 1 or height <= 1:
-                # 如果label尺寸无效，可能是窗口还未完全绘制，稍后重试
-                self.root.after(50, lambda: self.update_pet_image(power_level))
-                return
-
-            # 从缓存加载图片以提高性能
-            if state in self.pet_images_cache and self.pet_images_cache[state]['size'] == (width, height):
-                 self.pet_image = self.pet_images_cache[state]['image']
-            else:
-                original_image = Image.open(image_path).convert("RGBA")
-                resized_image = original_image.resize((width, height), Image.LANCZOS)
-                self.pet_image = ImageTk.PhotoImage(resized_image)
-                # 更新缓存
-                self.pet_images_cache[state] = {'image': self.pet_image, 'size': (width, height)}
-
-            if self.pet_label:
+            self.pet_image = self.host.pet_images.get(state, self._pet_size, self._pet_size, fast=fast)
+            if self.pet_image is not None:
                 self.pet_label.config(image=self.pet_image)
         except Exception as e:
             print(f"Error updating pet image: {e}")
 
 
+    def quit_application(self):
+        """关闭此摆件；最后一个摆件关闭后宿主进程随之退出"""
+        if self.root:
+            root, self.root = self.root, None
+            root.destroy()
+            self.host.remove_widget(self)
+
+
+def prepare_pet_images():
+    """检查并准备数字宠物所需的图片资源，返回各电量状态对应的图片路径"""
+    # 使用基于当前文件位置的相对路径，使程序更健壮
+    img_dir = os.path.join(BASE_DIR, '..', 'img') # 向上回退一级到v1.0的父目录，再进入img
+    if not os.path.exists(img_dir):
+        os.makedirs(img_dir)
+        
+    # 定义图片路径
+    pet_image_paths = {
+        'high': os.path.join(img_dir, 'pet_high.png'),
+        'medium': os.path.join(img_dir, 'pet_medium.png'),
+        'low': os.path.join(img_dir, 'pet_low.png')
+    }
+
+    # 复制现有图片（目标已是最新时跳过，不必每次启动都复制）
+    source_high_img = os.path.join(img_dir, '电量充足.png')
+    if os.path.exists(source_high_img):
+        if (not os.path.exists(pet_image_paths['high'])
+                or os.path.getmtime(pet_image_paths['high']) < os.path.getmtime(source_high_img)):
+            shutil.copy2(source_high_img, pet_image_paths['high'])
+    else:
+        # 如果源文件也不存在，则也为high创建一个占位符
+        create_placeholder_image(128, "电量高", "#5CB85C", pet_image_paths['high'])
+
+    # 创建中等和低电量占位图
+    create_placeholder_image(128, "电量中", "#F0AD4E", pet_image_paths['medium'])
+    create_placeholder_image(128, "电量低", "#D9534F", pet_image_paths['low'])
+    return pet_image_paths
+
+
+class PetImageCache:
+    """
+    数字宠物图片缓存，由宿主创建、所有摆件共用。
+
+    每张源图片只解码一次；缩放结果按 PET_SIZE_BUCKET 像素取整后的尺寸缓存，
+    超过 max_entries 时淘汰最久未使用的尺寸。快速缩放和高质量缩放的结果分开缓存，
+    拖动结束后请求高质量版本时不会命中拖动过程中生成的低质量图片。
+    """
+    def __init__(self, image_paths, max_entries=PET_CACHE_SIZE):
+        self.image_paths = image_paths
+        self.max_entries = max_entries
+        self._sources = {}
+        self._resized = OrderedDict()
+
+    def _source(self, state):
+        source = self._sources.get(state)
+        if source is None:
+            image_path = self.image_paths.get(state)
+            if not image_path or not os.path.exists(image_path):
+                return None # 如果图片路径不存在，则不显示
+            with Image.open(image_path) as image:
+                source = self._sources[state] = image.convert("RGBA")
+        return source
+
+    def get(self, state, width, height, fast=False):
+        """返回指定状态、尺寸的 PhotoImage，源图片不存在时返回 None"""
+        width = max(PET_SIZE_BUCKET, width // PET_SIZE_BUCKET * PET_SIZE_BUCKET)
+        height = max(PET_SIZE_BUCKET, height // PET_SIZE_BUCKET * PET_SIZE_BUCKET)
+        # 高质量版本也可以满足快速请求，反之则不行
+        keys = [(state, width, height, False)]
+        if fast:
+            keys.append((state, width, height, True))
+        for key in keys:
+            image = self._resized.get(key)
+            if image is not None:
+                self._resized.move_to_end(key)
+                return image
+        key = (state, width, height, fast)
+        source = self._source(state)
+        if source is None:
+            return None
+        resized = source.resize((width, height), Image.BILINEAR if fast else Image.LANCZOS)
+        image = self._resized[key] = ImageTk.PhotoImage(resized)
+        while len(self._resized) > self.max_entries:
+            self._resized.popitem(last=False)
+        return image
+
+
+class WidgetHost:
+    """
+    桌面摆件宿主：一个进程、一个隐藏的 Tk 根窗口管理所有宿舍的摆件。
+    摆件共用配置、数据库连接、爬虫会话、托盘图标和同一个刷新定时器；
+    主程序通过本地连接发送"添加摆件"命令（见 widget_ipc）。
+    """
+    def __init__(self, server=None):
+        self.root = tk.Tk()
+        self.root.withdraw()
+
+        self.config_manager = ConfigManager()
+        self.db_manager = DatabaseManager()
+        self.scraper = Scraper()
+        # 读数缓存与主程序共享（同一个数据库），刚被主程序查询过的宿舍不会重复抓取
+        ttl = float(self.config_manager.get_setting('Cache', 'reading_ttl_seconds', DEFAULT_TTL_SECONDS))
+        self.reading_cache = ReadingCache(self.db_manager, self.scraper.get_power, ttl=ttl)
+        self.style_name = self.config_manager.get_setting('Widget', 'style', '默认')
+        # 检查并创建图片资源，缩放结果由所有摆件共用的缓存提供
+        self.pet_images = PetImageCache(prepare_pet_images())
+
+        self.widgets = {}
+        self._refresh_lock = threading.Lock()
+        self.low_power_threshold = float(self.config_manager.get_setting('Widget', 'low_power_threshold', LOW_POWER_THRESHOLD))
+        self.poll_plan = AdaptivePollPlan(AdaptivePollPlanner(
+            REFRESH_MIN_INTERVAL, REFRESH_MAX_INTERVAL, REFRESH_DEFAULT_INTERVAL, daily_budget=REFRESH_DAILY_BUDGET,
+            below_threshold_interval=REFRESH_DEFAULT_INTERVAL))
+        self._refresh_job = None
+        self.tray_icon = None
+        self.setup_tray_icon()
+
+        self.server = server
+        if server is not None:
+            server.start(self._handle_command)
+
+    def add_widget(self, dorm_id, dorm_type, dorm_name):
+        """添加一个宿舍的摆件；该宿舍已有摆件时只把它显示到最前"""
+        widget = self.widgets.get(dorm_id)
+        if widget is not None:
+            widget.show_window()
+            return widget
+        widget = PowerWidget(self, dorm_id, dorm_type, dorm_name, slot=len(self.widgets))
+        self.widgets[dorm_id] = widget
+        self.update_tray_menu()
+        self.refresh([widget])
+        return widget
+
+    def remove_widget(self, widget):
+        if self.widgets.get(widget.dorm_id) is widget:
+            del self.widgets[widget.dorm_id]
+        if not self.widgets:
+            self.quit()
+        else:
+            self.update_tray_menu()
+
+    def refresh(self, widgets):
+        """
+        在一个后台线程中依次刷新给定的摆件，所有请求共用同一个 Session；
+        刷新后按新的用电统计重新计算各摆件的刷新时间
+        """
+        def _run():
+            with self._refresh_lock:
+                for widget in widgets:
+                    if widget.root:
+                        widget.fetch_power()
+                self.poll_plan.mark_polled([widget.dorm_id for widget in widgets])
+                self.update_poll_plan()
+            if self.root:
+                self.root.after(0, self.schedule_refresh)
+        threading.Thread(target=_run, daemon=True).start()
+
+    def update_poll_plan(self):
+        """根据数据库中的用电统计重新计算每个摆件的刷新间隔"""
+        items = {}
+        for dorm_id in list(self.widgets):
+            try:
+                stats = self.db_manager.get_consumption_stats(dorm_id)
+            except Exception:
+                stats = None
+            items[dorm_id] = (stats, self.low_power_threshold)
+        self.poll_plan.update(items)
+
+    def schedule_refresh(self):
+        """统一的刷新定时器：等到最早需要刷新的摆件到点为止"""
+        if self.root is None:
+            return
+        if self._refresh_job is not None:
+            self.root.after_cancel(self._refresh_job)
+        now = time.time()
+        delay = self.poll_plan.next_after(now) - now
+        self._refresh_job = self.root.after(max(1000, int(delay * 1000)), self.refresh_due)
+
+    def refresh_due(self):
+        """刷新所有已到刷新时间的摆件"""
+        self._refresh_job = None
+        if self.root is None:
+            return
+        due = [self.widgets[dorm_id] for dorm_id in self.poll_plan.due() if dorm_id in self.widgets]
+        if due:
+            self.refresh(due)
+        else:
+            # 到点的摆件已被关闭
+            self.update_poll_plan()
+            self.schedule_refresh()
+
+    def _handle_command(self, message):
+        """在连接线程中收到主程序的命令（已通过令牌校验），交给 Tk 主线程处理，返回是否接受"""
+        if message.get('command') != 'add' or not self.root:
+            return False
+        fields = [message.get(key) for key in ('dorm_id', 'dorm_type', 'dorm_name')]
+        if not all(isinstance(value, str) and value for value in fields):
+            return False
+        self.root.after(0, self.add_widget, *fields)
+        return True
+
+    def toggle_all(self):
+        if any(widget.is_visible for widget in self.widgets.values()):
+            for widget in self.widgets.values(): widget.hide_window()
+        else:
+            for widget in self.widgets.values(): widget.show_window()
+
+    def update_tray_menu(self):
+        if self.tray_icon: self.tray_icon.update_menu()
+
     def setup_tray_icon(self):
         def create_image(width, height, color):
             return Image.new('RGB', (width, height), color)
         
         def on_tray_click(icon, item):
             action = {
-                "显示/隐藏": self.toggle_visibility,
-                "切换宿舍": self.switch_dormitory,
-                "前往充值": lambda: open_recharge_page(self.dorm_id, self.dorm_type),
+                "隐藏全部": self.toggle_all,
+                "显示全部": self.toggle_all,
+                "添加宿舍": open_main_app,
                 "查看电量变化(主程序)": open_main_app,
-                "退出": self.quit_application
+                "退出": self.quit
             }.get(str(item))
             if action: self.root.after(0, action)
 
         menu = (
-            pystray.MenuItem(lambda text: "隐藏" if self.is_visible else "显示", on_tray_click),
+            pystray.MenuItem(lambda text: "隐藏全部" if any(w.is_visible for w in self.widgets.values()) else "显示全部", on_tray_click),
             pystray.Menu.SEPARATOR,
-            pystray.MenuItem("切换宿舍", on_tray_click),
-            pystray.MenuItem("前往充值", on_tray_click),
+            pystray.MenuItem("添加宿舍", on_tray_click),
             pystray.MenuItem("查看电量变化(主程序)", on_tray_click),
             pystray.Menu.SEPARATOR,
             pystray.MenuItem("退出", on_tray_click)
         )
-        image = create_image(64, 64, self.colors.get('high', '#4a86e8'))
+        colors = {'猫娘': '#FF87AB', '数字宠物': '#5CB85C'}
+        image = create_image(64, 64, colors.get(self.style_name, '#4a86e8'))
         self.tray_icon = pystray.Icon("电量监控", image, "电量监控", menu)
         threading.Thread(target=self.tray_icon.run, daemon=True).start()
 
-    def _check_events(self):
-        if self.root:
-            self.root.after(100, self._check_events)
-    
-    def quit_application(self):
+    def quit(self):
+        """关闭全部摆件并退出宿主进程"""
+        if self.root is None:
+            return
+        if self.server is not None:
+            self.server.close()
         if self.tray_icon: self.tray_icon.stop()
-        if self.root:
-            self.root.quit()
-            self.root.destroy()
-            self.root = None
+        for widget in list(self.widgets.values()):
+            if widget.root:
+                widget.root.destroy()
+                widget.root = None
+        self.widgets.clear()
+        root, self.root = self.root, None
+        root.quit()
+        root.destroy()
+        self.db_manager.close()
+        close_session()
 
 if __name__ == "__main__":
     if len(sys.argv) >= 4:
         dorm_id, dorm_type, dorm_name = sys.argv[1], sys.argv[2], sys.argv[3]
+        server = WidgetHostServer.create()
+        if server is None:
+            # 已有宿主进程在运行（例如两次点击几乎同时发生），把摆件交给它后退出
+            if not add_widget(dorm_id, dorm_type, dorm_name):
+                print("无法连接到正在运行的摆件宿主进程")
+            sys.exit(0)
         try:
-            app = PowerWidget(dorm_id, dorm_type, dorm_name)
-            app.root.mainloop()
+            host = WidgetHost(server)
+            host.add_widget(dorm_id, dorm_type, dorm_name)
+            host.root.mainloop()
         except tk.TclError as e:
             print(f"Tkinter TclError (expected on exit): {e}")
         except Exception as e:
             import traceback
             with open("widget_error.log", "a", encoding='utf-8') as f:
                 f.write(f"{datetime.now()}:\n{traceback.format_exc()}\n")
+        finally:
+            server.close()
     else:
-        print("Usage: python widget.py <dorm_id> <dorm_type> <dorm_name>")
\ No newline at end of file
+        print("Usage: python widget.py <dorm_id> <dorm_type> <dorm_name>")
@@ -0,0 +1,204 @@
+# 桌面摆件宿主进程的本地通信
+"""
+所有桌面摆件运行在同一个宿主进程（widget.py）中。主程序创建摆件时先尝试连接
+正在运行的宿主并发送"添加摆件"命令，连接失败时才启动新的宿主进程。
+
+宿主监听 127.0.0.1 上由系统分配的端口，并为每次运行生成随机令牌，端口和令牌写入
+当前用户目录下只有本人可读写（0600）的 widget_host.json。读不到这个文件就无法向宿主
+发送命令，同一台电脑上不同用户的摆件也不会连到别人的宿主。
+命令和回复都是一行 JSON（只含字符串等基本类型），不使用 pickle。
+
+本模块只依赖标准库，主程序导入它不会引入 Tk 以外的重量级依赖。
+"""
+import hmac
+import json
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+
+APP_DIR = os.path.join(os.path.expanduser('~'), '.XSYUDormPowerSpider')
+ENDPOINT_FILE = os.path.join(APP_DIR, 'widget_host.json')
+HOST = '127.0.0.1'
+
+CONNECT_TIMEOUT = 2.0         # 客户端连接和等待回复的超时（秒）
+CONNECTION_TIMEOUT = 2.0      # 宿主读取单个连接命令的超时（秒），连上后不发送数据的连接不会卡住宿主
+MAX_MESSAGE_BYTES = 64 * 1024
+
+WIDGET_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'widget.py')
+
+
+def _read_endpoint():
+    """读取宿主的端口和令牌，文件不存在或内容无效时返回 None"""
+    try:
+        with open(ENDPOINT_FILE, 'r', encoding='utf-8') as f:
+            endpoint = json.load(f)
+        return {'port': int(endpoint['port']), 'token': str(endpoint['token'])}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _tokens_match(token, expected):
+    """按常数时间比较令牌（令牌可能来自不可信的连接，先检查类型再按字节比较）"""
+    return isinstance(token, str) and hmac.compare_digest(token.encode('utf-8'), expected.encode('utf-8'))
+
+
+def _read_message(sock):
+    """读取一行 JSON 消息，格式错误时抛出 ValueError"""
+    with sock.makefile('rb') as stream:
+        line = stream.readline(MAX_MESSAGE_BYTES)
+    message = json.loads(line.decode('utf-8'))
+    if not isinstance(message, dict):
+        raise ValueError("消息必须是 JSON 对象")
+    return message
+
+
+def _send_message(sock, message):
+    sock.sendall(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+
+
+def _request(endpoint, command, **payload):
+    with socket.create_connection((HOST, endpoint['port']), timeout=CONNECT_TIMEOUT) as sock:
+        _send_message(sock, {'token': endpoint['token'], 'command': command, **payload})
+        return _read_message(sock)
+
+
+def send_command(command, **payload):
+    """
+    向正在运行的宿主发送命令，成功时返回宿主的回复（dict），
+    没有宿主在运行、令牌不匹配或回复无效时返回 None
+    """
+    endpoint = _read_endpoint()
+    if endpoint is None:
+        return None
+    try:
+        reply = _request(endpoint, command, **payload)
+    except (OSError, ValueError):
+        return None
+    return reply if reply.get('authenticated') else None
+
+
+def add_widget(dorm_id, dorm_type, dorm_name):
+    """请求正在运行的宿主添加一个摆件，返回是否成功"""
+    reply = send_command('add', dorm_id=dorm_id, dorm_type=dorm_type, dorm_name=dorm_name)
+    return bool(reply and reply.get('ok'))
+
+
+def launch_widget(dorm_id, dorm_type, dorm_name):
+    """
+    显示指定宿舍的摆件：宿主已在运行时直接添加，否则启动宿主进程。
+    返回 True 表示添加到了已有宿主，False 表示启动了新宿主。
+    """
+    if add_widget(dorm_id, dorm_type, dorm_name):
+        return True
+    subprocess.Popen([sys.executable, WIDGET_SCRIPT, dorm_id, dorm_type, dorm_name])
+    return False
+
+
+class WidgetHostServer:
+    """
+    宿主端的命令监听。
+
+    create() 在已有宿主运行时返回 None；否则开始监听并发布端口和令牌。
+    start(handler) 后每个连接在单独的线程中处理，handler(message) 返回是否执行成功。
+    """
+
+    def __init__(self, sock, token):
+        self._sock = sock
+        self.token = token
+        self.port = sock.getsockname()[1]
+        self._closed = False
+
+    @classmethod
+    def create(cls):
+        os.makedirs(APP_DIR, exist_ok=True)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.bind((HOST, 0))
+            sock.listen(8)
+            server = cls(sock, secrets.token_hex(32))
+            # 发布失败两次（宿主在两次尝试之间退出）时放弃，由调用方把摆件交给已有宿主或报错
+            for _ in range(2):
+                if server._publish():
+                    return server
+                if send_command('ping') is not None:
+                    break
+                server._remove_stale_endpoint()
+        except BaseException:
+            sock.close()
+            raise
+        sock.close()
+        return None
+
+    def _publish(self):
+        """
+        原子地创建端点文件：先写入临时文件（mkstemp 创建的文件权限为 0600），再用 link
+        发布到固定文件名，文件已存在时失败，两个同时启动的宿主只有一个能成功
+        """
+        fd, tmp_path = tempfile.mkstemp(prefix='widget_host.', suffix='.tmp', dir=APP_DIR)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'port': self.port, 'token': self.token, 'pid': os.getpid()}, f)
+            try:
+                os.link(tmp_path, ENDPOINT_FILE)
+            except FileExistsError:
+                return False
+            except OSError:
+                # 文件系统不支持硬链接：退回到非独占的替换
+                if os.path.exists(ENDPOINT_FILE):
+                    return False
+                os.replace(tmp_path, ENDPOINT_FILE)
+            return True
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def _remove_stale_endpoint():
+        """上次的宿主异常退出后留下的端点文件（连接不上或令牌不对）"""
+        try:
+            os.remove(ENDPOINT_FILE)
+        except OSError:
+            pass
+
+    def start(self, handler):
+        threading.Thread(target=self._accept_loop, args=(handler,), daemon=True).start()
+
+    def _accept_loop(self, handler):
+        while not self._closed:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return  # 监听已关闭
+            threading.Thread(target=self._handle, args=(conn, handler), daemon=True).start()
+
+    def _handle(self, conn, handler):
+        with conn:
+            try:
+                conn.settimeout(CONNECTION_TIMEOUT)
+                message = _read_message(conn)
+                if not _tokens_match(message.get('token'), self.token):
+                    _send_message(conn, {'authenticated': False, 'ok': False})
+                    return
+                ok = message.get('command') == 'ping' or bool(handler(message))
+                _send_message(conn, {'authenticated': True, 'ok': ok})
+            except (OSError, ValueError):
+                pass  # 超时、连接中断或消息格式错误，直接断开
+
+    def close(self):
+        """停止监听，并删除仍指向本宿主的端点文件"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            # 先 shutdown 唤醒阻塞在 accept 中的线程，仅 close 在部分平台上不会中断 accept
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+        endpoint = _read_endpoint()
+        if endpoint is not None and _tokens_match(endpoint['token'], self.token):
+            self._remove_stale_endpoint()
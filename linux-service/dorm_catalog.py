@@ -0,0 +1,210 @@
+# 宿舍目录模块：把 dorm_rooms_2025.csv 编译为可内存映射的二进制文件
+"""
+二进制目录文件格式（小端）：
+
+    头部    magic(8s) version(H) count(I) code_width(B) room_width(B) building_count(H)
+    codes     count × code_width   房间编码，右侧补 \\0，按字节序升序排列
+    rooms     count × room_width   房间号，右侧补 \\0
+    building  count × B            楼名在楼名表中的下标
+    types     count × B            宿舍类型
+    order     count × I            按CSV原始顺序排列的记录下标（用于展示顺序）
+    楼名表    building_count × (长度(B) + UTF-8 字节)
+
+查询时对 codes 区做二分查找，只解码命中的那一条记录，不会为全部房间创建对象。
+
+用法: python dorm_catalog.py build [csv路径]
+"""
+import csv
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+CATALOG_MAGIC = b'DORMCAT1'
+CATALOG_VERSION = 1
+_HEADER = struct.Struct('<8sHIBBH')
+
+
+def compile_catalog(csv_path):
+    """读取CSV并返回编译好的二进制目录内容（bytes）"""
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        rows = [(row['room_code'], row['room_number'], row['building'], row['dorm_type'])
+                for row in csv.DictReader(f)]
+    # 按编码排序以便二分查找，同时记录每条记录在CSV中的原始位置
+    sorted_positions = sorted(range(len(rows)), key=lambda pos: rows[pos][0].encode('ascii'))
+    display_order = [0] * len(rows)
+    for idx, pos in enumerate(sorted_positions):
+        display_order[pos] = idx
+    rows = [rows[pos] for pos in sorted_positions]
+
+    buildings = sorted({row[2] for row in rows})
+    building_index = {name: idx for idx, name in enumerate(buildings)}
+    code_width = max(len(row[0]) for row in rows)
+    room_width = max(len(row[1].encode('utf-8')) for row in rows)
+
+    parts = [_HEADER.pack(CATALOG_MAGIC, CATALOG_VERSION, len(rows), code_width, room_width, len(buildings))]
+    parts.append(b''.join(row[0].encode('ascii').ljust(code_width, b'\0') for row in rows))
+    parts.append(b''.join(row[1].encode('utf-8').ljust(room_width, b'\0') for row in rows))
+    parts.append(bytes(building_index[row[2]] for row in rows))
+    parts.append(bytes(int(row[3]) for row in rows))
+    parts.append(struct.pack(f'<{len(rows)}I', *display_order))
+    for name in buildings:
+        encoded = name.encode('utf-8')
+        parts.append(bytes([len(encoded)]) + encoded)
+    return b''.join(parts)
+
+
+def catalog_path_for(csv_path):
+    return os.path.splitext(csv_path)[0] + '.bin'
+
+
+def build_catalog(csv_path, output_path=None):
+    """编译CSV并写入二进制目录文件，返回输出路径"""
+    output_path = output_path or catalog_path_for(csv_path)
+    _write_catalog(compile_catalog(csv_path), output_path)
+    return output_path
+
+
+def _write_catalog(data, output_path):
+    """先写入同目录下的唯一临时文件再替换，多个进程同时编译时不会互相覆盖半写的文件"""
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(output_path) + '.',
+                                    suffix='.tmp', dir=os.path.dirname(output_path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class DormCatalog:
+    """
+    宿舍目录，延迟加载。
+
+    首次访问时打开与CSV同名的 .bin 文件并做内存映射；文件不存在、比CSV旧或已损坏时重新编译，
+    目录不可写（例如打包后的程序或只读的服务目录）时直接在内存中编译。
+    """
+
+    def __init__(self, csv_path):
+        self.csv_path = csv_path
+        self._buffer = None
+        self._count = 0
+
+    def _load(self):
+        if self._buffer is not None:
+            return
+        bin_path = catalog_path_for(self.csv_path)
+        try:
+            if not os.path.exists(bin_path) or os.path.getmtime(bin_path) < os.path.getmtime(self.csv_path):
+                build_catalog(self.csv_path, bin_path)
+            with open(bin_path, 'rb') as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # 空文件无法做内存映射时抛出 ValueError
+            buffer = None
+        if buffer is not None:
+            try:
+                self._parse_header(buffer)
+                return
+            except (struct.error, ValueError):
+                # 文件被截断或损坏：丢弃后按CSV重新编译
+                buffer.close()
+        data = compile_catalog(self.csv_path)
+        try:
+            _write_catalog(data, bin_path)
+        except OSError:
+            pass
+        self._parse_header(data)
+
+    def _parse_header(self, buffer):
+        magic, version, count, code_width, room_width, building_count = _HEADER.unpack_from(buffer, 0)
+        if magic != CATALOG_MAGIC or version != CATALOG_VERSION:
+            raise ValueError(f"无效的宿舍目录文件: {self.csv_path}")
+        self._count, self._code_width, self._room_width = count, code_width, room_width
+        self._codes_offset = _HEADER.size
+        self._rooms_offset = self._codes_offset + count * code_width
+        self._building_offset = self._rooms_offset + count * room_width
+        self._types_offset = self._building_offset + count
+        self._order_offset = self._types_offset + count
+        offset = self._order_offset + count * 4
+        self._buildings = []
+        for _ in range(building_count):
+            if offset >= len(buffer):
+                raise ValueError(f"宿舍目录文件不完整: {self.csv_path}")
+            length = buffer[offset]
+            self._buildings.append(bytes(buffer[offset + 1:offset + 1 + length]).decode('utf-8'))
+            offset += 1 + length
+        if offset > len(buffer):
+            raise ValueError(f"宿舍目录文件不完整: {self.csv_path}")
+        self._buffer = buffer
+
+    def __len__(self):
+        self._load()
+        return self._count
+
+    def _code_at(self, idx):
+        start = self._codes_offset + idx * self._code_width
+        return self._buffer[start:start + self._code_width]
+
+    def _find(self, room_code):
+        """在编码区二分查找，返回下标，未找到时返回 -1"""
+        self._load()
+        key = str(room_code).encode('ascii').ljust(self._code_width, b'\0')
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            if self._code_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self._count and self._code_at(low) == key:
+            return low
+        return -1
+
+    def _name(self, idx):
+        start = self._rooms_offset + idx * self._room_width
+        room = bytes(self._buffer[start:start + self._room_width]).rstrip(b'\0').decode('utf-8')
+        return f"{self._buildings[self._buffer[self._building_offset + idx]]}-{room}"
+
+    def _type(self, idx):
+        return str(self._buffer[self._types_offset + idx])
+
+    def _index_at(self, position):
+        """把CSV中的位置转换为按编码排序后的记录下标"""
+        return struct.unpack_from('<I', self._buffer, self._order_offset + position * 4)[0]
+
+    def entry(self, position):
+        """
+        返回CSV中第 position 条宿舍记录，格式与原先的宿舍字典一致：{'name', 'id', 'type'}。
+        记录在需要时才创建，不会常驻内存。
+        """
+        self._load()
+        idx = self._index_at(position)
+        return {'name': self._name(idx), 'id': self._code_at(idx).rstrip(b'\0').decode('ascii'), 'type': self._type(idx)}
+
+    def lookup(self, room_code):
+        """根据房间编码返回 (宿舍名称, 宿舍类型)，不存在时返回 None"""
+        idx = self._find(room_code)
+        if idx < 0:
+            return None
+        return self._name(idx), self._type(idx)
+
+    def __contains__(self, room_code):
+        return self._find(room_code) >= 0
+
+    def names(self):
+        """按CSV中的顺序返回全部宿舍名称"""
+        return [self._name(self._index_at(position)) for position in range(len(self))]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == 'build':
+        source = sys.argv[2] if len(sys.argv) >= 3 else os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'dorm_rooms_2025.csv')
+        print(f"已生成宿舍目录: {build_catalog(source)}")
+    else:
+        print("Usage: python dorm_catalog.py build [csv_path]")
@@ -0,0 +1,138 @@
+# 电量页面解析模块
+import hashlib
+import itertools
+import re
+
+# homeinfo.aspx 页面中显示剩余电量的标签，按优先级排列
+POWER_SPAN_IDS = (b'lblSYDL', b'Label1')
+
+# 流式读取时每块的大小，以及块与块之间保留的重叠字节数（保证跨块的标签也能被匹配）
+STREAM_CHUNK_SIZE = 2048
+STREAM_OVERLAP = 256
+
+# id 后必须紧跟对应的引号（或无引号时紧跟空白、/、>），避免 id="lblSYDLx" 之类的标签被误匹配
+_ID_PATTERNS = {
+    span_id: rb'\bid=(["\']?)' + span_id + rb'\1(?=[\s/>])'
+    for span_id in POWER_SPAN_IDS
+}
+_SPAN_PATTERNS = {
+    span_id: re.compile(rb'<span[^>]*' + id_pattern + rb'[^>]*>([^<]*)</span>', re.IGNORECASE)
+    for span_id, id_pattern in _ID_PATTERNS.items()
+}
+# 只判断标签是否存在（不要求标签内是纯文本）
+_SPAN_MARKERS = {
+    span_id: re.compile(rb'<span[^>]*' + id_pattern, re.IGNORECASE)
+    for span_id, id_pattern in _ID_PATTERNS.items()
+}
+
+
+def find_power_text(content):
+    """
+    快速路径：直接在原始字节中用正则查找电量标签，不构建完整的DOM树。
+    返回去掉首尾空白的标签文本，未找到时返回 None。
+    高优先级的标签存在但正则无法提取（例如标签内嵌套了其他元素）时也返回 None，
+    交给 BeautifulSoup 处理，不能越过它去取低优先级标签的文本。
+    """
+    for span_id in POWER_SPAN_IDS:
+        match = _SPAN_PATTERNS[span_id].search(content)
+        if match:
+            return match.group(2).decode('utf-8', errors='replace').strip()
+        if _SPAN_MARKERS[span_id].search(content):
+            return None
+    return None
+
+
+def parse_power_text_with_soup(content):
+    """回退路径：使用 BeautifulSoup 完整解析页面后查找电量标签"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, 'html.parser', from_encoding='utf-8')
+    power_span = soup.find('span', id='lblSYDL') or soup.find('span', id='Label1')
+    if not power_span:
+        return None
+    return power_span.get_text(strip=True)
+
+
+def extract_power_text(content):
+    """
+    从 homeinfo.aspx 的响应内容（bytes）中提取电量文本。
+    优先使用正则快速路径，仅在快速路径找不到标签时才回退到 BeautifulSoup。
+    """
+    power_text = find_power_text(content)
+    if power_text is None:
+        power_text = parse_power_text_with_soup(content)
+    return power_text
+
+
+def extract_power_text_from_stream(chunks):
+    """
+    从按块到达的响应内容中增量查找电量标签，找到最高优先级的标签后立即停止读取。
+    chunks 为可迭代的 bytes 块（例如 response.iter_content()）。
+    返回 (power_text, finished)，finished 表示是否已读完全部内容。
+    """
+    primary_id, secondary_id = POWER_SPAN_IDS
+    received = []
+    tail = b''
+    secondary_text = None
+    primary_seen = False
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        received.append(chunk)
+        window = tail + chunk
+        match = _SPAN_PATTERNS[primary_id].search(window)
+        if match:
+            return match.group(2).decode('utf-8', errors='replace').strip(), False
+        if not primary_seen and _SPAN_MARKERS[primary_id].search(window):
+            primary_seen = True
+        if secondary_text is None:
+            match = _SPAN_PATTERNS[secondary_id].search(window)
+            if match:
+                secondary_text = match.group(2).decode('utf-8', errors='replace').strip()
+        tail = window[-STREAM_OVERLAP:]
+
+    if secondary_text is not None and not primary_seen:
+        return secondary_text, True
+    # 快速路径未命中（例如高优先级标签内嵌套了其他元素），对完整内容回退到 BeautifulSoup
+    return parse_power_text_with_soup(b''.join(received)), True
+
+
+def content_digest(content):
+    """页面内容的摘要，用于判断两次获取的内容是否完全相同"""
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+def extract_power_text_with_fingerprint(chunks, previous=None):
+    """
+    与 extract_power_text_from_stream 相同，同时返回已读取内容的指纹 (字节数, 摘要)。
+
+    previous 为上次的 (指纹, power_text)：先读取与上次相同字节数的内容，
+    摘要一致说明直到电量标签为止的页面与上次逐字节相同，直接返回上次的结果，不再查找标签。
+    返回 (power_text, finished, fingerprint, unchanged)。
+    """
+    chunks = iter(chunks)
+    buffered = []
+    if previous is not None:
+        (length, digest), previous_text = previous
+        size = 0
+        for chunk in chunks:
+            if not chunk:
+                continue
+            buffered.append(chunk)
+            size += len(chunk)
+            if size >= length:
+                break
+        if size >= length and content_digest(b''.join(buffered)[:length]) == digest:
+            return previous_text, False, (length, digest), True
+
+    received = []
+
+    def recording():
+        for chunk in itertools.chain(buffered, chunks):
+            received.append(chunk)
+            yield chunk
+
+    power_text, finished = extract_power_text_from_stream(recording())
+    content = b''.join(received)
+    return power_text, finished, (len(content), content_digest(content)), False
@@ -0,0 +1,141 @@
+# 共享HTTP客户端模块
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 连接池设置：缓存的主机数，以及每个主机保持的最大连接数
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 8
+
+# 提前结束读取时，剩余内容不超过该字节数则读完它，让连接回到连接池复用
+DRAIN_LIMIT = 16 * 1024
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+    "Connection": "keep-alive",
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE):
+    """
+    创建一个带连接池的 Session。
+    pool_block=True 使同一主机的并发连接数不超过 pool_maxsize，
+    多余的请求会等待空闲连接，而不是临时新建连接。
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def get_session():
+    """获取进程内共享的 Session，所有爬虫共用同一个连接池以复用 keep-alive 连接"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def release_response(response, finished=False, drain_limit=DRAIN_LIMIT):
+    """
+    释放一个以 stream=True 方式获取的响应。
+    已读完时直接归还连接；提前停止读取时，若剩余内容很少则读完后归还连接
+    （比重新握手更划算），否则直接关闭连接，不再下载剩余内容。
+    """
+    if finished:
+        response.close()
+        return
+    try:
+        remaining = int(response.headers.get('Content-Length', '')) - response.raw.tell()
+    except (TypeError, ValueError):
+        remaining = None
+    if remaining is not None and remaining <= drain_limit:
+        try:
+            response.raw.drain_conn()
+            response.raw.release_conn()
+            return
+        except Exception:
+            pass
+    response.close()
+
+
+class _PageEntry:
+    __slots__ = ('etag', 'last_modified', 'fingerprint', 'value', 'unchanged')
+
+    def __init__(self, etag, last_modified, fingerprint, value, unchanged):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fingerprint = fingerprint
+        self.value = value
+        self.unchanged = unchanged
+
+
+class PageCache:
+    """
+    按键（通常是宿舍）记住上一次响应的 ETag / Last-Modified、内容指纹和解析结果：
+    有验证器时发送条件请求（304 时不下载页面），页面内容与上次相同时跳过解析，直接复用上次的结果。
+    stats 统计 not_modified（304）、unchanged（内容相同）、changed（内容变化或首次获取）的次数。
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.stats = {'not_modified': 0, 'unchanged': 0, 'changed': 0}
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def conditional_headers(self, key):
+        """上次响应带有验证器时返回对应的条件请求头"""
+        entry = self._entries.get(key)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def not_modified(self, key):
+        """服务器返回 304 时调用，返回上次的解析结果"""
+        with self._lock:
+            entry = self._entries[key]
+            entry.unchanged = True
+            self.stats['not_modified'] += 1
+            return entry.value
+
+    def store(self, key, response, fingerprint, value, unchanged=False):
+        """记录本次响应的验证器、内容指纹和解析结果"""
+        with self._lock:
+            self._entries[key] = _PageEntry(response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                                            fingerprint, value, unchanged)
+            self.stats['unchanged' if unchanged else 'changed'] += 1
+
+    def was_unchanged(self, key):
+        """该键最近一次获取的页面是否与之前相同"""
+        entry = self._entries.get(key)
+        return bool(entry and entry.unchanged)
+
+    @staticmethod
+    def hit_rate(stats):
+        total = sum(stats.values())
+        return (stats['not_modified'] + stats['unchanged']) / total if total else 0.0
+
+
+def close_session():
+    """关闭共享 Session 及其连接池"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
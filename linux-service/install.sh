@@ -54,7 +54,7 @@ check_requirements() {
 install_dependencies() {
     print_info "安装Python依赖..."
     
-    pip3 install requests beautifulsoup4 pyyaml schedule
+    pip3 install requests beautifulsoup4 pyyaml
     
     print_info "Python依赖安装完成"
 }
@@ -78,12 +78,14 @@ create_directories() {
     
     mkdir -p /opt/power-monitor
     mkdir -p /opt/power-monitor/logs
+    mkdir -p /opt/power-monitor/data
     mkdir -p /etc/power-monitor
     
     # 设置权限
     chown -R power-monitor:power-monitor /opt/power-monitor
     chmod 755 /opt/power-monitor
     chmod 755 /opt/power-monitor/logs
+    chmod 755 /opt/power-monitor/data
     
     print_info "目录结构创建完成"
 }
@@ -92,10 +94,14 @@ create_directories() {
 copy_files() {
     print_info "复制服务文件..."
     
-    # 复制Python脚本
-    cp power_monitor_service.py /opt/power-monitor/
+    # 复制Python脚本（服务主程序及其依赖模块；测试文件不安装）
+    cp power_monitor_service.py poller.py upstream_guard.py scheduler.py polling_policy.py \
+       notifier.py http_client.py extractor.py database.py dorm_catalog.py /opt/power-monitor/
     cp dorm_rooms_2025.csv /opt/power-monitor/
     
+    # 预先编译宿舍目录（服务运行时 /opt 为只读，无法在首次启动时生成）
+    python3 /opt/power-monitor/dorm_catalog.py build /opt/power-monitor/dorm_rooms_2025.csv
+    
     # 复制配置文件
     cp config.yaml /etc/power-monitor/
     
@@ -103,11 +109,13 @@ copy_files() {
     cp power-monitor.service /etc/systemd/system/
     
     # 设置权限
-    chown power-monitor:power-monitor /opt/power-monitor/power_monitor_service.py
+    chown power-monitor:power-monitor /opt/power-monitor/*.py
     chown power-monitor:power-monitor /opt/power-monitor/dorm_rooms_2025.csv
+    chown power-monitor:power-monitor /opt/power-monitor/dorm_rooms_2025.bin
     chown power-monitor:power-monitor /etc/power-monitor/config.yaml
-    chmod 644 /opt/power-monitor/power_monitor_service.py
+    chmod 644 /opt/power-monitor/*.py
     chmod 644 /opt/power-monitor/dorm_rooms_2025.csv
+    chmod 644 /opt/power-monitor/dorm_rooms_2025.bin
     chmod 644 /etc/power-monitor/config.yaml
     chmod 644 /etc/systemd/system/power-monitor.service
     
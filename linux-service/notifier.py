@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步通知分发模块
+功能：
+1. 通知提交后立即返回，发送在后台线程池中进行，不阻塞电量查询
+2. 同一条通知的多个渠道（Server酱、Webhook 等）并行发送
+3. 可把一轮监控中同一分组的多个低电量宿舍合并成一条汇总通知（Digest）
+4. 网络错误、5xx、429 等临时错误按指数退避重试，4xx 等永久错误不重试
+5. 每条通知的所有渠道发送完成后回调 on_result，由调用方记录结果
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+
+class Notification:
+    """一条待发送的低电量通知"""
+
+    def __init__(self, dorm_id: str, dorm_name: str, dorm_type: str, power: float, threshold: float,
+                 group: Optional[str] = None):
+        self.dorm_id = dorm_id
+        self.dorm_name = dorm_name
+        self.dorm_type = dorm_type
+        self.power = power
+        self.threshold = threshold
+        self.group = group
+        self.created_at = time.time()
+
+    @property
+    def key(self) -> str:
+        """去重键：同一键的通知在发送完成前不会重复入队"""
+        return self.dorm_id
+
+    @property
+    def label(self) -> str:
+        return self.dorm_name
+
+    @property
+    def dorm_ids(self) -> List[str]:
+        return [self.dorm_id]
+
+
+class Digest:
+    """一轮监控中同一分组内所有低电量宿舍的汇总通知"""
+
+    def __init__(self, group: str, notifications: List[Notification]):
+        self.group = group
+        self.notifications = sorted(notifications, key=lambda n: n.power)
+        self.created_at = time.time()
+
+    @property
+    def key(self) -> str:
+        return f"digest:{self.group}"
+
+    @property
+    def label(self) -> str:
+        return f"{self.group} 汇总 ({len(self.notifications)} 个宿舍)"
+
+    @property
+    def dorm_ids(self) -> List[str]:
+        return [n.dorm_id for n in self.notifications]
+
+
+# 渠道发送函数（参数为 Notification 或 Digest）：成功返回 True，永久失败返回 False，临时错误抛出异常（会被重试）
+Channel = Tuple[str, Callable[[Notification], bool]]
+
+
+def is_retryable(error: Exception) -> bool:
+    """判断发送错误是否值得重试：HTTP 4xx（429 除外）视为永久错误"""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(error, (requests.RequestException, OSError))
+
+
+class _Pending:
+    """一条正在发送的通知，记录各渠道的发送结果"""
+
+    def __init__(self, notification: Notification, channels: List[str]):
+        self.notification = notification
+        self.remaining = len(channels)
+        self.results: Dict[str, bool] = {}
+
+
+class NotificationDispatcher:
+    """
+    通知分发器
+
+    submit() 把通知的每个渠道作为一个任务放入线程池队列后立即返回；
+    同一键（宿舍或汇总分组）的通知在发送完成前不会重复入队。
+    """
+
+    def __init__(self, channels: List[Channel], max_workers: int = 4, max_retries: int = 3,
+                 backoff_base: float = 2.0, backoff_max: float = 60.0,
+                 on_result: Optional[Callable[[Notification, Dict[str, bool]], None]] = None,
+                 logger=None):
+        self.channels = list(channels)
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = float(backoff_base)
+        self.backoff_max = float(backoff_max)
+        self.on_result = on_result
+        self.logger = logger
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)),
+                                            thread_name_prefix="notifier")
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending: Dict[str, _Pending] = {}
+        self._stopping = threading.Event()
+        self.stats = {"sent": 0, "failed": 0, "retried": 0}
+
+    def is_pending(self, key: str) -> bool:
+        with self._lock:
+            return key in self._pending
+
+    def submit(self, notification: Notification) -> bool:
+        """提交通知，立即返回；没有启用的渠道、同一键的通知正在发送或分发器已关闭时返回 False"""
+        if not self.channels or self._stopping.is_set():
+            return False
+        with self._lock:
+            if notification.key in self._pending:
+                return False
+            pending = self._pending[notification.key] = _Pending(
+                notification, [name for name, _ in self.channels])
+        for name, send in self.channels:
+            self._executor.submit(self._deliver, pending, name, send)
+        return True
+
+    def _backoff(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待时间：指数增长并加入抖动，避免多条通知同时重试"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _deliver(self, pending: _Pending, name: str, send: Callable[[Notification], bool]):
+        notification = pending.notification
+        success = False
+        for attempt in range(self.max_retries + 1):
+            try:
+                success = bool(send(notification))
+                break
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e) or self._stopping.is_set():
+                    self._log("error", f"{name} 通知发送失败 ({notification.label}): {e}")
+                    break
+                delay = self._backoff(attempt)
+                self._log("warning", f"{name} 通知发送出错，{delay:.1f} 秒后重试 ({notification.label}): {e}")
+                with self._lock:
+                    self.stats["retried"] += 1
+                # 关闭分发器时立即结束等待
+                if self._stopping.wait(delay):
+                    break
+        self._finish(pending, name, success)
+
+    def _finish(self, pending: _Pending, name: str, success: bool):
+        with self._lock:
+            pending.results[name] = success
+            self.stats["sent" if success else "failed"] += 1
+            pending.remaining -= 1
+            done = pending.remaining == 0
+        if not done:
+            return
+        try:
+            if self.on_result:
+                self.on_result(pending.notification, pending.results)
+        except Exception as e:
+            self._log("error", f"记录通知结果失败: {e}")
+        finally:
+            with self._lock:
+                self._pending.pop(pending.notification.key, None)
+                self._idle.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待所有已提交的通知发送完成，超时返回 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 30.0):
+        """停止接收新通知，等待已提交的通知发送完成（最多 timeout 秒），然后关闭线程池"""
+        self._stopping.set()
+        if not self.flush(timeout):
+            self._log("warning", f"关闭时仍有 {len(self._pending)} 条通知未发送完成")
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _log(self, level: str, message: str):
+        if self.logger:
+            getattr(self.logger, level)(message)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步并发轮询模块
+功能：
+1. 在全局并发上限内并发执行电量查询
+2. 统计整轮轮询的耗时
+
+请求速率不在这里限制：所有对电量查询服务器的请求都经过 upstream_guard.UpstreamGuard，
+由它统一限速和调整实际并发。
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+
+class AsyncPoller:
+    """
+    异步并发轮询器
+
+    每个任务是一个阻塞的查询函数，在线程池中执行；所有任务受全局并发上限限制。
+    """
+
+    def __init__(self, max_concurrency: int = 8):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.last_duration = 0.0
+
+    def poll(self, jobs: List[Callable[[], Any]],
+             should_continue: Optional[Callable[[], bool]] = None) -> List[Any]:
+        """
+        执行一轮轮询
+
+        Args:
+            jobs: 查询函数列表
+            should_continue: 每个任务开始前调用，返回False时跳过剩余任务
+
+        Returns:
+            与 jobs 顺序一致的结果列表，被跳过或出错的任务结果为None
+        """
+        start = time.monotonic()
+        try:
+            return asyncio.run(self._poll_all(jobs, should_continue))
+        finally:
+            self.last_duration = time.monotonic() - start
+
+    async def _poll_all(self, jobs, should_continue):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        loop = asyncio.get_running_loop()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            async def run_job(func):
+                async with semaphore:
+                    if should_continue and not should_continue():
+                        return None
+                    try:
+                        return await loop.run_in_executor(executor, func)
+                    except Exception:
+                        return None
+
+            return await asyncio.gather(*(run_job(func) for func in jobs))
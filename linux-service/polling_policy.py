@@ -0,0 +1,152 @@
+# 自适应查询间隔模块
+"""
+根据滚动用电统计（consumption_stats）预测每个宿舍的电量还要多久降到阈值：
+离阈值越近查询越频繁，电量还够用几周的宿舍很少查询；
+所有宿舍每天的查询总数受预算限制，超出时整体放大间隔。
+
+主程序（桌面摆件）和 linux-service 共用本模块，两处文件内容相同。
+"""
+import time
+from datetime import datetime
+
+DEFAULT_MIN_INTERVAL = 15 * 60         # 最短查询间隔（秒）
+DEFAULT_MAX_INTERVAL = 24 * 3600       # 最长查询间隔（秒）
+DEFAULT_INTERVAL = 6 * 3600            # 还没有用电速率数据时的查询间隔（秒）
+DEFAULT_LEAD_FRACTION = 0.25           # 间隔取预计到达阈值时间的比例：到达阈值前大约查询 1/0.25 = 4 次
+MIN_DAILY_RATE = 0.01                  # 日均用电低于该值(度/天)视为几乎不用电，按最长间隔查询
+
+
+class AdaptivePollPlanner:
+    """根据用电统计计算查询间隔"""
+
+    def __init__(self, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL,
+                 default_interval=DEFAULT_INTERVAL, lead_fraction=DEFAULT_LEAD_FRACTION, daily_budget=0,
+                 below_threshold_interval=None):
+        """
+        daily_budget 为所有宿舍每天最多查询的次数，0 表示不限制；
+        below_threshold_interval 为电量已低于阈值的宿舍的查询间隔，默认为最长间隔
+        """
+        self.min_interval = float(min_interval)
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self.default_interval = min(self.max_interval, max(self.min_interval, float(default_interval)))
+        self.below_threshold_interval = self.max_interval if below_threshold_interval is None \
+            else self._clamp(float(below_threshold_interval))
+        self.lead_fraction = float(lead_fraction)
+        self.daily_budget = int(daily_budget or 0)
+
+    def _clamp(self, seconds):
+        return min(self.max_interval, max(self.min_interval, seconds))
+
+    def interval(self, stats, threshold, now):
+        """
+        单个宿舍的查询间隔（秒），不考虑预算。
+        stats 为 DatabaseManager.get_consumption_stats 的返回值，threshold 为提醒阈值（度）
+        """
+        if not stats or stats.get('latest_power') is None:
+            return self.default_interval
+        headroom = stats['latest_power'] - threshold
+        if headroom < 0:
+            # 已低于阈值：提醒已经发出，频繁查询只会重复提醒，退避到较长的间隔直到充值后读数回升
+            return self.below_threshold_interval
+        if headroom == 0:
+            # 正好等于阈值（尚未提醒），随时会跌破
+            return self.min_interval
+        rate = stats.get('daily_rate')
+        if rate is None:
+            return self.default_interval
+        if rate < MIN_DAILY_RATE:
+            return self.max_interval
+        seconds_left = headroom / rate * 86400
+        try:
+            # 扣除最近一次读数之后已经过去的时间
+            seconds_left -= max(0.0, now - datetime.fromisoformat(stats['latest_time']).timestamp())
+        except (TypeError, ValueError):
+            pass
+        return self._clamp(seconds_left * self.lead_fraction)
+
+    def plan(self, items, now):
+        """
+        计算一组宿舍的查询间隔 {key: 秒}。
+        items 为 {key: (stats, threshold)}；每天的查询总数超过预算时，
+        按同一倍数放大所有间隔（达到最长间隔的不再放大），仍超出时所有宿舍平均分配预算。
+        """
+        intervals = {key: self.interval(stats, threshold, now) for key, (stats, threshold) in items.items()}
+        if not intervals or self.daily_budget <= 0 or self.daily_requests(intervals.values()) <= self.daily_budget:
+            return intervals
+
+        def scaled(factor):
+            return {key: min(self.max_interval, seconds * factor) for key, seconds in intervals.items()}
+
+        if self.daily_requests([self.max_interval] * len(intervals)) > self.daily_budget:
+            even = len(intervals) * 86400 / self.daily_budget
+            return {key: even for key in intervals}
+        # 查询次数随倍数单调递减，二分查找满足预算的最小倍数
+        low, high = 1.0, self.max_interval / self.min_interval
+        for _ in range(40):
+            middle = (low + high) / 2
+            if self.daily_requests(scaled(middle).values()) > self.daily_budget:
+                low = middle
+            else:
+                high = middle
+        return scaled(high)
+
+    @staticmethod
+    def daily_requests(intervals):
+        return sum(86400 / seconds for seconds in intervals)
+
+
+class AdaptivePollPlan:
+    """
+    记录每个宿舍的下次查询时间。
+    实现了 next_after(moment)，可直接作为 scheduler.Scheduler 的触发器使用。
+    """
+
+    def __init__(self, planner, clock=time.time):
+        self.planner = planner
+        self.clock = clock
+        self.intervals = {}
+        self.next_due = {}
+        self.last_polled = {}
+
+    def update(self, items, now=None):
+        """按最新的用电统计重新计算间隔；items 为 {key: (stats, threshold)}，不在其中的宿舍被移除"""
+        now = self.clock() if now is None else now
+        self.intervals = self.planner.plan(items, now)
+        for key in list(self.last_polled):
+            if key not in items:
+                del self.last_polled[key]
+        self.next_due = {}
+        for key, (stats, _) in items.items():
+            last = self.last_polled.get(key)
+            if last is None and stats and stats.get('latest_time'):
+                # 刚启动时以数据库中最近一次读数的时间为准，避免重启后立即查询全部宿舍
+                try:
+                    last = datetime.fromisoformat(stats['latest_time']).timestamp()
+                except (TypeError, ValueError):
+                    last = None
+            self.next_due[key] = now if last is None else last + self.intervals[key]
+
+    def due(self, now=None):
+        """返回已到查询时间的宿舍"""
+        now = self.clock() if now is None else now
+        return [key for key, moment in self.next_due.items() if moment <= now]
+
+    def mark_polled(self, keys, now=None):
+        """记录查询时间（无论成功与否），下次查询时间从此刻起算"""
+        now = self.clock() if now is None else now
+        for key in keys:
+            self.last_polled[key] = now
+            if key in self.intervals:
+                self.next_due[key] = now + self.intervals[key]
+
+    def next_after(self, moment):
+        """最近一个宿舍的下次查询时间；没有宿舍时返回 moment 之后的最长间隔"""
+        if not self.next_due:
+            return moment + self.planner.max_interval
+        return max(moment, min(self.next_due.values()))
+
+    def daily_requests(self):
+        return self.planner.daily_requests(self.intervals.values())
+
+    def __str__(self):
+        return f"自适应轮询 ({len(self.intervals)} 个宿舍，约每天 {self.daily_requests():.0f} 次查询)"
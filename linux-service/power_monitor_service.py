@@ -10,19 +10,36 @@
 """
 
 import requests
-from bs4 import BeautifulSoup
 import re
 import time
 import yaml
 import logging
 import threading
-from datetime import datetime, timedelta
-import csv
+from datetime import date, datetime, timedelta
 import os
 import sys
 import signal
 from typing import Dict, List, Tuple, Optional
-import schedule
+
+from poller import AsyncPoller
+from upstream_guard import UpstreamGuard, UpstreamUnavailable
+from scheduler import Scheduler
+from polling_policy import AdaptivePollPlan, AdaptivePollPlanner
+from notifier import Digest, Notification, NotificationDispatcher
+from http_client import PageCache, create_session, release_response
+from extractor import extract_power_text_with_fingerprint, STREAM_CHUNK_SIZE
+from database import DatabaseManager
+from dorm_catalog import DormCatalog
+
+POWER_QUERY_URL = "http://hydz.xsyu.edu.cn/wxpay/homeinfo.aspx?xid={dorm_id}&type={dorm_type}&opid=a"
+
+# 配置文件 templates 中未设置时使用的通知模板
+DEFAULT_TEMPLATES = {
+    "title": "⚠️ 电量不足提醒 - {dorm_name}",
+    "digest_title": "⚠️ 电量不足提醒 - {group} ({count} 个宿舍)",
+    "digest_item": "{dorm_name}: {power} 度 (阈值 {threshold} 度)",
+    "digest_content": "{rooms}\n\n⏰ 提醒时间: {time}",
+}
 
 class PowerMonitorService:
     def __init__(self, config_file: str = "config.yaml"):
@@ -42,9 +59,31 @@ class PowerMonitorService:
         self.config = self.load_config()      # 先加载配置
         self.setup_logging()                  # 再根据配置重设日志
         self.dormitories = self.load_dormitory_data()
-        self.notified_dorms = set()
+        # 所有电量查询共用一个带连接池的 Session，复用 keep-alive 连接
+        pool_size = self.config.get("monitor", {}).get("polling", {}).get("max_concurrency", 8)
+        self.session = create_session(pool_maxsize=max(1, int(pool_size)))
+        # 所有电量查询共用的限速、AIMD 并发控制和熔断器
+        self.upstream = self.create_upstream_guard()
+        # 每个宿舍上次获取的页面指纹（及 ETag/Last-Modified），页面没变时跳过解析和写库
+        self.power_pages = PageCache()
+        # 每个宿舍最近一次写库的日期 {dorm_id: date}，页面没变化时当天只写一次
+        self.saved_dates: Dict[str, date] = {}
+        # 电量记录数据库
+        db_path = self.config.get("monitor", {}).get("database", "data/power_monitor.db")
+        self.db_manager = DatabaseManager(db_path=db_path)
+        # 通知冷却期 {dorm_id: 到期时间戳}，持久化在数据库中，重启后不会重复通知
+        self.notification_cooldowns = self.db_manager.load_notification_cooldowns(time.time())
+        # 低电量通知在后台线程池中异步发送，不阻塞电量查询
+        self.notifier = self.create_notifier()
+        # 汇总通知模式下，本轮监控中需要通知的宿舍；为 None 时逐个发送
+        self.sweep_breaches: Optional[List[Notification]] = None
         self.is_running = False
+        self.scheduler = Scheduler()
+        self.scheduler.on_error = lambda job, e: self.logger.error(f"定时任务 {job.name} 出错: {e}")
         self.scheduler_thread = None
+        # 自适应轮询：按预计到达阈值的时间决定每个宿舍的查询频率（未启用时为 None）
+        self.poll_plan: Optional[AdaptivePollPlan] = None
+        self.adaptive_dorms: List[dict] = []
         # 信号处理
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
@@ -99,29 +138,19 @@ class PowerMonitorService:
         )
         self.logger = logging.getLogger(__name__)
     
-    def load_dormitory_data(self) -> Dict[str, Tuple[str, str]]:
-        """加载宿舍数据"""
-        dormitories = {}
-        try:
-            # 检查是否是打包后的可执行文件
-            if getattr(sys, 'frozen', False):
-                base_path = sys._MEIPASS
-            else:
-                base_path = os.path.dirname(os.path.abspath(__file__))
+    def load_dormitory_data(self) -> Optional[DormCatalog]:
+        """加载宿舍目录（二进制目录文件在首次查询时才映射到内存）"""
+        # 检查是否是打包后的可执行文件
+        if getattr(sys, 'frozen', False):
+            base_path = sys._MEIPASS
+        else:
+            base_path = os.path.dirname(os.path.abspath(__file__))
 
-            file_path = os.path.join(base_path, 'dorm_rooms_2025.csv')
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    dorm_id = row['room_code']
-                    dorm_name = f"{row['building']}-{row['room_number']}"
-                    dorm_type = row['dorm_type']
-                    dormitories[dorm_id] = (dorm_name, dorm_type)
-                    
-        except Exception as e:
-            self.logger.error(f"加载宿舍数据失败: {e}")
-            
-        return dormitories
+        file_path = os.path.join(base_path, 'dorm_rooms_2025.csv')
+        if not os.path.exists(file_path):
+            self.logger.error(f"加载宿舍数据失败: 找不到 {file_path}")
+            return None
+        return DormCatalog(file_path)
     
     def query_power(self, dorm_id: str, dorm_name: str, dorm_type: str) -> Optional[float]:
         """
@@ -136,29 +165,41 @@ class PowerMonitorService:
             电量值（度），查询失败返回None
         """
         try:
-            url = f"http://hydz.xsyu.edu.cn/wxpay/homeinfo.aspx?xid={dorm_id}&type={dorm_type}&opid=a"
+            url = POWER_QUERY_URL.format(dorm_id=dorm_id, dorm_type=dorm_type)
             headers = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/91.0.4472.124 Safari/537.36",
                 "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
                 "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
                 "Referer": "https://hydz.xsyu.edu.cn/wxpay/homeinfo.aspx",
             }
+            headers.update(self.power_pages.conditional_headers(dorm_id))
+            entry = self.power_pages.get(dorm_id)
 
-            response = requests.get(url, headers=headers, timeout=15)
-            response.encoding = 'utf-8'
+            with self.upstream.request() as call:
+                response = self.session.get(url, headers=headers, timeout=15, stream=True)
+                call.observe(response)
+                if response.status_code == 304 and entry is not None:
+                    response.close()
+                    power = float(self.power_pages.not_modified(dorm_id))
+                    self.logger.info(f"{dorm_name} 电量: {power} 度 (页面未变化)")
+                    return power
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            power_span = soup.find('span', id='lblSYDL') or soup.find('span', id='Label1')
-            if not power_span:
+                # 分块读取页面，找到电量标签后立即停止下载；与上次内容相同时跳过查找
+                finished = True
+                previous = (entry.fingerprint, entry.value) if entry is not None else None
+                try:
+                    power_text, finished, fingerprint, unchanged = extract_power_text_with_fingerprint(
+                        response.iter_content(chunk_size=STREAM_CHUNK_SIZE), previous)
+                finally:
+                    release_response(response, finished)
+            if power_text is None:
                 self.logger.error(f"未找到电量标签: {dorm_name}")
                 return None
-                
-            power_text = power_span.get_text().strip()
 
             if re.match(r'^\d+\.\d+$', power_text):
                 power = float(power_text)
-                self.logger.info(f"{dorm_name} 电量: {power} 度")
+                self.power_pages.store(dorm_id, response, fingerprint, power_text, unchanged)
+                self.logger.info(f"{dorm_name} 电量: {power} 度{' (页面未变化)' if unchanged else ''}")
                 return power
             elif power_text == "暂不支持查询":
                 self.logger.warning(f"{dorm_name} 不支持电量查询")
@@ -167,6 +208,10 @@ class PowerMonitorService:
                 self.logger.error(f"{dorm_name} 电量格式异常: '{power_text}'")
                 return None
 
+        except UpstreamUnavailable:
+            # 熔断期间立即失败，熔断时已记录过日志，这里不再逐个宿舍报错
+            self.logger.debug(f"电量查询服务器熔断中，跳过 {dorm_name}")
+            return None
         except requests.RequestException as e:
             self.logger.error(f"网络请求错误 ({dorm_name}): {e}")
             return None
@@ -174,151 +219,247 @@ class PowerMonitorService:
             self.logger.error(f"查询电量失败 ({dorm_name}): {e}")
             return None
     
-    def send_server_chan_notification(self, dorm_name: str, power: float, dorm_id: str, dorm_type: str, threshold: float) -> bool:
-        """发送Server酱通知"""
-        server_chan_config = self.config.get("notifications", {}).get("server_chan", {})
-        
-        if not server_chan_config.get("enabled", False):
-            return False
-            
+    def create_upstream_guard(self) -> UpstreamGuard:
+        """根据 monitor.polling 配置创建电量查询服务器的请求保护"""
+        polling_config = self.config.get("monitor", {}).get("polling", {}) or {}
+        breaker_config = polling_config.get("circuit_breaker", {}) or {}
+        max_concurrency = polling_config.get("max_concurrency", 8)
+        return UpstreamGuard(
+            requests_per_second=polling_config.get("requests_per_second", 4),
+            burst=polling_config.get("burst", 4),
+            min_concurrency=polling_config.get("min_concurrency", 1),
+            max_concurrency=max_concurrency,
+            initial_concurrency=polling_config.get("initial_concurrency", min(2, max_concurrency)),
+            failure_threshold=breaker_config.get("failure_threshold", 5),
+            reset_timeout=breaker_config.get("reset_timeout_seconds", 60),
+            on_state_change=self.on_upstream_state_change,
+        )
+    
+    def on_upstream_state_change(self, previous: str, state: str):
+        """熔断器状态变化时记录日志"""
+        if state == "熔断":
+            self.logger.warning(f"电量查询服务器连续出错，熔断 {self.upstream.breaker.reset_timeout:g} 秒，期间的查询直接跳过")
+        else:
+            self.logger.info(f"电量查询服务器熔断器: {previous} -> {state}")
+    
+    def build_notification_channels(self) -> List[Tuple[str, object]]:
+        """根据配置返回已启用的通知渠道 [(渠道名, 发送函数)]"""
+        notifications_config = self.config.get("notifications", {})
+        channels = []
+        if notifications_config.get("server_chan", {}).get("enabled", False):
+            channels.append(("Server酱", self.send_server_chan_notification))
+        if notifications_config.get("custom_webhook", {}).get("enabled", False):
+            channels.append(("自定义Webhook", self.send_custom_webhook_notification))
+        return channels
+    
+    def create_notifier(self) -> NotificationDispatcher:
+        """创建异步通知分发器，通知请求使用单独的连接池，不占用电量查询的连接"""
+        dispatch_config = self.config.get("notifications", {}).get("dispatch", {}) or {}
+        workers = max(1, int(dispatch_config.get("max_workers", 4)))
+        self.notification_session = create_session(pool_maxsize=workers)
+        return NotificationDispatcher(
+            self.build_notification_channels(),
+            max_workers=workers,
+            max_retries=dispatch_config.get("max_retries", 3),
+            backoff_base=dispatch_config.get("backoff_base", 2.0),
+            backoff_max=dispatch_config.get("backoff_max", 60.0),
+            on_result=self.record_notification_result,
+            logger=self.logger,
+        )
+    
+    def get_channel_config(self, channel: str, group: Optional[str] = None) -> dict:
+        """
+        获取通知渠道配置
+        notifications.groups.<分组>.<渠道> 中的设置（如不同的 sendkey、url）会覆盖该分组的默认渠道配置
+        """
+        notifications_config = self.config.get("notifications", {})
+        channel_config = dict(notifications_config.get(channel, {}) or {})
+        if group:
+            group_config = (notifications_config.get("groups", {}) or {}).get(group, {}) or {}
+            channel_config.update(group_config.get(channel, {}) or {})
+        return channel_config
+    
+    def render_notification(self, notification, templates: dict) -> Tuple[str, str]:
+        """
+        按模板生成通知标题和正文
+        单个宿舍使用 title / content 模板；汇总通知使用 digest_title / digest_content，
+        其中 {rooms} 为每个宿舍按 digest_item 模板生成的行
+        """
+        now = datetime.fromtimestamp(notification.created_at).strftime('%Y-%m-%d %H:%M:%S')
+        if isinstance(notification, Digest):
+            item_template = templates.get("digest_item", DEFAULT_TEMPLATES["digest_item"])
+            rooms = "\n".join(item_template.format(**vars(n)) for n in notification.notifications)
+            fields = {
+                "group": notification.group,
+                "count": len(notification.notifications),
+                "rooms": rooms,
+                "time": now,
+            }
+            title = templates.get("digest_title", DEFAULT_TEMPLATES["digest_title"]).format(**fields)
+            content = templates.get("digest_content", DEFAULT_TEMPLATES["digest_content"]).format(**fields)
+            return title, content
+        fields = dict(vars(notification), time=now)
+        title = templates.get("title", DEFAULT_TEMPLATES["title"]).format(**fields)
+        content = templates.get("content", "").format(**fields)
+        return title, content
+    
+    def send_server_chan_notification(self, notification) -> bool:
+        """
+        发送Server酱通知（单个宿舍或汇总）
+        配置错误或服务端拒绝时返回 False；网络错误直接抛出，由分发器重试
+        """
+        server_chan_config = self.get_channel_config("server_chan", notification.group)
         sendkey = server_chan_config.get("sendkey", "")
         if not sendkey:
             self.logger.error("未配置SENDKEY，无法发送通知")
             return False
             
-        try:
-            url = server_chan_config.get("url", "https://sctapi.ftqq.com/{sendkey}.send").format(sendkey=sendkey)
-            
-            # 使用模板生成通知内容
-            templates = self.config.get("templates", {})
-            title = templates.get("title", "⚠️ 电量不足提醒 - {dorm_name}").format(dorm_name=dorm_name)
-            content = templates.get("content", "").format(
-                dorm_name=dorm_name,
-                power=power,
-                threshold=threshold,
-                time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                dorm_id=dorm_id,
-                dorm_type=dorm_type
-            )
-            
-            data = {
-                "title": title,
-                "desp": content
-            }
-            
-            response = requests.post(url, data=data, timeout=10)
+        url = server_chan_config.get("url", "https://sctapi.ftqq.com/{sendkey}.send").format(sendkey=sendkey)
+        
+        # 使用模板生成通知内容
+        title, content = self.render_notification(notification, self.config.get("templates", {}))
+        data = {
+            "title": title,
+            "desp": content
+        }
+        
+        with self.notification_session.post(url, data=data, timeout=10) as response:
             response.raise_for_status()
-            
             result = response.json()
-            if result.get("code") == 0:
-                self.logger.info(f"Server酱通知发送成功: {dorm_name}")
-                return True
-            else:
-                self.logger.error(f"Server酱通知发送失败: {result.get('message', '未知错误')}")
-                return False
-                
-        except Exception as e:
-            self.logger.error(f"发送Server酱通知失败: {e}")
-            return False
+        if result.get("code") == 0:
+            self.logger.info(f"Server酱通知发送成功: {notification.label}")
+            return True
+        self.logger.error(f"Server酱通知发送失败: {result.get('message', '未知错误')}")
+        return False
     
-    def send_custom_webhook_notification(self, dorm_name: str, power: float, dorm_id: str, dorm_type: str, threshold: float) -> bool:
-        """发送自定义Webhook通知"""
-        webhook_config = self.config.get("notifications", {}).get("custom_webhook", {})
+    def send_custom_webhook_notification(self, notification) -> bool:
+        """
+        发送自定义Webhook通知（单个宿舍或汇总）
+        网络错误和 HTTP 错误直接抛出，由分发器判断是否重试
+        """
+        webhook_config = self.get_channel_config("custom_webhook", notification.group)
+        url = webhook_config.get("url", "")
+        method = webhook_config.get("method", "POST")
+        headers = webhook_config.get("headers", {})
+        # Webhook 自己的模板优先，未设置的项使用全局模板
+        templates = {**self.config.get("templates", {}), **(webhook_config.get("template", {}) or {})}
         
-        if not webhook_config.get("enabled", False):
-            return False
-            
-        try:
-            url = webhook_config.get("url", "")
-            method = webhook_config.get("method", "POST")
-            headers = webhook_config.get("headers", {})
-            template = webhook_config.get("template", {})
-            
-            # 使用模板生成通知内容
-            title = template.get("title", "电量不足提醒").format(dorm_name=dorm_name)
-            content = template.get("content", "").format(
-                dorm_name=dorm_name,
-                power=power,
-                threshold=threshold
-            )
-            
-            data = {
-                "title": title,
-                "content": content,
-                "dorm_name": dorm_name,
-                "power": power,
-                "threshold": threshold,
-                "dorm_id": dorm_id,
-                "dorm_type": dorm_type,
-                "timestamp": datetime.now().isoformat()
-            }
-            
+        # 使用模板生成通知内容
+        title, content = self.render_notification(notification, templates)
+        data = {
+            "title": title,
+            "content": content,
+            "timestamp": datetime.fromtimestamp(notification.created_at).isoformat()
+        }
+        if isinstance(notification, Digest):
+            data.update(group=notification.group, count=len(notification.notifications))
             if method.upper() == "POST":
-                response = requests.post(url, json=data, headers=headers, timeout=10)
-            else:
-                response = requests.get(url, params=data, headers=headers, timeout=10)
-                
+                data["rooms"] = [
+                    {key: getattr(n, key) for key in ("dorm_name", "power", "threshold", "dorm_id", "dorm_type")}
+                    for n in notification.notifications
+                ]
+        else:
+            data.update(
+                dorm_name=notification.dorm_name,
+                power=notification.power,
+                threshold=notification.threshold,
+                dorm_id=notification.dorm_id,
+                dorm_type=notification.dorm_type,
+            )
+        
+        if method.upper() == "POST":
+            response = self.notification_session.post(url, json=data, headers=headers, timeout=10)
+        else:
+            response = self.notification_session.get(url, params=data, headers=headers, timeout=10)
+        with response:
             response.raise_for_status()
-            self.logger.info(f"自定义Webhook通知发送成功: {dorm_name}")
-            return True
-                
-        except Exception as e:
-            self.logger.error(f"发送自定义Webhook通知失败: {e}")
-            return False
+        self.logger.info(f"自定义Webhook通知发送成功: {notification.label}")
+        return True
     
-    def send_notification(self, dorm_name: str, power: float, dorm_id: str, dorm_type: str, threshold: float) -> bool:
+    def get_notification_group(self, dorm_config: dict) -> str:
         """
-        发送通知（支持多种通知方式）
-        
-        Args:
-            dorm_name: 宿舍名称
-            power: 电量
-            dorm_id: 宿舍ID
-            dorm_type: 宿舍类型
-            threshold: 阈值
-            
-        Returns:
-            发送成功返回True，失败返回False
+        宿舍所属的通知分组：宿舍配置中的 group 优先；
+        否则 digest.group_by 为 building 时按楼栋（宿舍名称中 "-" 之前的部分）分组，其余情况全部归为一组
         """
-        success = False
-        
-        # 发送Server酱通知
-        if self.send_server_chan_notification(dorm_name, power, dorm_id, dorm_type, threshold):
-            success = True
-            
-        # 发送自定义Webhook通知
-        if self.send_custom_webhook_notification(dorm_name, power, dorm_id, dorm_type, threshold):
-            success = True
-            
-        return success
+        if dorm_config.get("group"):
+            return str(dorm_config["group"])
+        digest_config = self.config.get("notifications", {}).get("digest", {}) or {}
+        if digest_config.get("group_by") == "building":
+            return dorm_config["dorm_name"].split("-")[0]
+        return "全部宿舍"
+    
+    def queue_notification(self, notification: Notification):
+        """
+        汇总模式下记入本轮监控的低电量列表，监控结束后由 dispatch_digests 统一发送；
+        逐个通知模式下立即提交给后台分发器
+        """
+        if self.sweep_breaches is not None:
+            self.sweep_breaches.append(notification)
+        elif not self.notifier.submit(notification):
+            self.logger.debug(f"{notification.label} 的通知未提交（正在发送或没有启用的通知渠道）")
+    
+    def dispatch_digests(self):
+        """按分组汇总本轮监控的低电量宿舍，每个分组每个渠道只发送一条通知"""
+        breaches, self.sweep_breaches = self.sweep_breaches, None
+        if not breaches:
+            return
+        digest_config = self.config.get("notifications", {}).get("digest", {}) or {}
+        min_rooms = max(1, int(digest_config.get("min_rooms", 2)))
+        groups: Dict[str, List[Notification]] = {}
+        for notification in breaches:
+            groups.setdefault(notification.group, []).append(notification)
+        for group, notifications in groups.items():
+            # 分组内宿舍数较少时仍逐个发送
+            items = [Digest(group, notifications)] if len(notifications) >= min_rooms else notifications
+            for item in items:
+                if not self.notifier.submit(item):
+                    self.logger.warning(f"{item.label} 的通知未提交（上一条仍在发送或没有启用的通知渠道）")
+        self.logger.info(f"本轮共 {len(breaches)} 个宿舍电量不足，按 {len(groups)} 个分组发送通知")
+    
+    def record_notification_result(self, notification, results: Dict[str, bool]):
+        """通知的所有渠道发送完成后调用（在通知线程中），任一渠道成功即对其中所有宿舍进入冷却期"""
+        if any(results.values()):
+            for dorm_id in notification.dorm_ids:
+                self.mark_notified(dorm_id)
+            failed = [name for name, ok in results.items() if not ok]
+            if failed:
+                self.logger.warning(f"{notification.label} 的部分通知渠道发送失败: {', '.join(failed)}")
+        else:
+            self.logger.error(f"{notification.label} 的通知全部发送失败，下次检查时重试")
     
     def should_send_notification(self, dorm_id: str) -> bool:
         """检查是否应该发送通知（避免重复通知）"""
-        monitor_config = self.config.get("monitor", {})
-        cooldown_seconds = monitor_config.get("notification_cooldown_seconds", 3600)
-        
-        # 检查是否在冷却期内
-        if dorm_id in self.notified_dorms:
-            return False
-            
-        return True
+        expires_at = self.notification_cooldowns.get(dorm_id)
+        if expires_at is None:
+            return True
+        # 冷却期已过：顺便从内存中移除，数据库中的过期记录在每轮监控结束后统一清理
+        if expires_at <= time.time():
+            self.notification_cooldowns.pop(dorm_id, None)
+            self.logger.info(f"重置 {dorm_id} 的通知状态")
+            return True
+        return False
     
     def mark_notified(self, dorm_id: str):
-        """标记已发送通知"""
-        self.notified_dorms.add(dorm_id)
-        
-        # 设置定时器，在冷却期后移除标记
+        """标记已发送通知，记录冷却期到期时间"""
         monitor_config = self.config.get("monitor", {})
         cooldown_seconds = monitor_config.get("notification_cooldown_seconds", 3600)
-        
-        def remove_notification_mark():
-            time.sleep(cooldown_seconds)
-            self.notified_dorms.discard(dorm_id)
-            self.logger.info(f"重置 {dorm_id} 的通知状态")
-            
-        threading.Thread(target=remove_notification_mark, daemon=True).start()
+        expires_at = time.time() + cooldown_seconds
+        self.notification_cooldowns[dorm_id] = expires_at
+        try:
+            self.db_manager.set_notification_cooldown(dorm_id, expires_at)
+        except Exception as e:
+            self.logger.error(f"保存通知冷却状态失败: {e}")
+    
+    def prune_notification_cooldowns(self):
+        """清理数据库中已到期的通知冷却记录"""
+        try:
+            pruned = self.db_manager.prune_notification_cooldowns(time.time())
+            if pruned:
+                self.logger.debug(f"清理过期的通知冷却记录: {pruned} 条")
+        except Exception as e:
+            self.logger.error(f"清理通知冷却记录失败: {e}")
     
-    def monitor_single_dorm(self, dorm_config: dict):
+    def monitor_single_dorm(self, dorm_config: dict) -> Optional[float]:
         """监控单个宿舍"""
         dorm_id = dorm_config["dorm_id"]
         dorm_name = dorm_config["dorm_name"]
@@ -327,56 +468,252 @@ class PowerMonitorService:
         
         if not enabled:
             self.logger.debug(f"跳过禁用的宿舍: {dorm_name}")
-            return
-        
-        # 获取该宿舍的阈值，如果没有设置则使用全局阈值
-        monitor_config = self.config.get("monitor", {})
-        threshold = dorm_config.get("low_power_threshold", monitor_config.get("global_threshold", 10.0))
+            return None
         
         # 查询电量
         power = self.query_power(dorm_id, dorm_name, dorm_type)
         
         if power is None:
-            return
+            return None
             
+        self.check_power_threshold(dorm_config, power)
+        return power
+    
+    def get_threshold(self, dorm_config: dict) -> float:
+        """获取该宿舍的阈值，如果没有设置则使用全局阈值"""
+        monitor_config = self.config.get("monitor", {})
+        return dorm_config.get("low_power_threshold", monitor_config.get("global_threshold", 10.0))
+    
+    def check_power_threshold(self, dorm_config: dict, power: float):
+        """检查电量是否低于阈值，必要时发送通知"""
+        dorm_id = dorm_config["dorm_id"]
+        dorm_name = dorm_config["dorm_name"]
+        dorm_type = dorm_config["dorm_type"]
+        
+        threshold = self.get_threshold(dorm_config)
+        
         # 检查是否低于阈值
         if power < threshold:
             self.logger.warning(f"{dorm_name} 电量不足: {power} 度 < {threshold} 度")
             
-            # 检查是否应该发送通知
+            # 检查是否应该发送通知；通知在后台发送，成功后由 record_notification_result 记录冷却期
             if self.should_send_notification(dorm_id):
-                if self.send_notification(dorm_name, power, dorm_id, dorm_type, threshold):
-                    self.mark_notified(dorm_id)
+                self.queue_notification(Notification(
+                    dorm_id, dorm_name, dorm_type, power, threshold, self.get_notification_group(dorm_config)))
             else:
                 self.logger.info(f"{dorm_name} 在冷却期内，跳过通知")
         else:
             self.logger.info(f"{dorm_name} 电量充足: {power} 度")
     
-    def run_monitoring_task(self):
-        """执行监控任务"""
-        self.logger.info("开始执行监控任务")
+    def get_notification_drain_timeout(self) -> float:
+        """停止服务时等待未发送完的通知的最长时间（秒）"""
+        return float((self.config.get("notifications", {}).get("dispatch", {}) or {}).get("drain_timeout", 30))
+    
+    def get_polling_config(self) -> dict:
+        """获取轮询设置"""
+        return self.config.get("monitor", {}).get("polling", {}) or {}
+    
+    def flush_readings(self, readings: List[Tuple[str, str, float]]):
+        """将缓存的电量读数批量写入数据库，并清空缓存"""
+        if not readings:
+            return
+        try:
+            saved = self.db_manager.save_records_bulk(readings)
+            self.logger.debug(f"批量保存电量记录: {saved}/{len(readings)} 条")
+        except Exception as e:
+            self.logger.error(f"保存电量记录失败: {e}")
+        readings.clear()
+    
+    def should_save_reading(self, dorm_id: str) -> bool:
+        """页面与上次完全相同且今天已保存过该宿舍的读数时不再写库（每天的记录仍会保存一条）"""
+        today = date.today()
+        if self.power_pages.was_unchanged(dorm_id) and self.saved_dates.get(dorm_id) == today:
+            return False
+        self.saved_dates[dorm_id] = today
+        return True
+    
+    def poll_sequential(self, dorms: List[dict]) -> int:
+        """逐个查询宿舍电量，返回查询成功的数量；请求速率由 self.upstream 的令牌桶控制"""
+        polling_config = self.get_polling_config()
+        flush_every = polling_config.get("flush_every", 200)
+        readings = []
+        succeeded = 0
+        for dorm_config in dorms:
+            if not self.is_running:
+                break
+            power = self.monitor_single_dorm(dorm_config)
+            if power is not None:
+                succeeded += 1
+                if self.should_save_reading(dorm_config["dorm_id"]):
+                    readings.append((dorm_config["dorm_id"], dorm_config["dorm_name"], power))
+                if len(readings) >= flush_every:
+                    self.flush_readings(readings)
+        self.flush_readings(readings)
+        return succeeded
+    
+    def poll_concurrent(self, dorms: List[dict]) -> int:
+        """
+        并发查询宿舍电量，返回查询成功的数量
+        max_concurrency 只限制线程数；实际并发和请求速率由 self.upstream 按服务器的响应情况动态调整
+        """
+        polling_config = self.get_polling_config()
+        poller = AsyncPoller(max_concurrency=polling_config.get("max_concurrency", 8))
+        jobs = [
+            lambda d=dorm_config: self.query_power(d["dorm_id"], d["dorm_name"], d["dorm_type"])
+            for dorm_config in dorms
+        ]
+        results = poller.poll(jobs, should_continue=lambda: self.is_running)
+        
+        flush_every = polling_config.get("flush_every", 200)
+        readings = []
+        succeeded = 0
+        for dorm_config, power in zip(dorms, results):
+            if power is None:
+                continue
+            succeeded += 1
+            if self.should_save_reading(dorm_config["dorm_id"]):
+                readings.append((dorm_config["dorm_id"], dorm_config["dorm_name"], power))
+            if len(readings) >= flush_every:
+                self.flush_readings(readings)
+            self.check_power_threshold(dorm_config, power)
+        self.flush_readings(readings)
+        return succeeded
+    
+    def run_monitoring_task(self, dormitories: Optional[List[dict]] = None, label: str = "全部宿舍"):
+        """执行监控任务；不指定 dormitories 时监控配置中的全部宿舍"""
+        self.logger.info(f"开始执行监控任务 ({label})")
         
         try:
-            dormitories = self.config.get("dormitories", [])
+            if dormitories is None:
+                dormitories = self.config.get("dormitories", [])
             
             if not dormitories:
                 self.logger.warning("没有配置要监控的宿舍")
                 return
             
             enabled_dorms = [dorm for dorm in dormitories if dorm.get("enabled", True)]
-            self.logger.info(f"开始监控 {len(enabled_dorms)} 个宿舍")
+            mode = self.get_polling_config().get("mode", "sequential")
+            self.logger.info(f"开始监控 {len(enabled_dorms)} 个宿舍 (轮询模式: {mode})")
             
-            for dorm_config in enabled_dorms:
-                if not self.is_running:
-                    break
-                self.monitor_single_dorm(dorm_config)
-                time.sleep(2)  # 间隔2秒，避免请求过于频繁
+            start_time = time.monotonic()
+            upstream_before = dict(self.upstream.stats)
+            pages_before = dict(self.power_pages.stats)
+            if self.config.get("notifications", {}).get("mode", "per_room") == "digest":
+                self.sweep_breaches = []
+            try:
+                if mode == "async":
+                    succeeded = self.poll_concurrent(enabled_dorms)
+                else:
+                    succeeded = self.poll_sequential(enabled_dorms)
+            finally:
+                self.dispatch_digests()
+            elapsed = time.monotonic() - start_time
+            self.prune_notification_cooldowns()
             
-            self.logger.info("监控任务完成")
+            upstream = {key: value - upstream_before[key] for key, value in self.upstream.stats.items()}
+            pages = {key: value - pages_before[key] for key, value in self.power_pages.stats.items()}
+            self.logger.info(
+                f"监控任务完成: 共 {len(enabled_dorms)} 个宿舍，成功 {succeeded} 个，"
+                f"耗时 {elapsed:.1f} 秒；页面未变化 {pages['unchanged'] + pages['not_modified']} 个 "
+                f"(命中率 {PageCache.hit_rate(pages):.0%}，其中 304 {pages['not_modified']} 个)；"
+                f"服务器过载 {upstream['overloads']} 次，"
+                f"熔断跳过 {upstream['rejected']} 个，{self.upstream.describe()}"
+            )
             
         except Exception as e:
             self.logger.error(f"监控任务出错: {e}")
     
+    def setup_schedules(self):
+        """
+        根据配置注册定时任务：
+        - schedule_time: 每天定时监控全部宿舍（启用自适应轮询时只监控不参加自适应轮询的宿舍）
+        - interval_seconds: 大于 0 时，每隔该秒数监控一次未单独设置间隔的宿舍
+        - 宿舍配置中的 interval_seconds: 按该宿舍自己的间隔监控（相同间隔的宿舍合并为一个任务）
+        - adaptive_polling.enabled: 未单独设置间隔的宿舍改为自适应轮询（代替 interval_seconds）
+        """
+        monitor_config = self.config.get("monitor", {})
+        dormitories = [dorm for dorm in self.config.get("dormitories", []) if dorm.get("enabled", True)]
+        descriptions = []
+
+        groups: Dict[float, List[dict]] = {}
+        global_interval = monitor_config.get("interval_seconds") or 0
+        adaptive_enabled = (monitor_config.get("adaptive_polling", {}) or {}).get("enabled", False)
+        self.adaptive_dorms = []
+        fixed_dorms = []
+        for dorm in dormitories:
+            if adaptive_enabled and "interval_seconds" not in dorm:
+                self.adaptive_dorms.append(dorm)
+                continue
+            fixed_dorms.append(dorm)
+            interval = dorm.get("interval_seconds", global_interval) or 0
+            if interval > 0:
+                groups.setdefault(float(interval), []).append(dorm)
+
+        schedule_time = monitor_config.get("schedule_time")
+        if schedule_time and not self.adaptive_dorms:
+            self.scheduler.add_daily("daily", schedule_time, self.run_monitoring_task)
+            descriptions.append(f"每天 {schedule_time} 监控全部宿舍")
+        elif schedule_time and fixed_dorms:
+            # 自适应轮询的宿舍不参加每日定时监控，它们的查询次数全部计入 daily_request_budget
+            label = f"每日定时的 {len(fixed_dorms)} 个宿舍"
+            self.scheduler.add_daily(
+                "daily", schedule_time, lambda d=fixed_dorms, l=label: self.run_monitoring_task(d, l))
+            descriptions.append(f"每天 {schedule_time} 监控 {len(fixed_dorms)} 个非自适应轮询的宿舍")
+        for interval, dorms in sorted(groups.items()):
+            label = f"每 {interval:g} 秒的 {len(dorms)} 个宿舍"
+            self.scheduler.add_interval(
+                f"interval-{interval:g}", interval,
+                lambda d=dorms, l=label: self.run_monitoring_task(d, l))
+            descriptions.append(f"每 {interval:g} 秒监控 {len(dorms)} 个宿舍")
+
+        if self.adaptive_dorms:
+            self.poll_plan = AdaptivePollPlan(self.create_poll_planner())
+            self.update_poll_plan()
+            # 查询计划本身就是触发器：调度线程一直睡到最近一个宿舍该查询为止
+            self.scheduler.add_job("adaptive", self.poll_plan, self.run_adaptive_task)
+            descriptions.append(f"{self.poll_plan}监控宿舍")
+        return descriptions
+    
+    def create_poll_planner(self) -> AdaptivePollPlanner:
+        """根据 monitor.adaptive_polling 配置创建查询间隔计算器"""
+        monitor_config = self.config.get("monitor", {})
+        adaptive_config = monitor_config.get("adaptive_polling", {}) or {}
+        max_interval = adaptive_config.get("max_interval_seconds", 86400)
+        # 已低于阈值的宿舍的查询间隔不短于通知冷却时间，避免每次查询都重复提醒
+        below_threshold_interval = max(
+            adaptive_config.get("below_threshold_interval_seconds", max_interval),
+            monitor_config.get("notification_cooldown_seconds", 3600))
+        return AdaptivePollPlanner(
+            min_interval=adaptive_config.get("min_interval_seconds", 900),
+            max_interval=max_interval,
+            default_interval=adaptive_config.get("default_interval_seconds", 21600),
+            lead_fraction=adaptive_config.get("lead_fraction", 0.25),
+            daily_budget=adaptive_config.get("daily_request_budget", 0),
+            below_threshold_interval=below_threshold_interval,
+        )
+    
+    def update_poll_plan(self):
+        """根据数据库中最新的用电统计重新计算自适应轮询的查询间隔"""
+        items = {}
+        for dorm in self.adaptive_dorms:
+            try:
+                stats = self.db_manager.get_consumption_stats(dorm["dorm_id"])
+            except Exception as e:
+                self.logger.error(f"读取用电统计失败 ({dorm['dorm_name']}): {e}")
+                stats = None
+            items[dorm["dorm_id"]] = (stats, self.get_threshold(dorm))
+        self.poll_plan.update(items)
+        self.logger.debug(f"自适应轮询计划: {self.poll_plan}")
+    
+    def run_adaptive_task(self):
+        """查询所有已到查询时间的自适应轮询宿舍，然后按新读数重新计算间隔"""
+        due = set(self.poll_plan.due())
+        dorms = [dorm for dorm in self.adaptive_dorms if dorm["dorm_id"] in due]
+        self.poll_plan.mark_polled(due)
+        if dorms:
+            self.run_monitoring_task(dorms, f"自适应轮询的 {len(dorms)} 个宿舍")
+        self.update_poll_plan()
+    
     def start_service(self):
         """启动服务"""
         if self.is_running:
@@ -386,32 +723,43 @@ class PowerMonitorService:
         self.is_running = True
         
         # 设置定时任务
-        schedule_time = self.config.get("monitor", {}).get("schedule_time", "19:00")
-        schedule.every().day.at(schedule_time).do(self.run_monitoring_task)
+        descriptions = self.setup_schedules()
+        if not descriptions:
+            self.logger.warning("没有配置任何定时任务 (schedule_time / interval_seconds)")
         
-        # 启动调度器线程
-        self.scheduler_thread = threading.Thread(target=self.run_scheduler, daemon=True)
+        # 启动调度器线程：调度器一直睡到下一个任务到期，停止时立即唤醒
+        self.scheduler_thread = threading.Thread(target=self.scheduler.run, daemon=True)
         self.scheduler_thread.start()
         
-        self.logger.info(f"电费监控服务已启动，将在每天 {schedule_time} 执行监控任务")
+        self.logger.info(f"电费监控服务已启动: {'; '.join(descriptions) or '无定时任务'}")
     
-    def run_scheduler(self):
-        """运行调度器"""
-        while self.is_running:
-            schedule.run_pending()
-            time.sleep(60)  # 每分钟检查一次
+    def wait(self):
+        """阻塞直到调度线程退出（收到停止信号时由 stop_service 唤醒）"""
+        while self.scheduler_thread and self.scheduler_thread.is_alive():
+            self.scheduler_thread.join()
     
     def stop_service(self):
         """停止服务"""
         self.is_running = False
-        if self.scheduler_thread:
+        self.scheduler.stop()
+        if self.scheduler_thread and self.scheduler_thread is not threading.current_thread():
             self.scheduler_thread.join(timeout=5)
+        self.notifier.close(timeout=self.get_notification_drain_timeout())
+        self.session.close()
+        self.notification_session.close()
+        self.db_manager.close()
         self.logger.info("电费监控服务已停止")
     
     def run_once(self):
         """立即执行一次监控任务"""
         self.logger.info("立即执行监控任务")
-        self.run_monitoring_task()
+        self.is_running = True
+        try:
+            self.run_monitoring_task()
+        finally:
+            self.is_running = False
+            # 进程即将退出，等待后台通知发送完成
+            self.notifier.flush(timeout=self.get_notification_drain_timeout())
 
 
 def main():
@@ -436,9 +784,8 @@ def main():
         monitor.start_service()
         
         try:
-            # 保持运行
-            while True:
-                time.sleep(1)
+            # 等待调度线程结束，不再定期唤醒
+            monitor.wait()
         except KeyboardInterrupt:
             monitor.stop_service()
 
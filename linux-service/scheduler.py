@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+事件驱动的任务调度模块
+功能：
+1. 支持每天定时（HH:MM）和固定间隔两种触发方式，可同时注册多个任务
+2. 调度线程一直睡到最近一个任务到期为止，而不是定期醒来检查
+3. 添加任务或停止调度时立即唤醒调度线程
+4. 时间来源可注入（Clock），便于在测试中手动推进时间
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+
+class Clock:
+    """系统时钟：now() 返回 Unix 时间戳，wait() 在事件触发或超时后返回"""
+
+    def now(self) -> float:
+        return time.time()
+
+    def wait(self, event: threading.Event, timeout: Optional[float]) -> bool:
+        return event.wait(timeout)
+
+
+class ManualClock(Clock):
+    """手动推进的时钟，用于测试：wait() 不会真的睡眠，而是把时间直接推进到超时点"""
+
+    def __init__(self, start: float = 0.0):
+        self.current = start
+
+    def now(self) -> float:
+        return self.current
+
+    def advance(self, seconds: float):
+        self.current += seconds
+
+    def wait(self, event: threading.Event, timeout: Optional[float]) -> bool:
+        if event.is_set() or timeout is None:
+            return event.is_set()
+        self.current += timeout
+        return False
+
+
+class IntervalTrigger:
+    """每隔固定秒数触发一次"""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("间隔必须大于 0 秒")
+        self.seconds = seconds
+
+    def next_after(self, moment: float) -> float:
+        return moment + self.seconds
+
+    def __str__(self):
+        return f"每 {self.seconds:g} 秒"
+
+
+class DailyTrigger:
+    """每天在本地时间 HH:MM 触发一次"""
+
+    def __init__(self, at: str):
+        hour, minute = (int(part) for part in at.split(":"))
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError(f"无效的时间: {at}")
+        self.hour, self.minute = hour, minute
+
+    def next_after(self, moment: float) -> float:
+        current = datetime.fromtimestamp(moment)
+        candidate = current.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if candidate <= current:
+            candidate += timedelta(days=1)
+        return candidate.timestamp()
+
+    def __str__(self):
+        return f"每天 {self.hour:02d}:{self.minute:02d}"
+
+
+class Job:
+    """一个已注册的任务"""
+
+    def __init__(self, name: str, trigger, func: Callable[[], object], next_run: float):
+        self.name = name
+        self.trigger = trigger
+        self.func = func
+        self.next_run = next_run
+        self.cancelled = False
+
+
+class Scheduler:
+    """
+    基于最小堆的调度器：堆顶始终是最近到期的任务，调度线程只需等待到它的到期时间。
+    任务在调度线程中依次执行；执行时间超过间隔时不会补跑错过的次数，而是从执行结束时刻重新计算。
+    """
+
+    def __init__(self, clock: Optional[Clock] = None):
+        self.clock = clock or Clock()
+        self._heap: List = []
+        self._jobs: Dict[str, Job] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self.on_error: Optional[Callable[[Job, Exception], None]] = None
+
+    def add_job(self, name: str, trigger, func: Callable[[], object], run_immediately: bool = False) -> Job:
+        """注册任务；同名任务会被替换"""
+        now = self.clock.now()
+        job = Job(name, trigger, func, now if run_immediately else trigger.next_after(now))
+        with self._lock:
+            old = self._jobs.get(name)
+            if old is not None:
+                old.cancelled = True
+            self._jobs[name] = job
+            heapq.heappush(self._heap, (job.next_run, next(self._counter), job))
+        self._wakeup.set()
+        return job
+
+    def add_interval(self, name: str, seconds: float, func: Callable[[], object], run_immediately: bool = False) -> Job:
+        return self.add_job(name, IntervalTrigger(seconds), func, run_immediately)
+
+    def add_daily(self, name: str, at: str, func: Callable[[], object]) -> Job:
+        return self.add_job(name, DailyTrigger(at), func)
+
+    def remove_job(self, name: str):
+        with self._lock:
+            job = self._jobs.pop(name, None)
+            if job is not None:
+                job.cancelled = True
+
+    @property
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.next_run)
+
+    def next_run_time(self) -> Optional[float]:
+        """最近一个任务的到期时间，没有任务时返回 None"""
+        with self._lock:
+            self._discard_cancelled()
+            return self._heap[0][0] if self._heap else None
+
+    def _discard_cancelled(self):
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+
+    def _pop_due(self, now: float) -> Optional[Job]:
+        with self._lock:
+            self._discard_cancelled()
+            if self._heap and self._heap[0][0] <= now:
+                return heapq.heappop(self._heap)[2]
+            return None
+
+    def _execute(self, job: Job):
+        try:
+            job.func()
+        except Exception as e:
+            if self.on_error:
+                self.on_error(job, e)
+        with self._lock:
+            if job.cancelled:
+                return
+            job.next_run = job.trigger.next_after(self.clock.now())
+            heapq.heappush(self._heap, (job.next_run, next(self._counter), job))
+
+    def run_pending(self) -> int:
+        """执行所有已到期的任务，返回执行的数量"""
+        executed = 0
+        while not self._stopped:
+            job = self._pop_due(self.clock.now())
+            if job is None:
+                break
+            self._execute(job)
+            executed += 1
+        return executed
+
+    def run(self):
+        """调度循环：执行到期任务，然后一直等待到下一个任务到期、有新任务加入或调度停止"""
+        while not self._stopped:
+            self._wakeup.clear()
+            self.run_pending()
+            if self._stopped:
+                break
+            next_run = self.next_run_time()
+            timeout = None if next_run is None else max(0.0, next_run - self.clock.now())
+            self.clock.wait(self._wakeup, timeout)
+
+    def stop(self):
+        """停止调度循环，正在等待的调度线程会立即返回"""
+        self._stopped = True
+        self._wakeup.set()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+scheduler 模块测试：用 ManualClock 推进时间，检查每天定时和固定间隔任务的触发顺序
+运行: python -m pytest -q test_scheduler.py  或  python test_scheduler.py
+"""
+
+import unittest
+from datetime import datetime
+
+from scheduler import DailyTrigger, IntervalTrigger, ManualClock, Scheduler
+
+
+def at(hour, minute, day=1):
+    """2025-03-<day> 本地时间 HH:MM 的时间戳"""
+    return datetime(2025, 3, day, hour, minute).timestamp()
+
+
+class SchedulerOrderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = ManualClock(at(7, 0))
+        self.scheduler = Scheduler(self.clock)
+        self.fired = []
+
+    def record(self, name):
+        return lambda: self.fired.append((name, self.clock.now()))
+
+    def test_run_loop_fires_in_time_order(self):
+        self.scheduler.add_job("interval", IntervalTrigger(25 * 60), self.record("interval"))
+
+        def daily():
+            self.fired.append(("daily", self.clock.now()))
+            self.scheduler.stop()
+
+        self.scheduler.add_job("daily", DailyTrigger("08:00"), daily)
+        # ManualClock.wait 直接把时间推进到下一个任务的到期时间
+        self.scheduler.run()
+
+        self.assertEqual(self.fired, [
+            ("interval", at(7, 25)),
+            ("interval", at(7, 50)),
+            ("daily", at(8, 0)),
+        ])
+
+    def test_run_pending_after_advancing_past_both_triggers(self):
+        self.scheduler.add_job("daily", DailyTrigger("08:00"), self.record("daily"))
+        self.scheduler.add_job("interval", IntervalTrigger(25 * 60), self.record("interval"))
+
+        self.clock.advance(80 * 60)  # 08:20
+        self.assertEqual(self.scheduler.run_pending(), 2)
+        # 先到期的间隔任务（07:25）先执行；错过的间隔不补跑，从执行时刻重新计时
+        self.assertEqual([name for name, _ in self.fired], ["interval", "daily"])
+        self.assertEqual(self.scheduler.next_run_time(), at(8, 45))
+        self.assertEqual(self.scheduler.run_pending(), 0)
+
+        self.clock.advance(24 * 3600)  # 第二天 08:20
+        self.fired.clear()
+        self.assertEqual(self.scheduler.run_pending(), 2)
+        self.assertEqual([name for name, _ in self.fired], ["interval", "daily"])
+        self.assertEqual(self.scheduler.next_run_time(), at(8, 45, day=2))
+
+
+if __name__ == "__main__":
+    unittest.main()